@@ -0,0 +1,205 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Any, Optional
+from .comparison import BUCKET_COLUMNS
+
+
+def normalize_area(area: str) -> str:
+    """Canonical lookup key for an area name"""
+    return ' '.join(str(area).split()).lower()
+
+
+# Additive per-(area, year) aggregates, summed across years; means are derived from them
+_SUM_FIELDS = ('rows', 'price_sum', 'price_count', 'demand_sum', 'demand_count')
+
+
+def _nan_min(a, b):
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return min(a, b)
+
+
+def _nan_max(a, b):
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return max(a, b)
+
+
+def _mean(total: float, count: float) -> Optional[float]:
+    return float(total / count) if count else None
+
+
+class AreaStats:
+    """Precomputed aggregates for a single canonical area"""
+
+    def __init__(self, key: str, name: str, years: Dict[int, Dict[str, float]],
+                 first_price: Optional[float], last_price: Optional[float],
+                 rows: np.ndarray = None, row_count: int = None):
+        self.key = key
+        self.name = name
+        self.years = years
+        self.first_price = first_price
+        self.last_price = last_price
+        # Positions of this area's rows in the dataset frame, in frame order
+        self.rows = rows if rows is not None else np.empty(0, dtype=np.int64)
+        # All of the area's rows, including those without a year
+        self.row_count = int(len(self.rows)) if row_count is None else int(row_count)
+        self._finalize()
+
+    def _finalize(self):
+        """Derive the chart series and overall stats served to requests"""
+        self.price_trend = []
+        self.demand_trend = []
+        totals = dict.fromkeys(_SUM_FIELDS, 0)
+        price_min = price_max = None
+
+        for year in sorted(self.years):
+            bucket = self.years[year]
+            price = _mean(bucket['price_sum'], bucket['price_count'])
+            demand = _mean(bucket['demand_sum'], bucket['demand_count'])
+            if price is not None:
+                self.price_trend.append({'year': int(year), 'price': price})
+            if demand is not None:
+                self.demand_trend.append({'year': int(year), 'demand': demand})
+            for field in _SUM_FIELDS:
+                totals[field] += bucket[field]
+            price_min = _nan_min(price_min, bucket['price_min'])
+            price_max = _nan_max(price_max, bucket['price_max'])
+
+        years = sorted(self.years)
+        self.total_records = int(totals['rows'])
+        self.avg_price = _mean(totals['price_sum'], totals['price_count'])
+        self.avg_demand = _mean(totals['demand_sum'], totals['demand_count'])
+        self.min_price = price_min
+        self.max_price = price_max
+        self.min_year = int(years[0]) if years else None
+        self.max_year = int(years[-1]) if years else None
+
+    def summary_stats(self) -> Dict[str, Any]:
+        """Statistics used by the summary generators"""
+        return {
+            'avg_price': self.avg_price,
+            'avg_demand': self.avg_demand,
+            'min_price': self.min_price,
+            'max_price': self.max_price,
+            'min_year': self.min_year,
+            'max_year': self.max_year,
+            'total_records': self.total_records,
+            'first_price': self.first_price,
+            'last_price': self.last_price,
+        }
+
+
+class AreaAggregateIndex:
+    """Per-area, per-year price and demand aggregates built once per dataset.
+
+    Instances are never mutated after construction; each data version builds
+    its own, so readers holding the previous one are unaffected.
+    """
+
+    def __init__(self, areas: Dict[str, AreaStats] = None):
+        self.areas = areas or {}
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> 'AreaAggregateIndex':
+        """Build the index with a single grouped pass over the frame"""
+        required = {'Area', 'Year', 'Price', 'Demand'}
+        if df.empty or not required.issubset(df.columns):
+            return cls()
+
+        frame = df[['Area', 'Year', 'Price', 'Demand']].copy()
+        frame.index = pd.RangeIndex(len(frame))
+        frame = frame[frame['Area'].notna()]
+        frame['Price'] = pd.to_numeric(frame['Price'], errors='coerce')
+        frame['Demand'] = pd.to_numeric(frame['Demand'], errors='coerce')
+        areas = frame['Area']
+        if isinstance(areas.dtype, pd.CategoricalDtype):
+            # Normalize each distinct name once instead of once per row
+            keys = np.asarray([normalize_area(name) for name in areas.cat.categories.astype(str)], dtype=object)
+            frame['key'] = keys[areas.cat.codes.to_numpy()]
+        else:
+            frame['key'] = areas.astype(str).map(normalize_area)
+
+        grouped = frame.groupby(['key', 'Year'], sort=False)
+        buckets = grouped.agg(
+            rows=('Area', 'size'),
+            price_sum=('Price', 'sum'),
+            price_count=('Price', 'count'),
+            price_min=('Price', 'min'),
+            price_max=('Price', 'max'),
+            demand_sum=('Demand', 'sum'),
+            demand_count=('Demand', 'count'),
+            demand_min=('Demand', 'min'),
+            demand_max=('Demand', 'max'),
+        )
+
+        by_key = frame.groupby('key', sort=False)
+        names = by_key['Area'].first()
+        first_prices = by_key['Price'].first()
+        last_prices = by_key['Price'].last()
+        row_positions = frame.index.to_numpy()
+        positions = {key: row_positions[indices] for key, indices in by_key.indices.items()}
+
+        years_by_key: Dict[str, Dict[int, Dict[str, float]]] = {}
+        for (key, year), row in zip(buckets.index, buckets.to_dict('records')):
+            bucket = {
+                field: (None if pd.isna(value) else float(value))
+                for field, value in row.items()
+            }
+            years_by_key.setdefault(key, {})[int(year)] = bucket
+
+        areas = {}
+        for key, years in years_by_key.items():
+            first_price = first_prices.get(key)
+            last_price = last_prices.get(key)
+            areas[key] = AreaStats(
+                key,
+                str(names[key]).strip(),
+                years,
+                None if pd.isna(first_price) else float(first_price),
+                None if pd.isna(last_price) else float(last_price),
+                positions[key],
+            )
+        return cls(areas)
+
+    def get(self, area: str) -> Optional[AreaStats]:
+        """Look up the aggregates for an area name"""
+        return self.areas.get(normalize_area(area))
+
+    def get_many(self, areas: List[str]) -> Dict[str, Optional[AreaStats]]:
+        """Look up the aggregates for several area names; None for unknown areas"""
+        return {area: self.get(area) for area in areas}
+
+    def averages(self, areas: List[str]) -> Dict[str, Dict[str, Optional[float]]]:
+        """Average price and demand of each requested area that has records"""
+        result = {}
+        for area in areas:
+            stats = self.get(area)
+            if stats and stats.total_records:
+                result[area] = {'avg_price': stats.avg_price, 'avg_demand': stats.avg_demand}
+        return result
+
+    def yearly_buckets(self, areas: List[str]) -> pd.DataFrame:
+        """Yearly price and demand aggregates of the requested areas, one row per (area, year)"""
+        records = []
+        for area in areas:
+            stats = self.get(area)
+            if stats is None:
+                continue
+            for year, bucket in stats.years.items():
+                records.append((
+                    area, year, bucket['price_sum'], bucket['price_count'],
+                    bucket['demand_sum'], bucket['demand_count'],
+                ))
+        return pd.DataFrame.from_records(records, columns=BUCKET_COLUMNS)
+
+    def area_names(self) -> List[str]:
+        """Display names of all indexed areas"""
+        return [stats.name for stats in self.areas.values()]
+
+    def __len__(self):
+        return len(self.areas)
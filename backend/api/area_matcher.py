@@ -0,0 +1,126 @@
+import re
+from collections import deque
+from typing import Dict, List, Iterable, Tuple
+
+
+_TOKEN_RE = re.compile(r'\w+')
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase word tokens"""
+    return _TOKEN_RE.findall(str(text).lower())
+
+
+class AreaMatcher:
+    """Aho-Corasick automaton over area names, using words as the alphabet.
+
+    Matching on whole tokens means an area only matches on word boundaries
+    ("Ban" never matches inside "Baner"), and the query is scanned once no
+    matter how many areas are indexed. Build one matcher per data version.
+
+    ``aliases`` maps alternative spellings to area names; an alias matches
+    like an area and reports the area's name.
+    """
+
+    def __init__(self, area_names: Iterable[str], aliases: Dict[str, str] = None):
+        self.names: List[str] = []
+        # Normalized text of each pattern (area or alias), parallel to names
+        self.patterns: List[str] = []
+        self.lengths: List[int] = []
+        # Parallel arrays: goto edges, failure links and matched pattern ids
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[Tuple[int, ...]] = [()]
+
+        seen = set()
+        canonical = {}
+        for name in area_names:
+            tokens = tokenize(name)
+            key = tuple(tokens)
+            if not tokens or key in seen:
+                continue
+            seen.add(key)
+            canonical[key] = str(name)
+            self._add_pattern(tokens, str(name))
+
+        for alias, name in (aliases or {}).items():
+            key = tuple(tokenize(alias))
+            target = canonical.get(tuple(tokenize(name)))
+            # Aliases of areas missing from this data version are skipped
+            if key and target is not None and key not in seen:
+                seen.add(key)
+                self._add_pattern(list(key), target)
+
+        self._build_failure_links()
+
+    def _add_pattern(self, tokens: List[str], name: str):
+        self._add(tokens, len(self.names))
+        self.names.append(name)
+        self.patterns.append(' '.join(tokens))
+        self.lengths.append(len(tokens))
+
+    def _add(self, tokens: List[str], pattern_id: int):
+        """Insert one tokenized pattern into the trie"""
+        node = 0
+        for token in tokens:
+            nxt = self._goto[node].get(token)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][token] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+            node = nxt
+        self._out[node] = self._out[node] + (pattern_id,)
+
+    def _build_failure_links(self):
+        """Breadth-first pass computing failure links and merged outputs"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for token, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and token not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(token, 0)
+                self._fail[child] = target if target != child else 0
+                if self._out[self._fail[child]]:
+                    self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def find_all(self, query: str) -> List[Tuple[int, int, str]]:
+        """Return every (start_token, end_token, area) match in one pass"""
+        matches = []
+        node = 0
+        goto, fail, out = self._goto, self._fail, self._out
+        for position, token in enumerate(tokenize(query)):
+            while node and token not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(token, 0)
+            for pattern_id in out[node]:
+                start = position - self.lengths[pattern_id] + 1
+                matches.append((start, position + 1, self.names[pattern_id]))
+        return matches
+
+    def find_spans(self, query: str) -> List[Tuple[int, int, str]]:
+        """Return the (start_token, end_token, area) matches kept, in query order.
+
+        A match that lies inside a longer match ("Ambegaon" inside
+        "Ambegaon Budruk") is dropped in favour of the longer area.
+        """
+        matches = sorted(self.find_all(query), key=lambda m: (m[0], -(m[1] - m[0])))
+        kept = []
+        covered_until = 0
+        for start, end, name in matches:
+            if end <= covered_until:
+                continue
+            covered_until = max(covered_until, end)
+            kept.append((start, end, name))
+        return kept
+
+    def find_areas(self, query: str) -> List[str]:
+        """Return matched areas in query order, each once"""
+        return list(dict.fromkeys(name for _, _, name in self.find_spans(query)))
+
+    def __len__(self):
+        return len(set(self.names))
@@ -0,0 +1,225 @@
+import json
+import os
+import threading
+import time
+import numpy as np
+from django.conf import settings
+from typing import Dict, List, Any, Iterable, Optional, Set, Tuple
+from .area_matcher import AreaMatcher, tokenize
+
+
+# Words that steer the query; never read as a misspelt area
+QUERY_WORDS = frozenset({
+    'a', 'about', 'an', 'analysis', 'analyze', 'and', 'area', 'areas', 'at',
+    'average', 'between', 'chart', 'compare', 'comparison', 'data', 'demand',
+    'for', 'from', 'give', 'growth', 'how', 'in', 'is', 'last', 'locality', 'me',
+    'of', 'on', 'over', 'please', 'price', 'prices', 'rate', 'rates', 'sales',
+    'show', 'tell', 'the', 'to', 'trend', 'trends', 'versus', 'vs', 'what',
+    'with', 'year', 'years',
+})
+
+
+def trigrams(text: str) -> Set[str]:
+    """Character trigrams of normalized text, padded like pg_trgm"""
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def allowed_edits(length: int) -> int:
+    """Typos tolerated in a name of this many characters"""
+    if length < 4:
+        return 0
+    return 1 if length < 8 else 2
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Optimal string alignment distance (adjacent swaps cost one), capped.
+
+    Returns ``limit + 1`` as soon as the distance must exceed ``limit``.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+class TrigramIndex:
+    """Inverted index from character trigrams to pattern ids.
+
+    Candidates are scored by Dice similarity of their trigram sets with
+    one ``np.bincount`` over the matching posting lists, so a lookup costs
+    the same whatever the query word and stays cheap at 10k+ patterns.
+    """
+
+    def __init__(self, patterns: List[str]):
+        self.patterns = patterns
+        postings: Dict[str, List[int]] = {}
+        sizes = []
+        for pattern_id, pattern in enumerate(patterns):
+            grams = trigrams(pattern)
+            sizes.append(len(grams))
+            for gram in grams:
+                postings.setdefault(gram, []).append(pattern_id)
+        self.sizes = np.asarray(sizes, dtype=np.float32)
+        self.postings = {gram: np.asarray(ids, dtype=np.int32) for gram, ids in postings.items()}
+
+    def candidates(self, text: str, limit: int = 8, min_similarity: float = 0.25) -> List[Tuple[int, float]]:
+        """Up to ``limit`` (pattern_id, similarity) pairs, most similar first"""
+        grams = trigrams(text)
+        lists = [self.postings[gram] for gram in grams if gram in self.postings]
+        if not lists:
+            return []
+        shared = np.bincount(np.concatenate(lists), minlength=len(self.patterns))
+        similarity = 2.0 * shared / (self.sizes + len(grams))
+        limit = min(limit, len(self.patterns))
+        top = np.argpartition(-similarity, limit - 1)[:limit]
+        top = top[similarity[top] >= min_similarity]
+        top = top[np.argsort(-similarity[top], kind='stable')]
+        return [(int(pattern_id), float(similarity[pattern_id])) for pattern_id in top]
+
+    def __len__(self):
+        return len(self.patterns)
+
+
+def load_area_aliases(path: str = None) -> Dict[str, str]:
+    """Read the alias -> area JSON table; missing or invalid files give {}"""
+    path = path or settings.AREA_ALIASES_FILE
+    if not path or not os.path.exists(path):
+        return {}
+    try:
+        with open(path, encoding='utf-8') as handle:
+            aliases = json.load(handle)
+        return {str(alias): str(name) for alias, name in aliases.items()}
+    except Exception as e:
+        print(f"Error loading area aliases: {str(e)}")
+        return {}
+
+
+class AreaResolver:
+    """Area names in a query, tolerating typos and known aliases.
+
+    Exact and alias matches come from the word-level ``AreaMatcher``. Only
+    when that finds no area, a comparison finds just one, or an exact match
+    sits next to an unrecognised word (a misspelt "Ambegaon Budrk" matches
+    the area "Ambegaon") are word spans looked up in a ``TrigramIndex``; the
+    few candidates it returns are reranked by edit distance, and a span
+    resolves to the closest one within ``allowed_edits``. Fuzzy lookups
+    stop once the per-query budget is spent, so a long query never costs
+    more than ``budget_ms``. Build one resolver per data version.
+    """
+
+    def __init__(self, area_names: Iterable[str], aliases: Dict[str, str] = None,
+                 budget_ms: float = None, max_span_tokens: int = 3, candidates: int = 16):
+        self.matcher = AreaMatcher(area_names, aliases)
+        self.index = TrigramIndex(self.matcher.patterns)
+        self.budget_ms = settings.AREA_FUZZY_BUDGET_MS if budget_ms is None else budget_ms
+        self.max_span_tokens = max_span_tokens
+        self.candidate_limit = candidates
+        self._lock = threading.Lock()
+        self.counters = {
+            'lookups': 0,
+            'exact': 0,
+            'fuzzy': 0,
+            'unresolved': 0,
+            'budget_exceeded': 0,
+        }
+
+    @property
+    def names(self) -> List[str]:
+        return self.matcher.names
+
+    def _count(self, name: str):
+        with self._lock:
+            self.counters[name] += 1
+
+    def find_areas(self, query: str) -> List[str]:
+        """Return resolved areas in query order, each once"""
+        self._count('lookups')
+        tokens = tokenize(query)
+        spans = self.matcher.find_spans(query)
+        found = list(dict.fromkeys(name for _, _, name in spans))
+
+        fuzzy = []
+        if not found or (len(found) < 2 and 'compare' in tokens) or self._unmatched_neighbour(tokens, spans):
+            fuzzy = self.fuzzy_spans(tokens, spans)
+        self._count('fuzzy' if fuzzy else 'exact' if found else 'unresolved')
+        if not fuzzy:
+            return found
+        # A fuzzy match over a longer span replaces the exact match inside it
+        spans = [span for span in spans if not any(f[0] <= span[0] and span[1] <= f[1] for f in fuzzy)]
+        return list(dict.fromkeys(name for _, _, name in sorted(spans + fuzzy)))
+
+    @staticmethod
+    def _unmatched_neighbour(tokens: List[str], spans: List[Tuple[int, int, str]]) -> bool:
+        covered = {i for start, end, _ in spans for i in range(start, end)}
+        for start, end, _ in spans:
+            for i in (start - 1, end):
+                if 0 <= i < len(tokens) and i not in covered and tokens[i] not in QUERY_WORDS and not tokens[i].isdigit():
+                    return True
+        return False
+
+    def fuzzy_spans(self, tokens: List[str], exact: List[Tuple[int, int, str]] = ()) -> List[Tuple[int, int, str]]:
+        """(start_token, end_token, area) for spans close to an area.
+
+        Spans must include a word that is neither covered by an exact match
+        nor a query word, and may take in whole exact matches. Longer spans
+        are tried first at each position, so a misspelt two-word area wins
+        over a word inside it.
+        """
+        covered = {i for start, end, _ in exact for i in range(start, end)}
+        deadline = time.perf_counter() + self.budget_ms / 1000
+        resolved = []
+        start = 0
+        while start < len(tokens):
+            match = None
+            for end in range(min(len(tokens), start + self.max_span_tokens), start, -1):
+                span = tokens[start:end]
+                if span[0] in QUERY_WORDS or span[-1] in QUERY_WORDS:
+                    continue
+                if all(i in covered or tokens[i] in QUERY_WORDS for i in range(start, end)):
+                    continue
+                if any(m[0] < start < m[1] or m[0] < end < m[1] for m in exact):
+                    continue
+                if time.perf_counter() > deadline:
+                    self._count('budget_exceeded')
+                    return resolved
+                match = self.closest(' '.join(span))
+                if match is not None:
+                    resolved.append((start, end, match))
+                    start = end
+                    break
+            if match is None:
+                start += 1
+        return resolved
+
+    def closest(self, text: str) -> Optional[str]:
+        """Area whose name or alias is within the allowed edits of text, if any"""
+        if allowed_edits(len(text)) == 0 or text.isdigit():
+            return None
+        best, best_distance = None, None
+        for pattern_id, _ in self.index.candidates(text, self.candidate_limit):
+            pattern = self.index.patterns[pattern_id]
+            limit = min(allowed_edits(len(pattern)), allowed_edits(len(text)))
+            distance = edit_distance(text, pattern, limit)
+            # Candidates arrive most similar first, so ties keep the better trigram score
+            if distance <= limit and (best_distance is None or distance < best_distance):
+                best, best_distance = self.matcher.names[pattern_id], distance
+        return best
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self.counters, areas=len(self), patterns=len(self.index), budget_ms=self.budget_ms)
+
+    def __len__(self):
+        return len(self.matcher)
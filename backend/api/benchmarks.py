@@ -0,0 +1,474 @@
+import json
+import math
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Any
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.test import override_settings
+from django.utils.text import compress_string
+from pymongo import MongoClient
+from .area_matcher import AreaMatcher
+from .area_resolver import AreaResolver
+from .chunked_ingest import ChunkedIngester
+from .comparison import build_comparison
+from .compact import compact_frame, compaction_report
+from .data_store import Dataset
+from .mongo_engine import MongoDatasetStore
+from .mongodb_service import MongoDBService, cursor_to_frame
+from .renderers import ColumnarJSONRenderer, FastJSONRenderer, MessagePackRenderer, msgpack, orjson
+from .serialization import frame_to_columns, frame_to_records
+from .snapshot import read_snapshot, write_snapshot
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - the brotli cases are then skipped
+    brotli = None
+
+try:
+    import mongomock
+except ImportError:  # pragma: no cover - the MongoDB suites then need a real server
+    mongomock = None
+
+
+_SYLLABLES = [
+    'wa', 'kad', 'aun', 'dh', 'am', 'be', 'gaon', 'bud', 'ruk', 'ak', 'ur', 'di',
+    'ba', 'ner', 'hin', 'je', 'wa', 'di', 'kot', 'hrud', 'pim', 'ple', 'sau', 'da',
+    'gar', 'ra', 'vet', 'kha', 'ra', 'di', 'na', 'gar', 'vi', 'man', 'ta', 'thi',
+]
+
+
+def generate_area_names(count: int, seed: int = 42) -> List[str]:
+    """Generate unique, realistic-looking locality names"""
+    rng = random.Random(seed)
+    names = set()
+    while len(names) < count:
+        words = []
+        for _ in range(rng.choice((1, 1, 2, 2, 3))):
+            word = ''.join(rng.choice(_SYLLABLES) for _ in range(rng.randint(2, 4)))
+            words.append(word.capitalize())
+        names.add(' '.join(words))
+    return sorted(names)
+
+
+def generate_dataset(rows: int, areas: int = 100, seed: int = 42) -> pd.DataFrame:
+    """Generate a synthetic sheet shaped like real_estate_data.xlsx"""
+    rng = np.random.default_rng(seed)
+    names = np.array(generate_area_names(areas, seed))
+    area_codes = rng.integers(0, areas, rows)
+    base_price = rng.uniform(3_000_000, 15_000_000, areas)
+    years = rng.integers(2015, 2025, rows)
+    growth = 1 + 0.06 * (years - 2015)
+
+    df = pd.DataFrame({
+        'Year': years,
+        'Area': names[area_codes],
+        'Price': (base_price[area_codes] * growth * rng.uniform(0.85, 1.15, rows)).round(-3),
+        'Demand': rng.integers(30, 100, rows).astype(float),
+        'Size': rng.integers(450, 3000, rows),
+        'Property_Type': rng.choice(['Apartment', 'Villa', 'Row House', 'Plot'], rows),
+    })
+    # Real sheets have gaps
+    df.loc[rng.random(rows) < 0.02, 'Demand'] = np.nan
+    return df
+
+
+def legacy_table_records(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """The original per-cell conversion loop from get_filtered_table"""
+    table_data = df.to_dict('records')
+    for record in table_data:
+        for key, value in record.items():
+            if pd.isna(value):
+                record[key] = None
+            elif isinstance(value, (pd.Timestamp, pd.DatetimeTZDtype)):
+                record[key] = str(value)
+            elif hasattr(value, 'item'):
+                record[key] = value.item()
+    return table_data
+
+
+def time_call(func: Callable, repeat: int) -> float:
+    """Average wall time of ``func`` in microseconds"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def bench_area_matcher(sizes=(100, 10_000, 100_000), repeat: int = 20) -> List[Dict[str, Any]]:
+    """Compare the Aho-Corasick matcher with the old per-area substring loop"""
+    results = []
+    for size in sizes:
+        names = generate_area_names(size)
+        lowered = [name.lower() for name in names]
+        query = f"compare {lowered[size // 3]} and {lowered[-1]} price trends over the last 3 years"
+
+        start = time.perf_counter()
+        matcher = AreaMatcher(names)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        def substring_loop():
+            return [name for name, low in zip(names, lowered) if low in query]
+
+        results.append({
+            'areas': size,
+            'build_ms': round(build_ms, 2),
+            'loop_us': round(time_call(substring_loop, repeat), 1),
+            'matcher_us': round(time_call(lambda: matcher.find_areas(query), repeat), 1),
+        })
+    return results
+
+
+def make_typo(name: str, rng: random.Random) -> str:
+    """One dropped, doubled, swapped or replaced letter"""
+    positions = [i for i, char in enumerate(name) if char.isalpha()]
+    i = rng.choice(positions[1:-1] or positions)
+    kind = rng.choice(('drop', 'double', 'swap', 'replace'))
+    if kind == 'drop':
+        return name[:i] + name[i + 1:]
+    if kind == 'double':
+        return name[:i] + name[i] + name[i:]
+    if kind == 'swap' and i + 1 < len(name) and name[i + 1].isalpha():
+        return name[:i] + name[i + 1] + name[i] + name[i + 2:]
+    return name[:i] + rng.choice('aeiou'.replace(name[i], '')) + name[i + 1:]
+
+
+def bench_area_resolution(sizes=(1_000, 10_000), sample: int = 300, seed: int = 7) -> List[Dict[str, Any]]:
+    """Exact vs typo-tolerant area lookup latency and typo accuracy"""
+    results = []
+    for size in sizes:
+        rng = random.Random(seed)
+        names = generate_area_names(size)
+
+        start = time.perf_counter()
+        resolver = AreaResolver(names, budget_ms=50)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        targets = [name for name in rng.sample(names, min(sample, size)) if len(name) >= 4]
+        cases = {
+            'exact': [(f"give me analysis of {name.lower()}", name) for name in targets],
+            'typo': [(f"give me analysis of {make_typo(name.lower(), rng)}", name) for name in targets],
+            'no_area': [("show the price trend for the city over the last 3 years", None)] * len(targets),
+        }
+        row = {'areas': size, 'build_ms': round(build_ms, 1)}
+        for label, queries in cases.items():
+            timings, correct = [], 0
+            for query, expected in queries:
+                begin = time.perf_counter()
+                found = resolver.find_areas(query)
+                timings.append((time.perf_counter() - begin) * 1e6)
+                correct += found == ([expected] if expected else [])
+            row[f'{label}_p50_us'] = round(float(np.percentile(timings, 50)), 1)
+            row[f'{label}_p95_us'] = round(float(np.percentile(timings, 95)), 1)
+            row[f'{label}_accuracy'] = round(correct / len(queries), 3)
+        results.append(row)
+    return results
+
+
+def bench_table_serialization(sizes=(50, 5_000, 500_000)) -> List[Dict[str, Any]]:
+    """Compare the per-cell loop with vectorized records/columns and JSON encoders"""
+    results = []
+    for size in sizes:
+        df = generate_dataset(size)
+        repeat = max(1, 20_000 // size)
+        records = frame_to_records(df)
+        row = {
+            'rows': size,
+            'legacy_loop_ms': round(time_call(lambda: legacy_table_records(df), repeat) / 1000, 2),
+            'records_ms': round(time_call(lambda: frame_to_records(df), repeat) / 1000, 2),
+            'columns_ms': round(time_call(lambda: frame_to_columns(df), repeat) / 1000, 2),
+            'json_encode_ms': round(time_call(lambda: json.dumps(records), repeat) / 1000, 2),
+        }
+        if orjson is not None:
+            row['orjson_encode_ms'] = round(time_call(lambda: orjson.dumps(records), repeat) / 1000, 2)
+        results.append(row)
+    return results
+
+
+def bench_snapshot(sizes=(1_000, 10_000, 100_000)) -> List[Dict[str, Any]]:
+    """Cold start from the xlsx workbook versus from the memory-mapped snapshot"""
+    results = []
+    with tempfile.TemporaryDirectory() as tmp, override_settings(SNAPSHOT_DIR=tmp):
+        for size in sizes:
+            df = generate_dataset(size)
+            excel_path = os.path.join(tmp, f'data_{size}.xlsx')
+            df.to_excel(excel_path, index=False)
+            version = f'bench{size}'
+
+            start = time.perf_counter()
+            from_excel = pd.read_excel(excel_path)
+            xlsx_ms = (time.perf_counter() - start) * 1000
+
+            start = time.perf_counter()
+            write_snapshot(from_excel, version, 'excel')
+            convert_ms = (time.perf_counter() - start) * 1000
+
+            start = time.perf_counter()
+            from_snapshot = read_snapshot(version)
+            # Touch every value so mapped pages are actually read
+            float(from_snapshot['Price'].sum())
+            snapshot_ms = (time.perf_counter() - start) * 1000
+
+            results.append({
+                'rows': size,
+                'xlsx_bytes': os.path.getsize(excel_path),
+                'cold_xlsx_ms': round(xlsx_ms, 1),
+                'convert_ms': round(convert_ms, 1),
+                'cold_snapshot_ms': round(snapshot_ms, 2),
+                'speedup': round(xlsx_ms / snapshot_ms, 1) if snapshot_ms else None,
+            })
+    return results
+
+
+class _NullCollection:
+    """Collection stand-in that drops inserted documents, so only reading is measured"""
+
+    def insert_many(self, records, ordered=True):
+        return SimpleNamespace(inserted_ids=range(len(records)))
+
+
+def _peak_memory(func: Callable):
+    """Run ``func`` and return (result, seconds, peak traced bytes)"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        result = func()
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def bench_ingest(sizes=(10_000, 100_000), chunk_size: int = 5_000) -> List[Dict[str, Any]]:
+    """Whole-file pandas reads versus chunked streaming into bulk batches"""
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            df = generate_dataset(size)
+            paths = {
+                'xlsx': os.path.join(tmp, f'data_{size}.xlsx'),
+                'csv': os.path.join(tmp, f'data_{size}.csv'),
+            }
+            df.to_excel(paths['xlsx'], index=False)
+            df.to_csv(paths['csv'], index=False)
+            readers = {'xlsx': pd.read_excel, 'csv': pd.read_csv}
+
+            for kind, path in paths.items():
+                # The old path: whole frame, then every row as a dict at once
+                _, full_s, full_peak = _peak_memory(
+                    lambda: readers[kind](path).to_dict('records')
+                )
+                ingester = ChunkedIngester(_NullCollection(), chunk_size=chunk_size)
+                stats, chunked_s, chunked_peak = _peak_memory(lambda: ingester.ingest(path))
+                results.append({
+                    'rows': size,
+                    'format': kind,
+                    'chunk_size': chunk_size,
+                    'full_rows_per_s': round(size / full_s),
+                    'chunked_rows_per_s': round(stats['rows_read'] / chunked_s),
+                    'full_peak_mb': round(full_peak / 2**20, 1),
+                    'chunked_peak_mb': round(chunked_peak / 2**20, 1),
+                })
+    return results
+
+
+def bench_cursor_frame(sizes=(100_000, 500_000), batch_size: int = 5_000) -> List[Dict[str, Any]]:
+    """list(cursor) + DataFrame versus batched frame construction from a cursor"""
+    results = []
+    for size in sizes:
+        documents = generate_dataset(size).to_dict('records')
+        # A cursor decodes a fresh dict per document
+        cursor = lambda: (dict(document) for document in documents)
+        _, list_s, list_peak = _peak_memory(lambda: pd.DataFrame(list(cursor())))
+        _, batch_s, batch_peak = _peak_memory(lambda: cursor_to_frame(cursor(), batch_size))
+        results.append({
+            'documents': size,
+            'batch_size': batch_size,
+            'list_ms': round(list_s * 1000, 1),
+            'batched_ms': round(batch_s * 1000, 1),
+            'list_peak_mb': round(list_peak / 2**20, 1),
+            'batched_peak_mb': round(batch_peak / 2**20, 1),
+        })
+    return results
+
+
+def _same(a, b) -> bool:
+    """Deep equality that tolerates float summation order"""
+    if isinstance(a, dict) and isinstance(b, dict):
+        return a.keys() == b.keys() and all(_same(a[key], b[key]) for key in a)
+    if isinstance(a, (list, tuple)) and isinstance(b, (list, tuple)):
+        return len(a) == len(b) and all(_same(x, y) for x, y in zip(a, b))
+    if isinstance(a, (int, float)) and isinstance(b, (int, float)):
+        return math.isclose(a, b, rel_tol=1e-9)
+    return a == b
+
+
+def _engine_answers(dataset, areas: List[str]) -> Dict[str, Any]:
+    """Everything the analyzer asks a dataset for, for a sample of areas"""
+    answers = {'averages': dataset.area_index.averages(areas)}
+    for area in areas:
+        stats = dataset.area_index.get(area)
+        answers[area] = {
+            'stats': stats.summary_stats(),
+            'row_count': stats.row_count,
+            'price_trend': stats.price_trend,
+            'demand_trend': stats.demand_trend,
+            'table': frame_to_records(dataset.area_rows(stats, 50)),
+            'page': dataset.table_pager.page(area, sort='-Price', columns=['Year', 'Price', 'Demand'], limit=20),
+        }
+    answers['comparison'] = build_comparison(areas, dataset.area_index.yearly_buckets(areas))
+    return answers
+
+
+def bench_query_engine(sizes=(2_000, 20_000), sample: int = 10) -> List[Dict[str, Any]]:
+    """In-memory engine versus MongoDB pipelines: per-area latency and result parity.
+
+    Uses MONGODB_URI (a separate ``benchmark`` database) when set and
+    mongomock otherwise. mongomock evaluates pipelines in Python without
+    indexes, so its latencies only show that the queries run.
+    """
+    if settings.MONGODB_URI:
+        client = MongoClient(settings.MONGODB_URI)
+    elif mongomock is not None:
+        client = mongomock.MongoClient()
+    else:
+        return [{'skipped': 'set MONGODB_URI or install mongomock'}]
+
+    results = []
+    for size in sizes:
+        df = generate_dataset(size)
+        service = MongoDBService(client=client, database='benchmark')
+        service.replace_data(df, bump_version=False)
+        memory = Dataset(compact_frame(df), 'bench', 'bench', 0)
+        mongo = MongoDatasetStore(service)._load('bench')
+        areas = memory.area_index.area_names()[:sample]
+
+        start = time.perf_counter()
+        expected = _engine_answers(memory, areas)
+        memory_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        actual = _engine_answers(mongo, areas)
+        mongo_ms = (time.perf_counter() - start) * 1000
+
+        results.append({
+            'rows': size,
+            'areas': len(areas),
+            'memory_ms_per_area': round(memory_ms / len(areas), 2),
+            'mongo_ms_per_area': round(mongo_ms / len(areas), 2),
+            'backend': 'mongod' if settings.MONGODB_URI else 'mongomock',
+            'results_match': _same(expected, actual),
+        })
+    client.drop_database('benchmark')
+    return results
+
+
+def legacy_compare(df: pd.DataFrame, areas: List[str]) -> Dict[str, Any]:
+    """The original compare_areas: a str.contains scan and two means per area"""
+    comparison = {'price_comparison': [], 'demand_comparison': []}
+    for area in areas:
+        area_data = df[df['Area'].str.contains(area, case=False, na=False)]
+        if not area_data.empty:
+            comparison['price_comparison'].append({'area': area, 'avg_price': float(area_data['Price'].mean())})
+            comparison['demand_comparison'].append({'area': area, 'avg_demand': float(area_data['Demand'].mean())})
+    return comparison
+
+
+def bench_comparison(sizes=(100_000, 1_000_000), areas: int = 20, repeat: int = 5) -> List[Dict[str, Any]]:
+    """Per-area scans versus one vectorized pass over the index's yearly buckets"""
+    results = []
+    for size in sizes:
+        dataset = Dataset(generate_dataset(size, areas=500), 'bench', 'bench', 0)
+        names = dataset.area_index.area_names()[:areas]
+        results.append({
+            'rows': size,
+            'areas': len(names),
+            'legacy_ms': round(time_call(lambda: legacy_compare(dataset.df, names), repeat) / 1000, 2),
+            'vectorized_ms': round(time_call(
+                lambda: build_comparison(names, dataset.area_index.yearly_buckets(names)), repeat
+            ) / 1000, 2),
+        })
+    return results
+
+
+def bench_compact(sizes=(100_000, 1_000_000), sample: int = 50, repeat: int = 5) -> List[Dict[str, Any]]:
+    """Dataset memory and per-area table rows before and after ``compact_frame``"""
+    results = []
+    for size in sizes:
+        # Object columns, as read_excel and Mongo cursors produce them
+        raw = generate_dataset(size, areas=500).astype({'Area': object})
+        start = time.perf_counter()
+        compacted = compact_frame(raw)
+        compact_ms = (time.perf_counter() - start) * 1000
+
+        row = {'case': f'compact@{size}', **compaction_report(raw, compacted), 'compact_ms': round(compact_ms, 1)}
+        row.pop('dtypes')
+        for label, df in (('raw', raw), ('compact', compacted)):
+            dataset = Dataset(df, 'bench', 'bench', 0)
+            areas = [dataset.area_index.get(name) for name in dataset.area_index.area_names()[:sample]]
+            # The table path: an area's first rows as records
+            row[f'{label}_table_ms'] = round(time_call(
+                lambda: [frame_to_records(dataset.area_rows(stats, 200)) for stats in areas], repeat
+            ) / 1000 / len(areas), 3)
+        results.append(row)
+    return results
+
+
+def area_payload(rows: int) -> Dict[str, Any]:
+    """A single-area /api/query/ answer whose table holds ``rows`` rows"""
+    dataset = Dataset(compact_frame(generate_dataset(rows, areas=1)), 'bench', 'bench', 0)
+    stats = dataset.area_index.get(dataset.area_index.area_names()[0])
+    return {
+        'success': True,
+        'summary': 'Real Estate Analysis. ' * 30,
+        'chart_data': {'type': 'both', 'data': {'price': stats.price_trend, 'demand': stats.demand_trend}},
+        'table_data': frame_to_records(dataset.area_rows(stats, rows)),
+        'table_total': rows,
+        'table_next_cursor': None,
+        'area': stats.name,
+    }
+
+
+def bench_wire_formats(sizes=(50, 500, 5_000), repeat: int = 20) -> List[Dict[str, Any]]:
+    """Payload bytes and encode time per wire format, raw and compressed"""
+    renderers = {'json': FastJSONRenderer(), 'columnar': ColumnarJSONRenderer()}
+    if msgpack is not None:
+        renderers['msgpack'] = MessagePackRenderer()
+    compressors = {'gzip': compress_string}
+    if brotli is not None:
+        compressors['br'] = lambda body: brotli.compress(body, quality=5)
+
+    results = []
+    for size in sizes:
+        payload = area_payload(size)
+        for name, renderer in renderers.items():
+            body = renderer.render(payload)
+            row = {
+                'case': f'{name}@{size}',
+                'bytes': len(body),
+                'encode_ms': round(time_call(lambda: renderer.render(payload), repeat) / 1000, 3),
+            }
+            for encoding, compress in compressors.items():
+                row[f'{encoding}_bytes'] = len(compress(body))
+                row[f'{encoding}_ms'] = round(time_call(lambda: compress(body), repeat) / 1000, 3)
+            results.append(row)
+    return results
+
+
+SUITES = {
+    'area_matcher': bench_area_matcher,
+    'area_resolution': bench_area_resolution,
+    'table_serialization': bench_table_serialization,
+    'snapshot': bench_snapshot,
+    'ingest': bench_ingest,
+    'query_engine': bench_query_engine,
+    'cursor_frame': bench_cursor_frame,
+    'comparison': bench_comparison,
+    'compact': bench_compact,
+    'wire_formats': bench_wire_formats,
+}
@@ -0,0 +1,185 @@
+import os
+import time
+import pandas as pd
+from openpyxl import load_workbook
+from django.conf import settings
+from typing import Callable, Dict, Any, Iterator, List, Tuple
+from .area_index import normalize_area
+from .compact import compact_frame, concat_compact
+
+
+REQUIRED_COLUMNS = ('Area', 'Year', 'Price', 'Demand')
+SUPPORTED_EXTENSIONS = ('.xlsx', '.xls', '.csv')
+
+
+def iter_chunks(path: str, chunk_size: int = None) -> Iterator[pd.DataFrame]:
+    """Yield the rows of an xlsx/xls/csv file as DataFrames of ``chunk_size`` rows.
+
+    xlsx is read with openpyxl in read-only mode and CSV with pandas'
+    chunked reader, so only one chunk is held in memory at a time. Legacy
+    .xls (read with xlrd) has no streaming reader and is parsed in one go.
+    """
+    chunk_size = chunk_size or settings.INGEST_CHUNK_SIZE
+    extension = os.path.splitext(path)[1].lower()
+
+    if extension == '.csv':
+        for chunk in pd.read_csv(path, chunksize=chunk_size):
+            chunk.columns = chunk.columns.str.strip()
+            yield chunk
+        return
+
+    if extension == '.xls':
+        df = pd.read_excel(path)
+        df.columns = df.columns.str.strip()
+        for start in range(0, len(df), chunk_size):
+            yield df.iloc[start:start + chunk_size]
+        return
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [str(name).strip() if name is not None else '' for name in header]
+
+        buffer: List[Tuple] = []
+        for row in rows:
+            # Read-only sheets often report trailing blank rows
+            if all(value is None for value in row):
+                continue
+            buffer.append(row)
+            if len(buffer) >= chunk_size:
+                yield pd.DataFrame(buffer, columns=columns)
+                buffer = []
+        if buffer:
+            yield pd.DataFrame(buffer, columns=columns)
+    finally:
+        workbook.close()
+
+
+def to_documents(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """Turn a chunk into Mongo documents keyed for indexed area lookups.
+
+    Missing values become null so Mongo's $sum/$avg/$min skip them the
+    way pandas skips NaN.
+    """
+    if 'Area' in df.columns:
+        df = df.assign(area_key=[
+            None if pd.isna(area) else normalize_area(area) for area in df['Area']
+        ])
+    df = df.astype(object).where(df.notna(), None)
+    return df.to_dict('records')
+
+
+def validate_columns(df: pd.DataFrame):
+    """Raise ValueError when required columns are missing"""
+    missing = [column for column in REQUIRED_COLUMNS if column not in df.columns]
+    if missing:
+        raise ValueError(f"Missing required column(s): {', '.join(missing)}")
+
+
+def normalize_frame(df: pd.DataFrame) -> Tuple[pd.DataFrame, int]:
+    """Coerce types and drop rows that cannot be analyzed.
+
+    Returns the cleaned frame and the number of rejected rows.
+    """
+    df = df.copy()
+    df['Area'] = df['Area'].where(df['Area'].isna(), df['Area'].astype(str).str.strip())
+    df['Year'] = pd.to_numeric(df['Year'], errors='coerce')
+    df['Price'] = pd.to_numeric(df['Price'], errors='coerce')
+    df['Demand'] = pd.to_numeric(df['Demand'], errors='coerce')
+
+    valid = df['Area'].notna() & (df['Area'] != '') & df['Year'].notna()
+    df = df[valid].reset_index(drop=True)
+    df['Year'] = df['Year'].astype('int64')
+    return df, int((~valid).sum())
+
+
+class ChunkedIngester:
+    """Stream a file into a Mongo collection one bulk batch per chunk.
+
+    Memory stays bounded by the chunk size regardless of file size.
+    """
+
+    def __init__(self, collection, chunk_size: int = None, ordered: bool = False):
+        self.collection = collection
+        self.chunk_size = chunk_size or settings.INGEST_CHUNK_SIZE
+        self.ordered = ordered
+
+    def ingest(self, path: str, normalize: bool = False) -> Dict[str, Any]:
+        """Insert ``path`` chunk by chunk and return throughput stats.
+
+        With ``normalize`` the required columns are checked and each chunk
+        is cleaned before it is written; otherwise rows are copied as-is.
+        """
+        stats = {'rows_read': 0, 'rows_written': 0, 'rows_rejected': 0, 'chunks': 0}
+        start = time.perf_counter()
+
+        for chunk in iter_chunks(path, self.chunk_size):
+            chunk_rows = len(chunk)
+            rejected = 0
+            if normalize:
+                if stats['chunks'] == 0:
+                    validate_columns(chunk)
+                chunk, rejected = normalize_frame(chunk)
+            stats['chunks'] += 1
+            stats['rows_read'] += chunk_rows
+            stats['rows_rejected'] += rejected
+            stats['rows_written'] += self.write(chunk)
+
+        elapsed = time.perf_counter() - start
+        stats['seconds'] = round(elapsed, 3)
+        stats['rows_per_second'] = round(stats['rows_read'] / elapsed, 1) if elapsed else None
+        return stats
+
+    def write(self, df: pd.DataFrame) -> int:
+        """Insert one chunk as a single bulk batch"""
+        if df.empty:
+            return 0
+        records = to_documents(df)
+        result = self.collection.insert_many(records, ordered=self.ordered)
+        return len(result.inserted_ids)
+
+    def write_frame(self, df: pd.DataFrame) -> Dict[str, Any]:
+        """Insert an in-memory frame in chunk-sized batches; return throughput stats"""
+        start = time.perf_counter()
+        written = 0
+        for offset in range(0, len(df), self.chunk_size):
+            written += self.write(df.iloc[offset:offset + self.chunk_size])
+        elapsed = time.perf_counter() - start
+        return {
+            'rows_written': written,
+            'seconds': round(elapsed, 3),
+            'rows_per_second': round(written / elapsed, 1) if elapsed else None,
+        }
+
+
+def read_frame(path: str, chunk_size: int = None,
+               on_chunk: Callable[[pd.DataFrame], None] = None) -> Tuple[pd.DataFrame, int, int]:
+    """Read, normalize and compact a whole file chunk by chunk.
+
+    ``on_chunk`` receives each cleaned chunk as soon as it is read, e.g. to
+    write it to Mongo. Chunks are then kept only in compact form, so raw
+    rows never pile up. The result is compacted and sorted like any loaded
+    frame and returned with the counts of rows read and rejected.
+    """
+    compacted = []
+    rows_read = rows_rejected = 0
+    for chunk in iter_chunks(path, chunk_size):
+        if not rows_read:
+            validate_columns(chunk)
+        clean, rejected = normalize_frame(chunk)
+        rows_read += len(chunk)
+        rows_rejected += rejected
+        if clean.empty:
+            continue
+        if on_chunk:
+            on_chunk(clean)
+        compacted.append(compact_frame(clean))
+
+    if not rows_read:
+        raise ValueError('The uploaded file has no rows')
+    if not compacted:
+        return pd.DataFrame(), rows_read, rows_rejected
+    return compact_frame(concat_compact(compacted)), rows_read, rows_rejected
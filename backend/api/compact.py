@@ -0,0 +1,149 @@
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+from typing import Dict, List, Any, Optional
+from .area_index import normalize_area
+
+
+# Text columns with at most this share of distinct values become categoricals
+CATEGORY_MAX_RATIO = 0.5
+
+
+def frame_memory(df: pd.DataFrame) -> int:
+    """Bytes held by a frame, string contents included"""
+    return int(df.memory_usage(deep=True).sum()) if not df.empty else 0
+
+
+def _smallest_int(series: pd.Series, values: np.ndarray) -> Optional[pd.Series]:
+    """``values`` in the narrowest signed integer type that holds them, if any"""
+    low, high = (values.min(), values.max()) if len(values) else (0, 0)
+    for dtype in (np.int8, np.int16, np.int32, np.int64):
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            if series.dtype == dtype:
+                return series
+            return pd.Series(values.astype(dtype), index=series.index, name=series.name)
+    return None
+
+
+def _downcast(series: pd.Series) -> pd.Series:
+    """Smallest numeric dtype that holds every value exactly"""
+    if pd.api.types.is_bool_dtype(series.dtype) or pd.api.types.is_extension_array_dtype(series.dtype):
+        return series
+    if pd.api.types.is_integer_dtype(series.dtype):
+        narrowed = _smallest_int(series, series.to_numpy())
+        return series if narrowed is None else narrowed
+
+    values = series.to_numpy(dtype=np.float64)
+    missing = np.isnan(values)
+    if not missing.any() and np.array_equal(values, np.trunc(values)) and np.abs(values).max(initial=0) < 2 ** 31:
+        return _smallest_int(series, values.astype(np.int64))
+    # float32 only when it round-trips, so averages and payloads do not change
+    narrowed = values.astype(np.float32)
+    if np.array_equal(narrowed.astype(np.float64), values, equal_nan=True):
+        return pd.Series(narrowed, index=series.index, name=series.name)
+    return series.astype(np.float64)
+
+
+def _compact_column(name: str, series: pd.Series) -> pd.Series:
+    dtype = series.dtype
+    if isinstance(dtype, pd.CategoricalDtype) or pd.api.types.is_datetime64_any_dtype(dtype):
+        return series
+    if name == 'Area':
+        return series.astype('category')
+    if pd.api.types.is_numeric_dtype(dtype):
+        return _downcast(series)
+
+    # Numbers that arrived as objects (mixed Mongo/Excel types) become numeric
+    numeric = pd.to_numeric(series, errors='coerce')
+    if numeric.notna().sum() == series.notna().sum() and numeric.notna().any():
+        return _downcast(numeric)
+
+    if series.nunique(dropna=True) <= CATEGORY_MAX_RATIO * len(series):
+        return series.astype('category')
+    return series
+
+
+def _sort_order(df: pd.DataFrame) -> Optional[np.ndarray]:
+    """Row order by (area key, year), or None when the frame is already in it.
+
+    The sort is stable, so rows tied on both keep their order.
+    """
+    areas = df['Area'].cat
+    keys = pd.Categorical(areas.categories.map(normalize_area))
+    # Rows without an area (code -1) sort after every key
+    key_codes = np.append(keys.codes, len(keys.categories))[areas.codes.to_numpy()]
+    years = pd.to_numeric(df['Year'], errors='coerce').to_numpy(dtype=np.float64) if 'Year' in df else np.zeros(len(df))
+    years = np.where(np.isnan(years), np.inf, years)
+
+    # A linear check is much cheaper than sorting frames that are already in order
+    key_steps, year_steps = np.diff(key_codes), np.diff(years)
+    if np.all((key_steps > 0) | ((key_steps == 0) & (year_steps >= 0))):
+        return None
+    return np.lexsort((years, key_codes))
+
+
+def compact_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Shrink a loaded frame and sort it so every area is one contiguous slice.
+
+    ``Area`` and other low-cardinality text columns become categoricals,
+    ``Year`` and the numeric columns are downcast without losing precision,
+    and rows are ordered by (area, year). Frames that are already compact
+    (e.g. memory-mapped snapshots) are returned without copying.
+    """
+    if df.empty or 'Area' not in df.columns:
+        return df
+
+    columns = {}
+    changed = False
+    for position, name in enumerate(df.columns):
+        series = df.iloc[:, position]
+        compacted = _compact_column(str(name), series)
+        if compacted.dtype == series.dtype:
+            compacted = series
+        changed = changed or compacted is not series
+        columns[position] = compacted
+    if changed:
+        compacted_df = pd.DataFrame(columns, index=df.index)
+        compacted_df.columns = df.columns
+        df = compacted_df
+
+    order = _sort_order(df)
+    if order is not None:
+        df = df.take(order)
+    if changed or not isinstance(df.index, pd.RangeIndex) or df.index.start != 0:
+        df = df.reset_index(drop=True)
+    return df
+
+
+def concat_compact(frames: List[pd.DataFrame]) -> pd.DataFrame:
+    """Concatenate compact frames, keeping shared categorical columns categorical.
+
+    ``pd.concat`` turns categoricals with different categories into object
+    columns; here their categories are unioned instead, so the combined
+    frame never holds one string object per row.
+    """
+    if len(frames) == 1:
+        return frames[0]
+    columns = {}
+    for position in range(frames[0].shape[1]):
+        parts = [frame.iloc[:, position] for frame in frames]
+        if all(isinstance(part.dtype, pd.CategoricalDtype) for part in parts):
+            columns[position] = pd.Series(union_categoricals(parts))
+        else:
+            columns[position] = pd.concat(parts, ignore_index=True)
+    df = pd.DataFrame(columns)
+    df.columns = frames[0].columns
+    return df
+
+
+def compaction_report(before: pd.DataFrame, after: pd.DataFrame) -> Dict[str, Any]:
+    """Memory and dtypes before and after ``compact_frame``"""
+    before_bytes, after_bytes = frame_memory(before), frame_memory(after)
+    return {
+        'rows': len(after),
+        'before_bytes': before_bytes,
+        'after_bytes': after_bytes,
+        'ratio': round(before_bytes / after_bytes, 1) if after_bytes else None,
+        'dtypes': {str(name): str(dtype) for name, dtype in after.dtypes.items()},
+    }
@@ -0,0 +1,108 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Any, Optional
+
+
+# Columns of the per-(area, year) buckets a comparison is computed from
+BUCKET_COLUMNS = ['area', 'year', 'price_sum', 'price_count', 'demand_sum', 'demand_count']
+
+
+def _value(value) -> Optional[float]:
+    return None if value is None or np.isnan(value) else float(value)
+
+
+def _ratio(total: np.ndarray, count: np.ndarray) -> np.ndarray:
+    """Elementwise mean, NaN where there is nothing to average"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(count > 0, total / np.where(count > 0, count, 1), np.nan)
+
+
+def _rank(values: np.ndarray) -> np.ndarray:
+    """1 for the highest value; areas without a value are not ranked"""
+    return pd.Series(values).rank(ascending=False, method='min').to_numpy()
+
+
+def _cagr(series: np.ndarray, years: np.ndarray):
+    """Compound annual growth between each row's first and last year with data"""
+    present = ~np.isnan(series)
+    has_data = present.any(axis=1)
+    first_index = present.argmax(axis=1)
+    last_index = series.shape[1] - 1 - present[:, ::-1].argmax(axis=1)
+    rows = np.arange(series.shape[0])
+    first, last = series[rows, first_index], series[rows, last_index]
+    first_year = np.where(has_data, years[first_index], np.nan)
+    last_year = np.where(has_data, years[last_index], np.nan)
+
+    span = last_year - first_year
+    valid = has_data & (span > 0) & (first > 0) & (last > 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cagr = np.where(valid, (last / np.where(valid, first, 1)) ** (1 / np.where(valid, span, 1)) - 1, np.nan)
+    return cagr, first_year, last_year
+
+
+def build_comparison(areas: List[str], buckets: pd.DataFrame) -> Dict[str, Any]:
+    """Compare areas from their yearly buckets in one vectorized pass.
+
+    ``buckets`` has one row per (area, year) with the additive price and
+    demand aggregates. They are scattered into area-by-year matrices over
+    the union of years, so every area's series lines up, and averages,
+    CAGR and ranks are then computed for all areas at once. Areas without
+    records are left out; the rest keep the requested order.
+    """
+    known = set(buckets['area'].unique())
+    present = [area for area in dict.fromkeys(areas) if area in known]
+    if not present:
+        return {'years': [], 'areas': [], 'price_trends': [], 'demand_trends': []}
+
+    buckets = buckets[buckets['area'].isin(present)]
+    years = np.unique(buckets['year'].to_numpy(dtype=np.int64))
+    area_codes = pd.Categorical(buckets['area'], categories=present).codes
+    year_codes = np.searchsorted(years, buckets['year'].to_numpy(dtype=np.int64))
+
+    shape = (len(present), len(years))
+    sums = {}
+    for column in ('price_sum', 'price_count', 'demand_sum', 'demand_count'):
+        matrix = np.zeros(shape)
+        np.add.at(matrix, (area_codes, year_codes), buckets[column].to_numpy(dtype=float))
+        sums[column] = matrix
+
+    price = _ratio(sums['price_sum'], sums['price_count'])
+    demand = _ratio(sums['demand_sum'], sums['demand_count'])
+    avg_price = _ratio(sums['price_sum'].sum(axis=1), sums['price_count'].sum(axis=1))
+    avg_demand = _ratio(sums['demand_sum'].sum(axis=1), sums['demand_count'].sum(axis=1))
+    price_cagr, first_year, last_year = _cagr(price, years)
+    demand_cagr, _, _ = _cagr(demand, years)
+
+    columns = {
+        'avg_price': avg_price,
+        'avg_demand': avg_demand,
+        'price_cagr': price_cagr,
+        'demand_cagr': demand_cagr,
+        'first_year': first_year,
+        'last_year': last_year,
+        'price_rank': _rank(avg_price),
+        'demand_rank': _rank(avg_demand),
+        'growth_rank': _rank(price_cagr),
+    }
+    whole = ('first_year', 'last_year', 'price_rank', 'demand_rank', 'growth_rank')
+    rows = []
+    for position, area in enumerate(present):
+        row = {'area': area}
+        for column, values in columns.items():
+            value = _value(values[position])
+            row[column] = int(value) if column in whole and value is not None else value
+        rows.append(row)
+
+    def trends(series: np.ndarray) -> List[Dict[str, Any]]:
+        # One row per year with a column per area, the shape line charts plot side by side
+        return [
+            {'year': int(year), **{area: _value(series[position, index]) for position, area in enumerate(present)}}
+            for index, year in enumerate(years)
+        ]
+
+    return {
+        'years': [int(year) for year in years],
+        'areas': rows,
+        'price_trends': trends(price),
+        'demand_trends': trends(demand),
+    }
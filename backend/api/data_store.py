@@ -0,0 +1,239 @@
+import os
+import threading
+import time
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from typing import Dict, List, Any, Optional, Tuple
+from .area_index import AreaAggregateIndex, AreaStats
+from .area_resolver import AreaResolver, load_area_aliases
+from .compact import compact_frame, frame_memory
+from .table_pages import TablePager
+from .data_version import current_data_version, bump_data_version, new_data_version
+from .snapshot import read_snapshot, write_snapshot
+from .mongodb_service import get_mongo_service
+
+
+def read_workbook(excel_path: str) -> pd.DataFrame:
+    """Parse an Excel workbook with normalized column names"""
+    df = pd.read_excel(excel_path)
+    df.columns = df.columns.str.strip()
+    return df
+
+
+def write_workbook(df: pd.DataFrame, excel_path: str):
+    """Write ``df`` as the .xlsx workbook at ``excel_path``, replacing it atomically"""
+    root, _ = os.path.splitext(excel_path)
+    temp_path = f"{root}.{os.getpid()}.tmp.xlsx"
+    try:
+        df.to_excel(temp_path, index=False)
+        os.replace(temp_path, excel_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def load_dataframe(excel_path: str) -> Tuple[pd.DataFrame, str]:
+    """Load data from MongoDB first, fallback to Excel.
+
+    Returns the DataFrame together with the name of the source it came from.
+    """
+    mongo_service = get_mongo_service()
+    try:
+        # Try loading from MongoDB first
+        df = mongo_service.get_all_data()
+        source = 'mongodb'
+
+        # If MongoDB is empty, load from Excel and upload to MongoDB
+        if df.empty and os.path.exists(excel_path):
+            df = read_workbook(excel_path)
+            source = 'excel'
+
+            # Upload to MongoDB; this seeds the same data, so keep the version
+            if settings.MONGODB_URI:
+                mongo_service.upload_data_from_excel(excel_path, bump_version=False)
+                print("Data uploaded to MongoDB")
+
+        return df, source
+
+    except Exception as e:
+        print(f"Error loading data: {str(e)}")
+        # Fallback to Excel
+        if os.path.exists(excel_path):
+            return read_workbook(excel_path), 'excel'
+        return pd.DataFrame(), 'empty'
+
+
+class Dataset:
+    """Immutable snapshot of the real estate data for one data version.
+
+    The DataFrame is shared by every request in the worker and must be
+    treated as read-only; callers that need to modify it must copy first.
+    """
+
+    def __init__(self, df: pd.DataFrame, version: str, source: str, load_time_ms: float,
+                 area_index: AreaAggregateIndex = None, raw_memory_bytes: int = None):
+        self.df = df
+        self.version = version
+        self.source = source
+        self.load_time_ms = load_time_ms
+        self.loaded_at = time.time()
+        self.memory_bytes = frame_memory(df)
+        # Size of the frame as parsed, before compact_frame (None when not measured)
+        self.raw_memory_bytes = raw_memory_bytes
+
+        start = time.perf_counter()
+        self.area_index = area_index if area_index is not None else AreaAggregateIndex.from_frame(df)
+        self.area_matcher = AreaResolver(self.area_index.area_names(), load_area_aliases())
+        self.table_pager = TablePager(self)
+        self.index_build_ms = (time.perf_counter() - start) * 1000
+
+    @property
+    def rows(self) -> int:
+        return len(self.df)
+
+    def stats(self) -> Dict[str, Any]:
+        """Describe the snapshot for health and metrics reporting"""
+        return {
+            'data_version': self.version,
+            'source': self.source,
+            'rows': self.rows,
+            'load_time_ms': round(self.load_time_ms, 2),
+            'loaded_at': pd.Timestamp(self.loaded_at, unit='s').isoformat(),
+            'memory_bytes': self.memory_bytes,
+            'raw_memory_bytes': self.raw_memory_bytes,
+            'areas_indexed': len(self.area_index),
+            'index_build_ms': round(self.index_build_ms, 2),
+            'area_resolution': self.area_matcher.stats(),
+        }
+
+    def area_rows(self, stats: AreaStats, limit: int) -> pd.DataFrame:
+        """First ``limit`` rows of an area in frame order"""
+        # Precomputed row positions: cost depends on the limit, not the dataset
+        rows = stats.rows[:limit]
+        if len(rows) and rows[-1] - rows[0] == len(rows) - 1:
+            # Compact frames keep each area contiguous, so this is a slice, not a gather
+            return self.df.iloc[rows[0]:rows[-1] + 1]
+        return self.df.iloc[rows]
+
+    def areas_rows(self, areas: List[AreaStats], limit: int) -> Tuple[pd.DataFrame, List[int]]:
+        """First ``limit`` rows of each area back to back in one frame, and each area's row count"""
+        positions = [stats.rows[:limit] for stats in areas]
+        rows = np.concatenate(positions) if positions else np.empty(0, dtype=np.int64)
+        return self.df.iloc[rows], [len(area_positions) for area_positions in positions]
+
+
+class DatasetStore:
+    """Process-wide cache holding the current dataset snapshot.
+
+    The dataset is loaded once per worker and reused until the shared
+    data-version token changes (see ``bump_data_version``).
+    """
+
+    def __init__(self, excel_path: str):
+        self.excel_path = excel_path
+        self._dataset: Optional[Dataset] = None
+        self._lock = threading.Lock()
+        # Wall-clock start of the load in progress, for readiness probes
+        self.loading_since: Optional[float] = None
+
+    def get(self) -> Dataset:
+        """Return the dataset for the current data version, loading it if stale"""
+        version = current_data_version()
+        dataset = self._dataset
+        if dataset is not None and dataset.version == version:
+            return dataset
+
+        with self._lock:
+            # Another thread may have finished the load while we waited
+            dataset = self._dataset
+            if dataset is None or dataset.version != version:
+                self.loading_since = time.time()
+                try:
+                    dataset = self._load(version)
+                finally:
+                    self.loading_since = None
+                self._dataset = dataset
+        return dataset
+
+    def peek(self) -> Optional[Dataset]:
+        """Return the cached dataset without ever triggering a load"""
+        return self._dataset
+
+    def install(self, dataset: Dataset):
+        """Atomically replace the served snapshot with one built elsewhere"""
+        with self._lock:
+            self._dataset = dataset
+
+    def invalidate(self):
+        """Drop the cached dataset in this process"""
+        with self._lock:
+            self._dataset = None
+
+    def _load(self, version: str) -> Dataset:
+        """Load a fresh snapshot and record how long it took.
+
+        The columnar snapshot for this version is memory-mapped when it
+        exists; otherwise the data is read from Mongo/Excel and a snapshot
+        is written so the next cold start can skip parsing.
+        """
+        start = time.perf_counter()
+        try:
+            df = read_snapshot(version, self.excel_path)
+        except Exception as e:
+            print(f"Error reading snapshot: {str(e)}")
+            df = None
+        source = 'snapshot'
+
+        raw_memory_bytes = None
+        if df is None:
+            df, source = load_dataframe(self.excel_path)
+            # Snapshots are written compact; freshly parsed data is shrunk and sorted here
+            raw_memory_bytes = frame_memory(df)
+            df = compact_frame(df)
+            if not df.empty:
+                try:
+                    write_snapshot(df, version, source, self.excel_path if source == 'excel' else None)
+                    # Serve the mapped copy, whose pages every worker shares, not this private one
+                    mapped = read_snapshot(version, self.excel_path)
+                    if mapped is not None:
+                        df = mapped
+                except Exception as e:
+                    print(f"Error writing snapshot: {str(e)}")
+        load_time_ms = (time.perf_counter() - start) * 1000
+        dataset = Dataset(df, version, source, load_time_ms, raw_memory_bytes=raw_memory_bytes)
+        compacted = f" ({raw_memory_bytes} before compaction)" if raw_memory_bytes else ''
+        print(f"Dataset v{version} loaded from {source}: {len(df)} rows "
+              f"in {load_time_ms:.1f} ms, {dataset.memory_bytes} bytes{compacted}")
+        return dataset
+
+
+def publish_dataframe(df: pd.DataFrame, excel_path: str = None) -> str:
+    """Write ``df`` as the snapshot of a new data version and make it live.
+
+    The snapshot is written before the version token is published, so
+    every worker that sees the new version can memory-map it immediately.
+    """
+    version = new_data_version()
+    write_snapshot(df, version, 'excel', excel_path)
+    bump_data_version(version)
+    return version
+
+
+def get_default_excel_path() -> str:
+    """Get path of the bundled Excel dataset"""
+    return os.path.join(settings.BASE_DIR, 'data', 'real_estate_data.xlsx')
+
+
+# One store per data file
+_stores: Dict[str, DatasetStore] = {}
+_stores_lock = threading.Lock()
+
+def get_data_store(excel_path: str = None) -> DatasetStore:
+    """Get dataset store instance"""
+    excel_path = str(excel_path or get_default_excel_path())
+    store = _stores.get(excel_path)
+    if store is None:
+        with _stores_lock:
+            store = _stores.setdefault(excel_path, DatasetStore(excel_path))
+    return store
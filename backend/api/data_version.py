@@ -0,0 +1,72 @@
+import os
+import threading
+import uuid
+from django.conf import settings
+
+
+# Last seen (stat signature, token) of the version file
+_cached_stat = None
+_cached_token = '0'
+_lock = threading.Lock()
+
+
+def get_version_path() -> str:
+    """Get path of the shared data-version token file"""
+    return str(settings.DATA_VERSION_FILE)
+
+
+def _stat_key(path: str):
+    """Cheap signature that changes whenever the token file is replaced"""
+    st = os.stat(path)
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+def current_data_version() -> str:
+    """Return the current data-version token.
+
+    The token lives in a small file so every worker process sees an upload
+    made by any other worker. The file is only re-read when its stat
+    signature changes, so this is a single ``os.stat`` per call.
+    """
+    global _cached_stat, _cached_token
+    path = get_version_path()
+    try:
+        key = _stat_key(path)
+    except FileNotFoundError:
+        return '0'
+
+    if key == _cached_stat:
+        return _cached_token
+
+    with _lock:
+        try:
+            with open(path, 'r') as f:
+                token = f.read().strip() or '0'
+        except FileNotFoundError:
+            return '0'
+        _cached_stat = key
+        _cached_token = token
+        return token
+
+
+def new_data_version() -> str:
+    """Generate a fresh data-version token without publishing it"""
+    return uuid.uuid4().hex
+
+
+def bump_data_version(token: str = None) -> str:
+    """Publish a new data-version token, invalidating all cached datasets.
+
+    Pass a token from ``new_data_version`` to publish data that was prepared
+    for that version beforehand.
+    """
+    path = get_version_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    token = token or new_data_version()
+
+    # Write-then-rename so readers never observe a half-written token
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        f.write(token)
+    os.replace(tmp_path, path)
+    return token
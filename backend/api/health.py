@@ -0,0 +1,87 @@
+import os
+import time
+import pandas as pd
+from django.conf import settings
+from typing import Dict, Any, Optional, Tuple
+from .data_store import get_data_store
+from .data_version import current_data_version
+from .llm import CircuitBreaker, get_summary_client
+from .mongo_engine import MongoDataset, get_mongo_dataset_store, peek_query_dataset
+from .mongodb_service import get_mongo_service
+
+
+# Roughly when this worker started serving: the module loads with the URLconf
+_started = time.time()
+
+
+def liveness() -> Dict[str, Any]:
+    """The process is up and serving requests; nothing else is checked"""
+    return {
+        'status': 'alive',
+        'pid': os.getpid(),
+        'uptime_seconds': round(time.time() - _started, 1),
+    }
+
+
+def _loading_since() -> Optional[float]:
+    """Start time of a dataset load running in this worker, if any"""
+    since = get_data_store().loading_since
+    if since is None and settings.QUERY_ENGINE == 'mongo':
+        since = get_mongo_dataset_store().loading_since
+    return since
+
+
+def _dataset_state() -> Dict[str, Any]:
+    dataset = peek_query_dataset()
+    version = current_data_version()
+    loading_since = _loading_since()
+    state = {
+        'loaded': dataset is not None,
+        'current_version': version,
+        'loading': loading_since is not None,
+        'loading_for_seconds': round(time.time() - loading_since, 1) if loading_since is not None else None,
+    }
+    if dataset is None:
+        return state
+    return {
+        **state,
+        'engine': 'mongo' if isinstance(dataset, MongoDataset) else 'memory',
+        'source': dataset.source,
+        'data_version': dataset.version,
+        # A newer version is published but this worker still serves the previous one
+        'stale': dataset.version != version,
+        'rows': dataset.rows,
+        'loaded_at': pd.Timestamp(dataset.loaded_at, unit='s').isoformat(),
+        'load_time_ms': round(dataset.load_time_ms, 2),
+        'areas_indexed': len(dataset.area_index),
+        'index_build_ms': round(getattr(dataset, 'index_build_ms', 0.0), 2),
+    }
+
+
+def readiness() -> Tuple[bool, Dict[str, Any]]:
+    """Whether this worker can answer queries, read from cached state only.
+
+    Ready once a dataset with rows is loaded; an older version still counts,
+    since it keeps being served until the reload finishes. The MongoDB ping
+    (cached, see ``MongoDBService.ping``) and the LLM circuit breaker are
+    reported but do not fail readiness: queries fall back to the in-memory
+    data and to template summaries without them. With ``QUERY_ENGINE=mongo``
+    a failed ping does fail readiness.
+    """
+    dataset = _dataset_state()
+    mongo = get_mongo_service().ping()
+    llm = get_summary_client()
+
+    ready = dataset['loaded'] and bool(dataset.get('rows'))
+    if settings.QUERY_ENGINE == 'mongo' and mongo['ok'] is False:
+        ready = False
+    return ready, {
+        'status': 'ready' if ready else 'not_ready',
+        'dataset': dataset,
+        'mongodb': mongo,
+        'llm': {
+            'configured': llm.enabled,
+            'circuit': llm.breaker.stats(),
+            'degraded': llm.breaker.state != CircuitBreaker.CLOSED,
+        },
+    }
@@ -0,0 +1,176 @@
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.utils.module_loading import import_string
+from typing import Callable
+from .area_index import AreaAggregateIndex
+from .chunked_ingest import ChunkedIngester, read_frame
+from .data_store import Dataset, get_data_store, publish_dataframe, write_workbook
+from .models import IngestionJob
+from .mongodb_service import get_mongo_service
+from .response_cache import get_response_cache
+from .services import prewarm_summaries
+
+
+class LocalIngestionQueue:
+    """In-process job queue backed by a single worker thread.
+
+    One worker keeps ingestions ordered. Swap in another queue (e.g. a
+    Celery or RQ adapter) through ``INGESTION_QUEUE``; it only needs a
+    ``submit(func, *args)`` method.
+    """
+
+    def __init__(self, max_workers: int = 1):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='ingest')
+
+    def submit(self, func: Callable, *args):
+        return self._executor.submit(func, *args)
+
+
+class IngestionPipeline:
+    """Parse, index, publish to Mongo and swap in new data.
+
+    Parsing validates and normalizes the upload one chunk at a time and
+    writes each chunk to a Mongo staging collection as it is read; the
+    ``mongo`` stage then only indexes that collection and makes it live.
+    """
+
+    STAGES = ('parse', 'index', 'mongo', 'swap')
+
+    def __init__(self, job_id: str, upload_path: str, excel_path: str):
+        self.job_id = job_id
+        self.upload_path = upload_path
+        self.excel_path = excel_path
+        self.df = None
+        self.area_index = None
+        self.staging = None
+        self.job = None
+
+    def run(self):
+        """Run every stage, recording progress and timings on the job"""
+        close_old_connections()
+        self.job = IngestionJob.objects.get(pk=self.job_id)
+        self._update(status=IngestionJob.STATUS_RUNNING)
+        try:
+            for position, stage in enumerate(self.STAGES):
+                self._update(stage=stage, progress=position / len(self.STAGES))
+                start = time.perf_counter()
+                getattr(self, f'_{stage}')()
+                self.job.stage_timings[stage] = round((time.perf_counter() - start) * 1000, 2)
+            elapsed = sum(self.job.stage_timings.values()) / 1000
+            self._update(
+                status=IngestionJob.STATUS_SUCCEEDED,
+                progress=1.0,
+                rows_per_second=round(self.job.rows_read / elapsed, 1) if elapsed else None,
+            )
+        except Exception as e:
+            print(f"Ingestion job {self.job_id} failed: {str(e)}")
+            self._drop_staging()
+            self._update(status=IngestionJob.STATUS_FAILED, error=str(e))
+        finally:
+            if os.path.exists(self.upload_path):
+                os.remove(self.upload_path)
+            connection.close()
+
+    def _update(self, **fields):
+        for name, value in fields.items():
+            setattr(self.job, name, value)
+        self.job.save()
+
+    def _parse(self):
+        """Read, validate and normalize the upload, writing each chunk to Mongo as it is read.
+
+        Only the compact form of each chunk stays in memory. The combined
+        frame is still built in full: the snapshot is sorted by area, and
+        this worker serves the new data from memory straight away.
+        """
+        self.staging = get_mongo_service().create_staging()
+        write = ChunkedIngester(self.staging).write if self.staging is not None else None
+        df, rows_read, rows_rejected = read_frame(self.upload_path, on_chunk=write)
+        if df.empty:
+            raise ValueError('No valid rows found in the uploaded file')
+        self.df = df
+        self._update(rows_read=rows_read, rows_valid=len(self.df), rows_rejected=rows_rejected)
+
+    def _index(self):
+        self.area_index = AreaAggregateIndex.from_frame(self.df)
+
+    def _mongo(self):
+        """Index the staging collection filled while parsing and make it live"""
+        if self.staging is None:
+            return
+        get_mongo_service().promote_staging(self.staging, bump_version=False)
+        self.staging = None
+
+    def _drop_staging(self):
+        if self.staging is None:
+            return
+        try:
+            self.staging.drop()
+        except Exception as e:
+            print(f"Error dropping staging collection: {str(e)}")
+        self.staging = None
+
+    def _swap(self):
+        """Make the new data live: workbook, snapshot, version token, local store"""
+        source_file = None
+        extension = os.path.splitext(self.upload_path)[1].lower()
+        if extension == '.xlsx':
+            os.replace(self.upload_path, self.excel_path)
+            source_file = self.excel_path
+        elif extension == '.xls':
+            # The workbook is read with openpyxl, which only opens .xlsx
+            write_workbook(self.df, self.excel_path)
+            source_file = self.excel_path
+        # CSV uploads leave the workbook alone; the snapshot (and Mongo) hold the data
+        start = time.perf_counter()
+        version = publish_dataframe(self.df, source_file)
+        publish_ms = (time.perf_counter() - start) * 1000
+
+        # This worker serves the new data straight away, indexes included
+        get_data_store(self.excel_path).install(
+            Dataset(self.df, version, 'upload', publish_ms, area_index=self.area_index)
+        )
+        self._update(data_version=version)
+        # Entries are keyed on the old version and can no longer be hit; free them now
+        get_response_cache().clear()
+        prewarm_summaries()
+
+
+# Singleton instance
+_ingestion_queue = None
+_ingestion_queue_lock = threading.Lock()
+
+def get_ingestion_queue():
+    """Get the configured ingestion queue instance"""
+    global _ingestion_queue
+    if _ingestion_queue is None:
+        with _ingestion_queue_lock:
+            if _ingestion_queue is None:
+                _ingestion_queue = import_string(settings.INGESTION_QUEUE)()
+    return _ingestion_queue
+
+
+def get_upload_dir() -> str:
+    return os.path.join(settings.BASE_DIR, 'data', 'uploads')
+
+
+def enqueue_ingestion(file_obj, excel_path: str) -> IngestionJob:
+    """Save an uploaded file and queue it for background ingestion"""
+    job_id = uuid.uuid4().hex
+    upload_dir = get_upload_dir()
+    os.makedirs(upload_dir, exist_ok=True)
+    extension = os.path.splitext(file_obj.name)[1].lower()
+    upload_path = os.path.join(upload_dir, f'{job_id}{extension}')
+
+    with open(upload_path, 'wb+') as destination:
+        for chunk in file_obj.chunks():
+            destination.write(chunk)
+
+    job = IngestionJob.objects.create(id=job_id, filename=file_obj.name)
+    get_ingestion_queue().submit(IngestionPipeline(job_id, upload_path, str(excel_path)).run)
+    return job
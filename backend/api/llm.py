@@ -0,0 +1,383 @@
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Callable, Dict, Any, Iterator, Optional
+import google.generativeai as genai
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+# Configure Gemini AI
+if settings.GEMINI_API_KEY:
+    genai.configure(api_key=settings.GEMINI_API_KEY)
+
+
+class SummaryUnavailable(Exception):
+    """Raised when a streamed summary times out or fails upstream"""
+
+
+class CircuitOpen(SummaryUnavailable):
+    """Raised instead of calling upstream while the circuit breaker is open"""
+
+
+class CircuitBreaker:
+    """Stops calling a failing upstream for a cool-down period.
+
+    After ``failure_threshold`` consecutive failures the circuit opens and
+    calls are rejected at once. Once ``reset_seconds`` have passed a single
+    trial call is let through (half-open): success closes the circuit,
+    failure opens it again.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int = None, reset_seconds: float = None):
+        self.failure_threshold = failure_threshold or settings.LLM_BREAKER_FAILURE_THRESHOLD
+        self.reset_seconds = settings.LLM_BREAKER_RESET_SECONDS if reset_seconds is None else reset_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial_started: Optional[float] = None
+        self.opened = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        opened_at = self.opened_at
+        if opened_at is None:
+            return self.CLOSED
+        if time.monotonic() - opened_at >= self.reset_seconds:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def allow(self) -> bool:
+        """Whether a call may go upstream now"""
+        with self._lock:
+            state = self.state
+            if state == self.CLOSED:
+                return True
+            # One trial at a time; a trial that never reports back is replaced
+            now = time.monotonic()
+            if state == self.HALF_OPEN and (
+                self.trial_started is None or now - self.trial_started >= self.reset_seconds
+            ):
+                self.trial_started = now
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_started = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                if self.opened_at is None:
+                    self.opened += 1
+                # (Re)open: a failed trial starts a new cool-down
+                self.opened_at = time.monotonic()
+                self.trial_started = None
+
+    def stats(self) -> Dict[str, Any]:
+        """State and counters, read without taking the lock"""
+        opened_at = self.opened_at
+        return {
+            'state': self.state,
+            'consecutive_failures': self.failures,
+            'times_opened': self.opened,
+            'retry_in_seconds': (
+                round(max(self.reset_seconds - (time.monotonic() - opened_at), 0), 1)
+                if opened_at is not None else None
+            ),
+        }
+
+
+class GeminiBackend:
+    """Calls Gemini through a single, lazily created model client"""
+
+    def __init__(self, model_name: str = None, timeout: float = None):
+        self.model_name = model_name or settings.GEMINI_MODEL
+        self.timeout = timeout or settings.LLM_TIMEOUT_SECONDS
+        self._model = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(settings.GEMINI_API_KEY)
+
+    def get_model(self):
+        """Create the model client once and reuse it for every prompt"""
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    self._model = genai.GenerativeModel(self.model_name)
+        return self._model
+
+    def __call__(self, prompt: str) -> str:
+        response = self.get_model().generate_content(
+            prompt,
+            request_options={'timeout': self.timeout}
+        )
+        return response.text
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        """Yield the response text chunk by chunk as Gemini produces it"""
+        response = self.get_model().generate_content(
+            prompt,
+            stream=True,
+            request_options={'timeout': self.timeout}
+        )
+        for chunk in response:
+            if chunk.text:
+                yield chunk.text
+
+
+class FakeLLMBackend:
+    """Local stand-in for Gemini that answers after an injected delay.
+
+    Enable with ``LLM_BACKEND=api.llm.FakeLLMBackend`` and tune the delay
+    with ``LLM_FAKE_DELAY_SECONDS`` to exercise timeouts and coalescing.
+    """
+
+    enabled = True
+
+    def __init__(self, delay: float = None, text: str = None):
+        self.delay = settings.LLM_FAKE_DELAY_SECONDS if delay is None else delay
+        self.text = text
+        self.calls = 0
+
+    def _text(self, prompt: str) -> str:
+        if self.text is not None:
+            return self.text
+        return f"[fake summary] {' '.join(prompt.split())[:200]}"
+
+    def __call__(self, prompt: str) -> str:
+        self.calls += 1
+        time.sleep(self.delay)
+        return self._text(prompt)
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        """Yield the fake summary word by word, spreading the delay across chunks"""
+        self.calls += 1
+        tokens = self._text(prompt).split(' ')
+        for index, token in enumerate(tokens):
+            time.sleep(self.delay / len(tokens))
+            yield token if index == 0 else ' ' + token
+
+
+class SummaryClient:
+    """Shared LLM client with in-flight coalescing and a latency budget.
+
+    Identical prompts submitted while a call is running share that call's
+    future, so a burst of the same question makes one upstream request.
+    Calls run on a small thread pool, which lets both WSGI (blocking) and
+    ASGI (awaiting) callers wait on the same future with a timeout. Streams
+    hold a thread for the whole answer, so they get a pool of their own and
+    can never starve blocking calls. Timeouts and errors feed a circuit
+    breaker that skips upstream while it is open.
+    """
+
+    def __init__(self, backend: Callable[[str], str] = None, timeout: float = None,
+                 max_workers: int = None, breaker: CircuitBreaker = None, max_streams: int = None):
+        self.backend = backend or GeminiBackend()
+        self.timeout = settings.LLM_TIMEOUT_SECONDS if timeout is None else timeout
+        self.breaker = breaker or CircuitBreaker()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers or settings.LLM_MAX_WORKERS,
+            thread_name_prefix='llm'
+        )
+        self._stream_executor = ThreadPoolExecutor(
+            max_workers=max_streams or settings.LLM_MAX_STREAMS,
+            thread_name_prefix='llm-stream'
+        )
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self.counters = {
+            'requests': 0,
+            'upstream_calls': 0,
+            'coalesced': 0,
+            'timeouts': 0,
+            'errors': 0,
+            'short_circuited': 0,
+        }
+
+    @property
+    def enabled(self) -> bool:
+        return bool(getattr(self.backend, 'enabled', True))
+
+    def submit(self, prompt: str) -> Future:
+        """Start an upstream call for ``prompt`` or join the one in flight"""
+        with self._lock:
+            self.counters['requests'] += 1
+            future = self._inflight.get(prompt)
+            if future is not None:
+                self.counters['coalesced'] += 1
+                return future
+            if not self.breaker.allow():
+                self.counters['short_circuited'] += 1
+                future = Future()
+                future.set_exception(CircuitOpen('circuit open'))
+                return future
+            self.counters['upstream_calls'] += 1
+            future = self._executor.submit(self._call, prompt)
+            self._inflight[prompt] = future
+
+        # Registered outside the lock: the callback runs inline if already done
+        future.add_done_callback(lambda done: self._forget(prompt, done))
+        return future
+
+    def _call(self, prompt: str) -> str:
+        """Run one upstream call and report its outcome to the breaker"""
+        start = time.monotonic()
+        try:
+            summary = self.backend(prompt)
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        self._record_outcome(time.monotonic() - start)
+        return summary
+
+    def _record_outcome(self, elapsed: float):
+        # Answers slower than the budget reached nobody, so they count as failures
+        if elapsed > self.timeout:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+
+    def _forget(self, prompt: str, future: Future):
+        with self._lock:
+            if self._inflight.get(prompt) is future:
+                del self._inflight[prompt]
+
+    def _record_failure(self, error: Exception):
+        if isinstance(error, CircuitOpen):
+            # Already counted as short-circuited; upstream was not called
+            return
+        key = 'timeouts' if isinstance(error, (FutureTimeout, asyncio.TimeoutError)) else 'errors'
+        with self._lock:
+            self.counters[key] += 1
+        print(f"LLM summary unavailable ({key}): {str(error) or type(error).__name__}")
+
+    def wait(self, future: Future, timeout: float = None) -> Optional[str]:
+        """Block on a submitted call; returns None when the budget is exceeded or it fails"""
+        try:
+            return future.result(timeout=self.timeout if timeout is None else timeout)
+        except Exception as e:
+            self._record_failure(e)
+            return None
+
+    async def wait_async(self, future: Future, timeout: float = None) -> Optional[str]:
+        """Await a submitted call; returns None when the budget is exceeded or it fails"""
+        try:
+            # Shield so a timeout here never cancels the call other waiters share
+            return await asyncio.wait_for(
+                asyncio.shield(asyncio.wrap_future(future)),
+                self.timeout if timeout is None else timeout
+            )
+        except Exception as e:
+            self._record_failure(e)
+            return None
+
+    def summarize(self, prompt: str, timeout: float = None) -> Optional[str]:
+        """Blocking call; returns None when the budget is exceeded or the call fails"""
+        return self.wait(self.submit(prompt), timeout)
+
+    async def summarize_async(self, prompt: str, timeout: float = None) -> Optional[str]:
+        """Awaitable call; returns None when the budget is exceeded or the call fails"""
+        return await self.wait_async(self.submit(prompt), timeout)
+
+    def stream(self, prompt: str, timeout: float = None,
+               on_complete: Callable[[str], None] = None) -> Iterator[str]:
+        """Yield summary chunks as they arrive, within the latency budget.
+
+        Raises ``SummaryUnavailable`` once the budget is exhausted or the
+        upstream call fails. The upstream call keeps running after a
+        timeout so ``on_complete`` still receives the full text.
+        """
+        if not hasattr(self.backend, 'stream'):
+            # Backend cannot stream: deliver the whole answer as one chunk
+            summary = self.wait(self.submit(prompt), timeout)
+            if summary is None:
+                raise SummaryUnavailable('summary unavailable')
+            if on_complete:
+                on_complete(summary)
+            yield summary
+            return
+
+        with self._lock:
+            self.counters['requests'] += 1
+            if not self.breaker.allow():
+                self.counters['short_circuited'] += 1
+                raise CircuitOpen('circuit open')
+            self.counters['upstream_calls'] += 1
+
+        chunks: queue.Queue = queue.Queue()
+
+        def produce():
+            parts = []
+            start = time.monotonic()
+            try:
+                for text in self.backend.stream(prompt):
+                    parts.append(text)
+                    chunks.put(('chunk', text))
+                full_text = ''.join(parts)
+                self._record_outcome(time.monotonic() - start)
+                chunks.put(('done', full_text))
+                if on_complete:
+                    on_complete(full_text)
+            except Exception as e:
+                self.breaker.record_failure()
+                chunks.put(('error', e))
+
+        self._stream_executor.submit(produce)
+        # A stream still queued behind busy ones spends its budget waiting
+        deadline = time.monotonic() + (self.timeout if timeout is None else timeout)
+        while True:
+            try:
+                kind, value = chunks.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                self._record_failure(FutureTimeout())
+                raise SummaryUnavailable('timeout')
+            if kind == 'chunk':
+                yield value
+            elif kind == 'done':
+                return
+            else:
+                self._record_failure(value)
+                raise SummaryUnavailable(str(value))
+
+    def close(self):
+        """Stop both pools without waiting for calls in flight"""
+        self._executor.shutdown(wait=False)
+        self._stream_executor.shutdown(wait=False)
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters for health and metrics reporting"""
+        with self._lock:
+            return dict(self.counters, in_flight=len(self._inflight), circuit=self.breaker.stats())
+
+
+# Singleton instance
+_summary_client = None
+_summary_client_lock = threading.Lock()
+
+def get_summary_client() -> SummaryClient:
+    """Get shared summary client instance"""
+    global _summary_client
+    if _summary_client is None:
+        with _summary_client_lock:
+            if _summary_client is None:
+                backend = import_string(settings.LLM_BACKEND)() if settings.LLM_BACKEND else None
+                _summary_client = SummaryClient(backend=backend)
+    return _summary_client
+
+
+def set_summary_client(client: Optional[SummaryClient]):
+    """Replace the shared client, e.g. with one wrapping a stub backend"""
+    global _summary_client
+    _summary_client = client
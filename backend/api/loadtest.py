@@ -0,0 +1,432 @@
+import gc
+import json
+import logging
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import numpy as np
+import pandas as pd
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import Client, override_settings
+from typing import Callable, Dict, List, Any, Optional, Tuple
+from .benchmarks import generate_dataset
+from .compact import compact_frame
+from .data_store import Dataset, get_data_store, publish_dataframe
+from .data_version import current_data_version
+from .llm import FakeLLMBackend, SummaryClient, get_summary_client, set_summary_client
+from .models import IngestionJob
+from .mongodb_service import get_mongo_service
+from .prefork import preload_query_dataset, process_memory
+from .services import RealEstateAnalyzer
+from .summary_cache import SummaryCache, get_summary_cache, set_summary_cache
+
+
+# Metrics compared against the baseline, and whether higher is better
+BASELINE_METRICS = {
+    'p50_ms': False,
+    'p95_ms': False,
+    'p99_ms': False,
+    'throughput_rps': True,
+    # Memory only this worker holds (worker_memory suite)
+    'private_mb': False,
+    # Time to accept an upload and to finish ingesting it (upload suite)
+    'accept_ms': False,
+    'ingest_s': False,
+}
+
+# Differences smaller than this per call are timer noise, whatever the ratio
+NOISE_FLOOR_MS = 0.05
+
+
+def latency_summary(samples_ms: List[float], elapsed_s: float) -> Dict[str, Any]:
+    """p50/p95/p99 of per-call latencies and calls per second"""
+    if not samples_ms:
+        return {'calls': 0}
+    p50, p95, p99 = np.percentile(samples_ms, [50, 95, 99])
+    return {
+        'calls': len(samples_ms),
+        'p50_ms': round(float(p50), 3),
+        'p95_ms': round(float(p95), 3),
+        'p99_ms': round(float(p99), 3),
+        'throughput_rps': round(len(samples_ms) / elapsed_s, 1) if elapsed_s else None,
+    }
+
+
+def sample_calls(func: Callable, args: List[Tuple], max_calls: int = 500,
+                 budget_s: float = 2.0) -> Dict[str, Any]:
+    """Time ``func`` once per call, cycling through ``args``.
+
+    Stops after ``max_calls`` or ``budget_s`` seconds, whichever comes
+    first, so slow functions on large datasets still finish quickly.
+    """
+    samples = []
+    start = time.perf_counter()
+    while len(samples) < max_calls and time.perf_counter() - start < budget_s:
+        call_args = args[len(samples) % len(args)]
+        call_start = time.perf_counter()
+        func(*call_args)
+        samples.append((time.perf_counter() - call_start) * 1000)
+    return latency_summary(samples, time.perf_counter() - start)
+
+
+@contextmanager
+def synthetic_data(rows: int, areas: int = 200, seed: int = 42):
+    """Serve a generated dataset as the live data version.
+
+    Snapshots and the version token go to a temporary directory, so the
+    real data and the workers using it are untouched.
+    """
+    df = generate_dataset(rows, areas, seed)
+    with tempfile.TemporaryDirectory() as tmp, override_settings(
+        SNAPSHOT_DIR=os.path.join(tmp, 'snapshots'),
+        DATA_VERSION_FILE=os.path.join(tmp, '.data_version'),
+        SUMMARY_PREWARM_TOP_N=0,
+    ):
+        publish_dataframe(df)
+        yield df
+
+
+@contextmanager
+def stubbed_llm(delay: float = 0.05):
+    """Answer summaries with ``FakeLLMBackend`` and a memory-only summary cache"""
+    previous_client, previous_cache = get_summary_client(), get_summary_cache()
+    backend = FakeLLMBackend(delay=delay)
+    client = SummaryClient(backend=backend)
+    set_summary_client(client)
+    set_summary_cache(SummaryCache(persistent=False))
+    try:
+        yield backend
+    finally:
+        set_summary_client(previous_client)
+        set_summary_cache(previous_cache)
+        client.close()
+
+
+def chat_queries(area_names: List[str], count: int = 50) -> List[str]:
+    """A mix of single-area, comparison and unmatched questions"""
+    queries = []
+    for position in range(count):
+        area = area_names[position * 7 % len(area_names)]
+        other = area_names[(position * 7 + 3) % len(area_names)]
+        kind = position % 5
+        if kind == 3:
+            queries.append(f'Compare {area} and {other} demand trends')
+        elif kind == 4:
+            queries.append(f'What about locality number {position}?')
+        else:
+            queries.append(f'Give me analysis of {area}')
+    return queries
+
+
+def _unmemoized(analyzer: RealEstateAnalyzer, func: Callable) -> Callable:
+    """``func`` with the analyzer's per-request memos cleared before each call.
+
+    A request builds one analyzer and asks for an area once, so timing
+    repeat calls on a shared analyzer would measure dictionary hits.
+    """
+    def call(*args):
+        analyzer._area_stats.clear()
+        analyzer._tables.clear()
+        return func(*args)
+    return call
+
+
+def bench_query_functions(rows: int, areas: int = 200) -> List[Dict[str, Any]]:
+    """Per-call latency of the analyzer's hot functions on one dataset size"""
+    results = []
+    with synthetic_data(rows, areas) as df:
+        analyzer = RealEstateAnalyzer()
+        names = analyzer.dataset.area_index.area_names()
+        sample = [(name,) for name in names[:50]]
+        cases = {
+            'filter_by_area': (analyzer.filter_by_area, sample),
+            'extract_areas_from_query': (
+                analyzer.extract_areas_from_query,
+                [(query,) for query in chat_queries(names)],
+            ),
+            'get_price_trend': (_unmemoized(analyzer, analyzer.get_price_trend), sample),
+            'get_filtered_table': (_unmemoized(analyzer, analyzer.get_filtered_table), sample),
+        }
+        for name, (func, args) in cases.items():
+            results.append({'case': f'{name}@{rows}', 'rows': len(df), **sample_calls(func, args)})
+    return results
+
+
+def bench_batch_queries(rows: int, areas: int = 200, queries: int = 50,
+                        llm_delay: float = 0.05) -> List[Dict[str, Any]]:
+    """One /api/query/batch/ request versus the same queries sent one by one.
+
+    Each mode starts with an empty summary cache, so both pay for the
+    stubbed LLM calls: one at a time sequentially, fanned out in the batch.
+    """
+    results = []
+    client = Client()
+    with synthetic_data(rows, areas):
+        names = RealEstateAnalyzer().dataset.area_index.area_names()
+        batch = chat_queries(names, queries)
+        timings = {}
+        for mode in ('sequential', 'batch'):
+            with stubbed_llm(llm_delay) as backend:
+                start = time.perf_counter()
+                if mode == 'batch':
+                    client.post('/api/query/batch/', json.dumps({'queries': batch}), content_type='application/json')
+                else:
+                    for query in batch:
+                        client.post('/api/query/', json.dumps({'query': query}), content_type='application/json')
+                timings[mode] = ((time.perf_counter() - start) * 1000, backend.calls)
+        results.append({
+            'case': f'batch@{rows}',
+            'rows': rows,
+            'queries': queries,
+            'sequential_ms': round(timings['sequential'][0], 1),
+            'batch_ms': round(timings['batch'][0], 1),
+            'speedup': round(timings['sequential'][0] / timings['batch'][0], 1),
+            'llm_calls': timings['batch'][1],
+        })
+    return results
+
+
+def _drive(path: str, payloads: List[Optional[Dict[str, Any]]], requests: int,
+           concurrency: int) -> Tuple[List[float], int, float]:
+    """Send ``requests`` requests from ``concurrency`` threads; returns latencies, errors, seconds"""
+    latencies: List[float] = []
+    errors = 0
+    lock = threading.Lock()
+    counter = iter(range(requests))
+
+    def worker():
+        nonlocal errors
+        client = Client()
+        local, failed = [], 0
+        try:
+            for position in counter:
+                payload = payloads[position % len(payloads)]
+                start = time.perf_counter()
+                if payload is None:
+                    response = client.get(path)
+                else:
+                    response = client.post(path, json.dumps(payload), content_type='application/json')
+                local.append((time.perf_counter() - start) * 1000)
+                # 404 is the expected answer for unmatched areas
+                if response.status_code >= 500:
+                    failed += 1
+        finally:
+            connection.close()
+        with lock:
+            latencies.extend(local)
+            errors += failed
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for future in [pool.submit(worker) for _ in range(concurrency)]:
+            future.result()
+    return latencies, errors, time.perf_counter() - start
+
+
+def _upload(df: pd.DataFrame, timeout_s: float = 600) -> Dict[str, Any]:
+    """Upload ``df`` as CSV and wait for the ingestion job to finish"""
+    client = Client()
+    upload = SimpleUploadedFile('loadtest.csv', df.to_csv(index=False).encode('utf-8'), 'text/csv')
+    start = time.perf_counter()
+    response = client.post('/api/upload/', {'file': upload})
+    accept_ms = (time.perf_counter() - start) * 1000
+    if response.status_code != 202:
+        return {'upload_error': response.status_code}
+
+    body = response.json()
+    deadline = time.perf_counter() + timeout_s
+    job = {}
+    while time.perf_counter() < deadline:
+        job = client.get(body['status_url']).json()
+        if job['status'] in (IngestionJob.STATUS_SUCCEEDED, IngestionJob.STATUS_FAILED):
+            break
+        time.sleep(0.05)
+    total_s = time.perf_counter() - start
+    IngestionJob.objects.filter(pk=body['job_id']).delete()
+    return {
+        'accept_ms': round(accept_ms, 1),
+        'ingest_s': round(total_s, 2),
+        'status': job.get('status'),
+        'rows_per_second': job.get('rows_per_second'),
+    }
+
+
+def bench_http(rows: int, areas: int = 200, requests: int = 300, concurrency: int = 8,
+               llm_delay: float = 0.05) -> List[Dict[str, Any]]:
+    """Drive the chat, health and readiness views in-process with a stubbed LLM"""
+    results = []
+    # Unmatched questions answer 404, which Django would log as a warning per request
+    request_logger = logging.getLogger('django.request')
+    level = request_logger.level
+    request_logger.setLevel(logging.ERROR)
+    with synthetic_data(rows, areas) as df, stubbed_llm(llm_delay) as backend:
+        names = RealEstateAnalyzer().dataset.area_index.area_names()
+        payloads = [{'query': query} for query in chat_queries(names)]
+        scenarios = {
+            'query': ('/api/query/', payloads),
+            'health': ('/api/health/', [None]),
+            'ready': ('/api/health/ready/', [None]),
+        }
+        for name, (path, scenario_payloads) in scenarios.items():
+            # One untimed pass warms the dataset and the URL resolver
+            _drive(path, scenario_payloads[:1], 1, 1)
+            latencies, errors, elapsed = _drive(path, scenario_payloads, requests, concurrency)
+            results.append({
+                'case': f'{name}@{rows}',
+                'rows': len(df),
+                'concurrency': concurrency,
+                'errors': errors,
+                **latency_summary(latencies, elapsed),
+            })
+        results[0]['llm_calls'] = backend.calls
+    request_logger.setLevel(level)
+    return results
+
+
+def bench_upload_size(rows: int, areas: int = 200) -> List[Dict[str, Any]]:
+    """Upload a generated dataset through /api/upload/ and time it until the job finishes"""
+    # An upload would also replace MongoDB's data, so only run it without MongoDB
+    if get_mongo_service().db is not None:
+        return [{'case': f'upload@{rows}', 'skipped': 'MongoDB is configured'}]
+    with synthetic_data(rows, areas) as df:
+        return [{'case': f'upload@{rows}', 'rows': len(df), **_upload(df)}]
+
+
+def compare_to_baseline(results: Dict[str, List[Dict[str, Any]]], baseline: Dict[str, Dict[str, Any]],
+                        tolerance: float) -> List[str]:
+    """Describe every metric that is worse than the baseline by more than ``tolerance``"""
+    regressions = []
+    for suite, rows in results.items():
+        for row in rows:
+            expected = baseline.get(suite, {}).get(row.get('case'))
+            if not expected:
+                continue
+            for metric, higher_is_better in BASELINE_METRICS.items():
+                if row.get(metric) is None or expected.get(metric) is None:
+                    continue
+                value, reference = row[metric], expected[metric]
+                if higher_is_better:
+                    worse = (value < reference * (1 - tolerance)
+                             and 1000 / value - 1000 / reference > NOISE_FLOOR_MS)
+                else:
+                    worse = value > reference * (1 + tolerance) and value - reference > NOISE_FLOOR_MS
+                if worse:
+                    regressions.append(f'{suite} {row["case"]} {metric}: {value} vs baseline {reference}')
+    return regressions
+
+
+def baseline_from(results: Dict[str, List[Dict[str, Any]]]) -> Dict[str, Dict[str, Any]]:
+    """The baseline-relevant metrics of a run, keyed by suite and case"""
+    return {
+        suite: {
+            row['case']: {metric: row[metric] for metric in BASELINE_METRICS if row.get(metric) is not None}
+            for row in rows if row.get('case')
+        }
+        for suite, rows in results.items()
+    }
+
+
+def _memory_worker(mode: str, df: pd.DataFrame, barrier, conn):
+    """Forked worker: get a dataset the way ``mode`` says, serve from it, report memory"""
+    start = time.perf_counter()
+    if mode == 'private':
+        # Every worker parsing its own copy, as without snapshots or preloading
+        get_data_store().install(Dataset(compact_frame(df), current_data_version(), 'bench', 0))
+    dataset = get_data_store().get()
+    ready_ms = (time.perf_counter() - start) * 1000
+
+    # Fault in every column page, as any full scan would, then build answers
+    for position in range(dataset.df.shape[1]):
+        column = dataset.df.iloc[:, position]
+        (column.cat.codes if isinstance(column.dtype, pd.CategoricalDtype) else column).to_numpy().sum()
+    analyzer = RealEstateAnalyzer()
+    for area in dataset.area_index.area_names()[:50]:
+        analyzer.build_area_payload(area, 'price trend')
+
+    # Measure while every worker is alive, so shared pages are split between all of them
+    barrier.wait()
+    conn.send({'ready_ms': ready_ms, **process_memory()})
+    conn.close()
+    barrier.wait()
+
+
+def bench_worker_memory_modes(rows: int, workers: int = 4, areas: int = 200) -> List[Dict[str, Any]]:
+    """Per-worker memory of forked workers that parse, memory-map or inherit the dataset"""
+    context = multiprocessing.get_context('fork')
+    results = []
+    with synthetic_data(rows, areas) as df:
+        for mode in ('private', 'snapshot', 'preload'):
+            get_data_store().invalidate()
+            if mode == 'preload':
+                preload_query_dataset()
+            barrier = context.Barrier(workers)
+            pipes = [context.Pipe(duplex=False) for _ in range(workers)]
+            processes = [
+                context.Process(target=_memory_worker, args=(mode, df, barrier, sender), daemon=True)
+                for _, sender in pipes
+            ]
+            for process in processes:
+                process.start()
+            reports = [receiver.recv() for receiver, _ in pipes]
+            for process in processes:
+                process.join()
+            if mode == 'preload':
+                gc.unfreeze()
+
+            mean_mb = lambda key: round(sum(report.get(key, 0) for report in reports) / len(reports) / 2**20, 1)
+            results.append({
+                'case': f'{mode}@{rows}',
+                'workers': workers,
+                'ready_ms': round(max(report['ready_ms'] for report in reports), 1),
+                'rss_mb': mean_mb('rss_bytes'),
+                'pss_mb': mean_mb('pss_bytes'),
+                'private_mb': mean_mb('private_bytes'),
+                'total_pss_mb': round(sum(report.get('pss_bytes', 0) for report in reports) / 2**20, 1),
+            })
+        get_data_store().invalidate()
+    return results
+
+
+def bench_query_path(sizes=(10_000, 100_000, 1_000_000)) -> List[Dict[str, Any]]:
+    """filter_by_area, extract_areas_from_query, get_price_trend and get_filtered_table at each size"""
+    return [row for size in sizes for row in bench_query_functions(size)]
+
+
+def bench_http_load(sizes=(10_000, 100_000)) -> List[Dict[str, Any]]:
+    """/api/query/, /api/health/ and /api/health/ready/ under concurrent load at each size"""
+    return [row for size in sizes for row in bench_http(size)]
+
+
+def bench_upload(sizes=(10_000, 100_000, 1_000_000)) -> List[Dict[str, Any]]:
+    """/api/upload/ from request to finished ingestion job at each size"""
+    return [row for size in sizes for row in bench_upload_size(size)]
+
+
+def bench_batch(sizes=(100_000, 1_000_000)) -> List[Dict[str, Any]]:
+    """50 chat queries as one batch request versus 50 single requests at each size"""
+    request_logger = logging.getLogger('django.request')
+    level = request_logger.level
+    request_logger.setLevel(logging.ERROR)
+    try:
+        return [row for size in sizes for row in bench_batch_queries(size)]
+    finally:
+        request_logger.setLevel(level)
+
+
+def bench_worker_memory(sizes=(1_000_000,)) -> List[Dict[str, Any]]:
+    """RSS, PSS and private memory per worker, 4 forked workers, at each size"""
+    return [row for size in sizes for row in bench_worker_memory_modes(size)]
+
+
+LOAD_SUITES = {
+    'query_path': bench_query_path,
+    'http_load': bench_http_load,
+    'upload': bench_upload,
+    'batch': bench_batch,
+    'worker_memory': bench_worker_memory,
+}
@@ -0,0 +1,58 @@
+import json
+import os
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from api.benchmarks import SUITES
+from api.loadtest import LOAD_SUITES, baseline_from, compare_to_baseline
+
+ALL_SUITES = {**SUITES, **LOAD_SUITES}
+
+
+class Command(BaseCommand):
+    help = 'Run micro-benchmarks and load tests for the query path'
+
+    def add_arguments(self, parser):
+        parser.add_argument('suites', nargs='*', choices=sorted(ALL_SUITES), help='Suites to run (default: all)')
+        parser.add_argument('--rows', nargs='+', type=int, help='Dataset sizes to run instead of each suite\'s defaults')
+        parser.add_argument('--baseline', default=settings.BENCHMARK_BASELINE_FILE,
+                            help='Baseline JSON to compare p50/p95/p99 and throughput against')
+        parser.add_argument('--save-baseline', action='store_true', help='Record this run as the new baseline')
+        parser.add_argument('--check', action='store_true',
+                            help='Fail when the baseline is missing instead of skipping the comparison')
+        parser.add_argument('--tolerance', type=float, default=settings.BENCHMARK_TOLERANCE,
+                            help='Allowed relative regression before failing (default 0.25)')
+
+    def handle(self, *args, **options):
+        kwargs = {'sizes': tuple(options['rows'])} if options['rows'] else {}
+        results = {}
+        for name in options['suites'] or sorted(ALL_SUITES):
+            self.stdout.write(self.style.MIGRATE_HEADING(f'== {name}'))
+            results[name] = ALL_SUITES[name](**kwargs)
+            for row in results[name]:
+                self.stdout.write('  ' + '  '.join(f'{key}={value}' for key, value in row.items()))
+
+        path = options['baseline']
+        if options['save_baseline']:
+            baseline = {}
+            if os.path.exists(path):
+                with open(path) as f:
+                    baseline = json.load(f)
+            for suite, cases in baseline_from(results).items():
+                baseline.setdefault(suite, {}).update(cases)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w') as f:
+                json.dump(baseline, f, indent=2, sort_keys=True)
+            self.stdout.write(self.style.SUCCESS(f'Baseline saved to {path}'))
+            return
+
+        if not os.path.exists(path):
+            if options['check']:
+                raise CommandError(f'No baseline at {path}; record one with --save-baseline')
+            self.stdout.write(self.style.WARNING(f'No baseline at {path}; nothing compared'))
+            return
+        with open(path) as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(results, baseline, options['tolerance'])
+        if regressions:
+            raise CommandError('Regressed against baseline:\n  ' + '\n  '.join(regressions))
+        self.stdout.write(self.style.SUCCESS(f'No regressions against {path}'))
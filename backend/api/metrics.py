@@ -0,0 +1,318 @@
+import math
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Any, Optional, Tuple
+from .llm import get_summary_client
+from .mongo_engine import MongoDataset, peek_query_dataset
+from .mongodb_service import get_mongo_service
+from .prefork import process_memory
+from .query_log import QueryTrace, get_query_logger
+from .response_cache import get_response_cache
+from .summary_cache import get_summary_cache
+
+
+PREFIX = 'realestate'
+
+# Traces started while handling the current request. A mutable list, so
+# traces bound inside sync_to_async/async_to_sync hops are still visible here.
+_request_traces: ContextVar[Optional[List[QueryTrace]]] = ContextVar('request_traces', default=None)
+
+
+def begin_request():
+    """Start collecting traces for a request; returns a token for ``end_request``"""
+    return _request_traces.set([])
+
+
+def end_request(token):
+    _request_traces.reset(token)
+
+
+def bind_trace(trace: QueryTrace):
+    """Attach a query trace to the request being handled, if any"""
+    traces = _request_traces.get()
+    if traces is not None:
+        traces.append(trace)
+
+
+def current_trace() -> Optional[QueryTrace]:
+    """Latest query trace of the request being handled"""
+    traces = _request_traces.get()
+    return traces[-1] if traces else None
+
+
+class LatencyHistogram:
+    """HDR-style log-linear histogram of durations in microseconds.
+
+    Each power of two is split into ``SUB_BUCKETS`` equal buckets, so any
+    recorded value is known to within 1/SUB_BUCKETS (~6%) at every scale
+    from 1 µs to ~2 minutes, in a fixed array of counters.
+    """
+
+    SUB_BUCKETS = 16
+    MAX_EXPONENT = 27
+
+    def __init__(self):
+        # Bucket 0 holds everything below 1 µs; the last one everything above the range
+        self.counts = [0] * (self.SUB_BUCKETS * (self.MAX_EXPONENT + 1) + 2)
+        self.count = 0
+        self.total_us = 0.0
+
+    def _index(self, value_us: float) -> int:
+        if value_us < 1:
+            return 0
+        mantissa, exponent = math.frexp(value_us)
+        exponent -= 1
+        if exponent > self.MAX_EXPONENT:
+            return len(self.counts) - 1
+        # mantissa is in [0.5, 1): position within [2^e, 2^(e+1))
+        sub = int((mantissa * 2 - 1) * self.SUB_BUCKETS)
+        return 1 + exponent * self.SUB_BUCKETS + sub
+
+    def upper_bound_us(self, index: int) -> float:
+        """Upper edge of a bucket"""
+        if index == 0:
+            return 1.0
+        if index == len(self.counts) - 1:
+            return math.inf
+        exponent, sub = divmod(index - 1, self.SUB_BUCKETS)
+        return 2.0 ** exponent * (1 + (sub + 1) / self.SUB_BUCKETS)
+
+    def record(self, value_us: float):
+        self.counts[self._index(value_us)] += 1
+        self.count += 1
+        self.total_us += value_us
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound (µs) of the bucket holding the q-th quantile"""
+        if not self.count:
+            return None
+        rank = max(1, math.ceil(q * self.count))
+        seen = 0
+        for index, bucket in enumerate(self.counts):
+            seen += bucket
+            if seen >= rank:
+                return self.upper_bound_us(index)
+        return None
+
+    def cumulative(self) -> List[Tuple[float, int]]:
+        """(upper bound µs, cumulative count) at every power of two, for export"""
+        points = []
+        seen = self.counts[0]
+        points.append((1.0, seen))
+        for exponent in range(self.MAX_EXPONENT + 1):
+            start = 1 + exponent * self.SUB_BUCKETS
+            seen += sum(self.counts[start:start + self.SUB_BUCKETS])
+            points.append((2.0 ** (exponent + 1), seen))
+        return points
+
+
+class MetricsRegistry:
+    """In-process latency histograms and event counters"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.histograms: Dict[Tuple[str, Tuple], LatencyHistogram] = {}
+        self.counters: Dict[Tuple[str, Tuple], float] = {}
+        self.started = time.time()
+
+    def observe(self, name: str, elapsed_ms: float, **labels):
+        """Record a duration in the histogram ``name`` with ``labels``"""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = LatencyHistogram()
+            histogram.record(elapsed_ms * 1000)
+
+    def increment(self, name: str, amount: float = 1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def record_stages(self, trace: QueryTrace):
+        """Add a trace's stage timings to the stage histograms"""
+        for stage, elapsed_ms in trace.stages.items():
+            self.observe('stage_duration', elapsed_ms, stage=stage)
+
+    def record_trace(self, trace: QueryTrace):
+        """Fold a finished query into the stage histograms and counters"""
+        self.record_stages(trace)
+        self.increment(
+            'queries', endpoint=trace.endpoint, intent=trace.intent or 'unknown',
+            success=str(bool(trace.success)).lower(),
+        )
+        if trace.cache is not None:
+            self.increment('summary_cache_lookups', result=trace.cache)
+        if trace.summary_source is not None:
+            self.increment('summaries', source=trace.summary_source)
+
+    def quantiles(self, name: str = 'stage_duration') -> Dict[str, Dict[str, Any]]:
+        """p50/p95/p99 in milliseconds per label set of one histogram"""
+        result = {}
+        with self._lock:
+            for (histogram_name, labels), histogram in self.histograms.items():
+                if histogram_name != name:
+                    continue
+                label = ','.join(str(value) for _, value in labels) or 'all'
+                result[label] = {
+                    'count': histogram.count,
+                    **{
+                        f'p{int(q * 100)}_ms': round(histogram.quantile(q) / 1000, 3)
+                        for q in (0.5, 0.95, 0.99)
+                    },
+                }
+        return result
+
+    def render(self) -> List[str]:
+        """Histograms and counters in Prometheus text format"""
+        lines = []
+        with self._lock:
+            histograms = sorted(self.histograms.items())
+            counters = sorted(self.counters.items())
+
+        families = {}
+        for (name, labels), histogram in histograms:
+            families.setdefault(name, []).append((labels, histogram))
+        for name, series in families.items():
+            metric = f'{PREFIX}_{name}_seconds'
+            lines.append(f'# HELP {metric} {HELP.get(name, name)}')
+            lines.append(f'# TYPE {metric} histogram')
+            for labels, histogram in series:
+                for bound_us, seen in histogram.cumulative():
+                    le = _format_labels(labels + (('le', repr(bound_us / 1e6)),))
+                    lines.append(f'{metric}_bucket{le} {seen}')
+                lines.append(f'{metric}_bucket{_format_labels(labels + (("le", "+Inf"),))} {histogram.count}')
+                lines.append(f'{metric}_sum{_format_labels(labels)} {histogram.total_us / 1e6!r}')
+                lines.append(f'{metric}_count{_format_labels(labels)} {histogram.count}')
+
+        families = {}
+        for (name, labels), value in counters:
+            families.setdefault(name, []).append((labels, value))
+        for name, series in families.items():
+            metric = f'{PREFIX}_{name}_total'
+            lines.append(f'# HELP {metric} {HELP.get(name, name)}')
+            lines.append(f'# TYPE {metric} counter')
+            for labels, value in series:
+                lines.append(f'{metric}{_format_labels(labels)} {value:g}')
+        return lines
+
+
+HELP = {
+    'stage_duration': 'Time spent in each stage of answering a chat query',
+    'request_duration': 'Wall time of API requests up to the response headers',
+    'queries': 'Chat queries answered',
+    'summary_cache_lookups': 'Summary cache lookups by the tier that answered',
+    'summaries': 'Summaries served by source (cache, llm, fallback, mock)',
+    'response_bytes': 'Bytes of compressed responses, before (identity) and after encoding',
+}
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels) + '}'
+
+
+def _gauge(lines: List[str], name: str, help_text: str, value, kind: str = 'gauge', **labels):
+    if value is None:
+        return
+    metric = f'{PREFIX}_{name}'
+    lines.append(f'# HELP {metric} {help_text}')
+    lines.append(f'# TYPE {metric} {kind}')
+    lines.append(f'{metric}{_format_labels(tuple(sorted(labels.items())))} {float(value):g}')
+
+
+def collect_runtime_metrics() -> List[str]:
+    """Current values read from the dataset, caches, LLM client and pools.
+
+    Only already-loaded state is read, so a scrape never triggers a load.
+    """
+    lines = []
+    dataset = peek_query_dataset()
+    if dataset is not None:
+        stats = dataset.stats()
+        engine = 'mongo' if isinstance(dataset, MongoDataset) else 'memory'
+        _gauge(lines, 'dataset_rows', 'Rows in the loaded dataset', stats['rows'], engine=engine)
+        _gauge(lines, 'dataset_memory_bytes', 'Memory held by the loaded dataset', stats['memory_bytes'])
+        _gauge(lines, 'dataset_areas', 'Areas in the loaded dataset', stats['areas_indexed'])
+        _gauge(lines, 'dataset_load_seconds', 'Time taken to load the dataset', stats['load_time_ms'] / 1000)
+        resolution = stats['area_resolution']
+        for name in ('exact', 'fuzzy', 'unresolved', 'budget_exceeded'):
+            _gauge(lines, f'area_resolution_{name}_total', f'Area lookups {name.replace("_", " ")}',
+                   resolution.get(name), kind='counter')
+
+    cache = get_summary_cache().stats()
+    for name in ('memory_hits', 'disk_hits', 'misses', 'evictions'):
+        _gauge(lines, f'summary_cache_{name}_total', f'Summary cache {name.replace("_", " ")}',
+               cache.get(name), kind='counter')
+    _gauge(lines, 'summary_cache_entries', 'Summaries held in memory', cache.get('memory_entries'))
+
+    responses = get_response_cache().stats()
+    for name in ('hits', 'misses', 'sets'):
+        _gauge(lines, f'response_cache_{name}_total', f'Query response cache {name}', responses.get(name), kind='counter')
+
+    llm = get_summary_client().stats()
+    for name in ('requests', 'upstream_calls', 'coalesced', 'timeouts', 'errors', 'short_circuited'):
+        _gauge(lines, f'llm_{name}_total', f'LLM summary {name.replace("_", " ")}', llm.get(name), kind='counter')
+    _gauge(lines, 'llm_in_flight', 'LLM calls in flight', llm.get('in_flight'))
+    _gauge(lines, 'llm_circuit_open', '1 while the LLM circuit breaker skips upstream calls',
+           llm['circuit']['state'] != 'closed')
+
+    query_log = get_query_logger().stats()
+    for name in ('logged', 'written', 'dropped', 'failed'):
+        _gauge(lines, f'query_log_{name}_total', f'Query log records {name}', query_log.get(name), kind='counter')
+    _gauge(lines, 'query_log_pending', 'Query log records waiting to be written', query_log.get('pending'))
+
+    memory = process_memory()
+    _gauge(lines, 'process_rss_bytes', 'Resident memory of this worker', memory.get('rss_bytes'))
+    _gauge(lines, 'process_pss_bytes', 'Proportional share of memory: shared pages split between their sharers',
+           memory.get('pss_bytes'))
+    _gauge(lines, 'process_private_bytes', 'Memory held by this worker alone', memory.get('private_bytes'))
+
+    mongo = get_mongo_service().stats()
+    if mongo['configured']:
+        pool = mongo['pool']
+        _gauge(lines, 'mongo_pool_open_connections', 'Open MongoDB connections', pool['open_connections'])
+        _gauge(lines, 'mongo_pool_in_use', 'MongoDB connections checked out', pool['in_use'])
+        _gauge(lines, 'mongo_pool_checkouts_total', 'MongoDB connection checkouts', pool['checkouts'], kind='counter')
+        _gauge(lines, 'mongo_pool_checkout_failures_total', 'Failed MongoDB connection checkouts',
+               pool['checkout_failures'], kind='counter')
+        _gauge(lines, 'mongo_errors_total', 'MongoDB operation errors', mongo['errors'], kind='counter')
+    return lines
+
+
+def render_prometheus() -> str:
+    """Full scrape payload"""
+    registry = get_metrics()
+    lines = registry.render()
+    lines += collect_runtime_metrics()
+    _gauge(lines, 'uptime_seconds', 'Seconds since this worker started', time.time() - registry.started)
+    return '\n'.join(lines) + '\n'
+
+
+def server_timing_header(trace: Optional[QueryTrace], total_ms: float) -> str:
+    """``Server-Timing`` value listing the query's stages and the total"""
+    entries = []
+    if trace is not None:
+        entries += [f'{stage};dur={elapsed_ms:.2f}' for stage, elapsed_ms in trace.stages.items()]
+    entries.append(f'total;dur={total_ms:.2f}')
+    return ', '.join(entries)
+
+
+# Singleton instance
+_metrics = None
+_metrics_lock = threading.Lock()
+
+def get_metrics() -> MetricsRegistry:
+    """Get metrics registry instance"""
+    global _metrics
+    if _metrics is None:
+        with _metrics_lock:
+            if _metrics is None:
+                _metrics = MetricsRegistry()
+    return _metrics
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 04:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_ingestionjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingestionjob',
+            name='rows_per_second',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
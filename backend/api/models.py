@@ -1,3 +1,67 @@
 from django.db import models
 
-# Create your models here.
+
+class SummaryCacheEntry(models.Model):
+    """Persisted LLM summary keyed by a fingerprint of its prompt inputs"""
+    
+    key = models.CharField(max_length=64, primary_key=True)
+    area = models.CharField(max_length=255)
+    data_version = models.CharField(max_length=64)
+    summary = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+    
+    def __str__(self):
+        return f"{self.area} @ {self.data_version}"
+
+
+class IngestionJob(models.Model):
+    """Background ingestion of an uploaded workbook or CSV file"""
+    
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_SUCCEEDED = 'succeeded'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_SUCCEEDED, 'Succeeded'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+    
+    id = models.CharField(max_length=32, primary_key=True)
+    filename = models.CharField(max_length=255)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    stage = models.CharField(max_length=32, blank=True)
+    progress = models.FloatField(default=0)
+    rows_read = models.IntegerField(default=0)
+    rows_valid = models.IntegerField(default=0)
+    rows_rejected = models.IntegerField(default=0)
+    stage_timings = models.JSONField(default=dict)
+    rows_per_second = models.FloatField(null=True, blank=True)
+    data_version = models.CharField(max_length=64, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.filename} ({self.status})"
+    
+    def as_dict(self):
+        """Status payload for the upload status endpoint"""
+        return {
+            'job_id': self.id,
+            'filename': self.filename,
+            'status': self.status,
+            'stage': self.stage,
+            'progress': round(self.progress, 3),
+            'rows_read': self.rows_read,
+            'rows_valid': self.rows_valid,
+            'rows_rejected': self.rows_rejected,
+            'stage_timings_ms': self.stage_timings,
+            'rows_per_second': self.rows_per_second,
+            'data_version': self.data_version or None,
+            'error': self.error or None,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+        }
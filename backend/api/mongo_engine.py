@@ -0,0 +1,406 @@
+import threading
+import time
+import pandas as pd
+from django.conf import settings
+from typing import Dict, List, Any, Optional, Tuple
+from .area_index import AreaStats, normalize_area
+from .area_resolver import AreaResolver, load_area_aliases
+from .comparison import BUCKET_COLUMNS
+from .data_store import get_data_store
+from .data_version import current_data_version
+from .mongodb_service import MongoDBService, get_mongo_service
+from .serialization import frame_to_records
+from .table_pages import decode_cursor, encode_cursor
+
+
+def _number(value) -> Optional[float]:
+    return None if value is None else float(value)
+
+
+# Row order of the in-memory engine's compact frame within an area: by year
+# (rows without one last), then insertion order
+_FRAME_ORDER = {'_no_year': 1, 'Year': 1, '_id': 1}
+_NO_YEAR = {'$addFields': {'_no_year': {'$cond': [{'$eq': [{'$ifNull': ['$Year', None]}, None]}, 1, 0]}}}
+
+
+def _field_stats(field: str, prefix: str) -> Dict[str, Any]:
+    """$group accumulators for one numeric field; nulls are skipped like NaN in pandas"""
+    return {
+        f'{prefix}_sum': {'$sum': f'${field}'},
+        f'{prefix}_count': {'$sum': {'$cond': [{'$isNumber': f'${field}'}, 1, 0]}},
+        f'{prefix}_min': {'$min': f'${field}'},
+        f'{prefix}_max': {'$max': f'${field}'},
+    }
+
+
+class MongoAreaIndex:
+    """Area aggregates computed by MongoDB, one indexed pipeline per lookup.
+
+    Mirrors ``AreaAggregateIndex`` so the analyzer can use either; only
+    the aggregated results travel to the server.
+    """
+
+    def __init__(self, collection, names: Dict[str, str]):
+        self.collection = collection
+        self.names = names
+
+    def _areas_pipeline(self, keys: List[str]) -> List[Dict[str, Any]]:
+        return [
+            {'$match': {'area_key': {'$in': keys}}},
+            # Frame order of the in-memory engine, so first/last prices agree
+            _NO_YEAR,
+            {'$sort': {'area_key': 1, **_FRAME_ORDER}},
+            {'$facet': {
+                'years': [
+                    {'$match': {'Year': {'$ne': None}}},
+                    {'$group': {
+                        '_id': {'key': '$area_key', 'year': '$Year'},
+                        'rows': {'$sum': 1},
+                        **_field_stats('Price', 'price'),
+                        **_field_stats('Demand', 'demand'),
+                    }},
+                ],
+                'area': [
+                    {'$group': {'_id': '$area_key', 'name': {'$first': '$Area'}, 'rows': {'$sum': 1}}},
+                ],
+                'prices': [
+                    {'$match': {'Price': {'$ne': None}}},
+                    {'$group': {'_id': '$area_key', 'first': {'$first': '$Price'}, 'last': {'$last': '$Price'}}},
+                ],
+            }},
+        ]
+
+    def get(self, area: str) -> Optional[AreaStats]:
+        """Aggregate an area's yearly price and demand in MongoDB"""
+        return self.get_many([area])[area]
+
+    def get_many(self, areas: List[str]) -> Dict[str, Optional[AreaStats]]:
+        """Aggregates of several areas from one pipeline; None for unknown areas"""
+        keys = {area: normalize_area(area) for area in areas}
+        wanted = sorted({key for key in keys.values() if key in self.names})
+        result = next(self.collection.aggregate(self._areas_pipeline(wanted)), None) if wanted else None
+        if not result:
+            return dict.fromkeys(areas)
+
+        years = {}
+        for bucket in result['years']:
+            group = bucket.pop('_id')
+            years.setdefault(group['key'], {})[int(group['year'])] = {
+                field: _number(value) for field, value in bucket.items()
+            }
+        prices = {row['_id']: row for row in result['prices']}
+        stats = {}
+        for row in result['area']:
+            key = row['_id']
+            first_last = prices.get(key, {})
+            stats[key] = AreaStats(
+                key,
+                str(row['name']).strip(),
+                years.get(key, {}),
+                _number(first_last.get('first')),
+                _number(first_last.get('last')),
+                row_count=row['rows'],
+            )
+        return {area: stats.get(key) for area, key in keys.items()}
+
+    def averages(self, areas: List[str]) -> Dict[str, Dict[str, Optional[float]]]:
+        """Average price and demand of each requested area in one pipeline"""
+        keys = {area: normalize_area(area) for area in areas}
+        rows = self.collection.aggregate([
+            {'$match': {'area_key': {'$in': list(set(keys.values()))}, 'Year': {'$ne': None}}},
+            {'$group': {
+                '_id': '$area_key',
+                'avg_price': {'$avg': '$Price'},
+                'avg_demand': {'$avg': '$Demand'},
+            }},
+        ])
+        by_key = {row['_id']: row for row in rows}
+        return {
+            area: {'avg_price': _number(by_key[key]['avg_price']), 'avg_demand': _number(by_key[key]['avg_demand'])}
+            for area, key in keys.items() if key in by_key
+        }
+
+    def yearly_buckets(self, areas: List[str]) -> pd.DataFrame:
+        """Yearly price and demand aggregates of the requested areas from one pipeline"""
+        keys = {}
+        for area in areas:
+            keys.setdefault(normalize_area(area), []).append(area)
+        rows = self.collection.aggregate([
+            {'$match': {'area_key': {'$in': list(keys)}, 'Year': {'$ne': None}}},
+            {'$group': {
+                '_id': {'key': '$area_key', 'year': '$Year'},
+                'price_sum': {'$sum': '$Price'},
+                'price_count': {'$sum': {'$cond': [{'$isNumber': '$Price'}, 1, 0]}},
+                'demand_sum': {'$sum': '$Demand'},
+                'demand_count': {'$sum': {'$cond': [{'$isNumber': '$Demand'}, 1, 0]}},
+            }},
+        ])
+        records = []
+        for row in rows:
+            for area in keys[row['_id']['key']]:
+                records.append((
+                    area, int(row['_id']['year']), float(row['price_sum']), row['price_count'],
+                    float(row['demand_sum']), row['demand_count'],
+                ))
+        return pd.DataFrame.from_records(records, columns=BUCKET_COLUMNS)
+
+    def area_names(self) -> List[str]:
+        """Display names of all areas"""
+        return list(self.names.values())
+
+    def __len__(self):
+        return len(self.names)
+
+
+class MongoTablePager:
+    """Serves sorted, projected table pages with MongoDB doing the sort and skip"""
+
+    def __init__(self, dataset: 'MongoDataset'):
+        self.dataset = dataset
+
+    def page(self, area: str, sort: str = None, columns: List[str] = None,
+             limit: int = 50, cursor: str = None) -> Optional[Dict[str, Any]]:
+        """Return one page of an area's rows, or None if the area is unknown"""
+        dataset = self.dataset
+        key = normalize_area(area)
+        if key not in dataset.area_index.names:
+            return None
+
+        all_columns = dataset.columns
+        columns = columns or all_columns
+        unknown = [column for column in columns if column not in all_columns]
+        if unknown:
+            raise ValueError(f"Unknown column(s): {', '.join(unknown)}")
+
+        pipeline = [{'$match': {'area_key': key}}, _NO_YEAR]
+        if sort:
+            descending = sort.startswith('-')
+            sort_column = sort.lstrip('-')
+            if sort_column not in all_columns:
+                raise ValueError(f'Unknown sort column: {sort_column}')
+            # Missing values go last in both directions, ties keep frame order
+            order = {'_missing': 1, sort_column: -1 if descending else 1}
+            for field, direction in _FRAME_ORDER.items():
+                order.setdefault(field, direction)
+            pipeline += [
+                {'$addFields': {'_missing': {'$cond': [
+                    {'$eq': [{'$ifNull': [f'${sort_column}', None]}, None]}, 1, 0
+                ]}}},
+                {'$sort': order},
+            ]
+        else:
+            pipeline.append({'$sort': _FRAME_ORDER})
+
+        offset = decode_cursor(cursor, dataset.version) if cursor else 0
+        pipeline += [
+            {'$skip': offset},
+            {'$limit': limit},
+            {'$project': {'_id': 0, **{column: 1 for column in columns}}},
+        ]
+        rows = frame_to_records(pd.DataFrame(list(dataset.collection.aggregate(pipeline)), columns=columns))
+        total = dataset.collection.count_documents({'area_key': key})
+        next_offset = offset + len(rows)
+        return {
+            'area': dataset.area_index.names[key],
+            'columns': columns,
+            'rows': rows,
+            'total': total,
+            'next_cursor': encode_cursor(dataset.version, next_offset) if next_offset < total else None,
+            'data_version': dataset.version,
+        }
+
+
+class MongoDataset:
+    """Query-time view of one data version held in MongoDB.
+
+    Offers the same interface as ``Dataset`` but keeps only area names in
+    worker memory; aggregation, comparison and table pages run as indexed
+    pipelines against the collection that was live when it was built.
+    """
+
+    source = 'mongodb'
+
+    def __init__(self, collection, version: str, columns: List[str], names: Dict[str, str],
+                 load_time_ms: float, projection: Dict[str, int] = None, rows: int = None):
+        self.collection = collection
+        self.version = version
+        self.columns = columns
+        self.projection = projection or dict(MongoDBService.PROJECTION)
+        self.load_time_ms = load_time_ms
+        self.loaded_at = time.time()
+        # Versioned collections never change once live, so the count is read once
+        self.rows = collection.estimated_document_count() if rows is None else rows
+        self.df = pd.DataFrame()
+        self.area_index = MongoAreaIndex(collection, names)
+        self.area_matcher = AreaResolver(self.area_index.area_names(), load_area_aliases())
+        self.table_pager = MongoTablePager(self)
+
+    def area_rows(self, stats: AreaStats, limit: int) -> pd.DataFrame:
+        """First ``limit`` rows of an area in the in-memory engine's frame order"""
+        projection = dict(self.projection)
+        if not any(projection.values()):
+            # Exclusion projections must also drop the helper field
+            projection['_no_year'] = 0
+        cursor = self.collection.aggregate([
+            {'$match': {'area_key': stats.key}},
+            _NO_YEAR,
+            {'$sort': _FRAME_ORDER},
+            {'$limit': limit},
+            {'$project': projection},
+        ])
+        return pd.DataFrame(list(cursor), columns=self.columns)
+
+    def areas_rows(self, areas: List[AreaStats], limit: int) -> Tuple[pd.DataFrame, List[int]]:
+        """First ``limit`` rows of each area back to back in one frame, and each area's row count"""
+        frames = [self.area_rows(stats, limit) for stats in areas]
+        if not frames:
+            return pd.DataFrame(columns=self.columns), []
+        return pd.concat(frames, ignore_index=True), [len(frame) for frame in frames]
+
+    def stats(self) -> Dict[str, Any]:
+        """Describe the dataset for health and metrics reporting"""
+        return {
+            'data_version': self.version,
+            'source': self.source,
+            'collection': self.collection.name,
+            'rows': self.rows,
+            'load_time_ms': round(self.load_time_ms, 2),
+            'loaded_at': pd.Timestamp(self.loaded_at, unit='s').isoformat(),
+            'memory_bytes': 0,
+            'areas_indexed': len(self.area_index),
+            'area_resolution': self.area_matcher.stats(),
+        }
+
+
+class MongoDatasetStore:
+    """Process-wide cache of the MongoDB dataset view for the current data version.
+
+    A failed or empty attach is remembered too: until the version changes
+    or ``QUERY_ENGINE_RETRY_SECONDS`` pass, ``get`` returns None at once
+    instead of waiting on MongoDB's server selection timeout again.
+    """
+
+    def __init__(self, mongo_service: MongoDBService):
+        self.mongo_service = mongo_service
+        self._dataset: Optional[MongoDataset] = None
+        # (version, view or None, monotonic time to retry a failed attach)
+        self._attached: Optional[Tuple[str, Optional[MongoDataset], float]] = None
+        self._lock = threading.Lock()
+        self.loading_since: Optional[float] = None
+
+    def _cached(self, version: str) -> Tuple[bool, Optional[MongoDataset]]:
+        """Whether the last attach still answers for ``version``, and its view"""
+        attached = self._attached
+        if attached is None or attached[0] != version:
+            return False, None
+        _, dataset, retry_at = attached
+        if dataset is None and time.monotonic() >= retry_at:
+            return False, None
+        return True, dataset
+
+    def get(self) -> Optional[MongoDataset]:
+        """Return the view for the current version, or None when MongoDB is unavailable or has no data"""
+        version = current_data_version()
+        hit, dataset = self._cached(version)
+        if hit:
+            return dataset
+
+        with self._lock:
+            hit, dataset = self._cached(version)
+            if not hit:
+                self.loading_since = time.time()
+                try:
+                    dataset = self._load(version)
+                finally:
+                    self.loading_since = None
+                self._attached = (version, dataset, time.monotonic() + settings.QUERY_ENGINE_RETRY_SECONDS)
+                self._dataset = dataset
+            return dataset
+
+    def peek(self) -> Optional[MongoDataset]:
+        """Return the cached view without ever querying MongoDB"""
+        return self._dataset
+
+    def _load(self, version: str) -> Optional[MongoDataset]:
+        if self.mongo_service.db is None:
+            return None
+        try:
+            start = time.perf_counter()
+            # Pin the live collection so one version is read consistently
+            self.mongo_service.active_collection_name(refresh=True)
+            self.mongo_service.ensure_area_keys()
+            collection = self.mongo_service.collection
+            projection = self.mongo_service.projection()
+            first = collection.find_one({}, projection, sort=[('_id', 1)])
+            if first is None:
+                return None
+
+            names = {}
+            for row in collection.aggregate([
+                {'$match': {'area_key': {'$ne': None}}},
+                {'$sort': {'_id': 1}},
+                {'$group': {'_id': '$area_key', 'name': {'$first': '$Area'}}},
+            ]):
+                names[row['_id']] = str(row['name']).strip()
+
+            load_time_ms = (time.perf_counter() - start) * 1000
+            print(f"Dataset v{version} attached to MongoDB collection {collection.name}: "
+                  f"{len(names)} areas in {load_time_ms:.1f} ms")
+            return MongoDataset(collection, version, list(first.keys()), names, load_time_ms, projection)
+        except Exception as e:
+            self.mongo_service._record_error(e)
+            print(f"Error attaching MongoDB dataset: {str(e)}")
+            return None
+
+
+# Singleton instance
+_mongo_dataset_store = None
+_mongo_dataset_store_lock = threading.Lock()
+
+def get_mongo_dataset_store() -> MongoDatasetStore:
+    """Get MongoDB dataset store instance"""
+    global _mongo_dataset_store
+    if _mongo_dataset_store is None:
+        with _mongo_dataset_store_lock:
+            if _mongo_dataset_store is None:
+                _mongo_dataset_store = MongoDatasetStore(get_mongo_service())
+    return _mongo_dataset_store
+
+
+def peek_query_dataset(excel_path: str = None):
+    """The dataset last used to answer queries, without triggering a load"""
+    if settings.QUERY_ENGINE == 'mongo':
+        dataset = get_mongo_dataset_store().peek()
+        if dataset is not None:
+            return dataset
+    return get_data_store(excel_path).peek()
+
+
+def get_query_dataset(excel_path: str = None):
+    """Dataset answering queries under ``QUERY_ENGINE``.
+
+    ``mongo`` runs aggregations in MongoDB and falls back to the in-memory
+    dataset while MongoDB is unavailable or empty.
+    """
+    if settings.QUERY_ENGINE == 'mongo':
+        dataset = get_mongo_dataset_store().get()
+        if dataset is not None:
+            return dataset
+    return get_data_store(excel_path).get()
+
+
+def warm_query_dataset(excel_path: str = None) -> threading.Thread:
+    """Load the query dataset in a background thread.
+
+    Called when a server process starts, so a worker becomes ready without
+    waiting for its first query and readiness probes never load anything.
+    """
+    def run():
+        try:
+            get_query_dataset(excel_path)
+        except Exception as e:
+            print(f"Error warming dataset: {str(e)}")
+
+    thread = threading.Thread(target=run, name='dataset-warm', daemon=True)
+    thread.start()
+    return thread
@@ -1,125 +1,422 @@
-from pymongo import MongoClient
+import pymongo
+from pymongo import ASCENDING, IndexModel, MongoClient, ReturnDocument
+from pymongo.monitoring import ConnectionPoolListener
 from django.conf import settings
 import pandas as pd
-from typing import List, Dict, Any
+from typing import Callable, Iterable, List, Dict, Any
 import os
+import threading
+import time
+import uuid
+from .area_index import normalize_area
+from .chunked_ingest import ChunkedIngester
+from .data_version import bump_data_version, current_data_version
 
 
-class MongoDBService:
-    """Service for MongoDB operations"""
+def cursor_to_frame(cursor: Iterable[Dict[str, Any]], batch_size: int = None) -> pd.DataFrame:
+    """Build a DataFrame from a cursor one batch at a time.
+
+    Each batch of documents becomes a columnar frame straight away, so at
+    most ``batch_size`` dicts are alive at once instead of the whole result.
+    """
+    batch_size = batch_size or settings.MONGODB_BATCH_SIZE
+    frames = []
+    batch = []
+    for document in cursor:
+        batch.append(document)
+        if len(batch) >= batch_size:
+            frames.append(pd.DataFrame(batch))
+            batch = []
+    if batch:
+        frames.append(pd.DataFrame(batch))
+    
+    if not frames:
+        return pd.DataFrame()
+    if len(frames) == 1:
+        return frames[0]
+    return pd.concat(frames, ignore_index=True)
+
+
+class PoolMetrics(ConnectionPoolListener):
+    """Connection pool counters collected from pymongo's monitoring events"""
     
     def __init__(self):
-        self.client = None
+        self._lock = threading.Lock()
+        self.counters = dict.fromkeys((
+            'connections_created', 'connections_closed', 'checkouts',
+            'checkout_failures', 'pools_cleared',
+        ), 0)
+        self.open_connections = 0
+        self.checked_out = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._waits = threading.local()
+    
+    def _add(self, name: str, amount: int = 1):
+        with self._lock:
+            self.counters[name] += amount
+    
+    def pool_created(self, event):
+        pass
+    
+    def pool_ready(self, event):
+        pass
+    
+    def pool_cleared(self, event):
+        self._add('pools_cleared')
+    
+    def pool_closed(self, event):
+        pass
+    
+    def connection_created(self, event):
+        with self._lock:
+            self.counters['connections_created'] += 1
+            self.open_connections += 1
+    
+    def connection_ready(self, event):
+        pass
+    
+    def connection_closed(self, event):
+        with self._lock:
+            self.counters['connections_closed'] += 1
+            self.open_connections -= 1
+    
+    def connection_check_out_started(self, event):
+        self._waits.started = time.perf_counter()
+    
+    def connection_check_out_failed(self, event):
+        self._add('checkout_failures')
+    
+    def connection_checked_out(self, event):
+        started = getattr(self._waits, 'started', None)
+        waited = time.perf_counter() - started if started is not None else 0.0
+        with self._lock:
+            self.counters['checkouts'] += 1
+            self.checked_out += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+    
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.checked_out -= 1
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            checkouts = self.counters['checkouts']
+            return {
+                **self.counters,
+                'open_connections': self.open_connections,
+                'in_use': self.checked_out,
+                'avg_checkout_wait_ms': round(self._wait_total / checkouts * 1000, 3) if checkouts else 0.0,
+                'max_checkout_wait_ms': round(self._wait_max * 1000, 3),
+            }
+
+
+class MongoDBService:
+    """Service for MongoDB operations.
+    
+    Property data lives in versioned collections (``properties_<id>``). A
+    pointer document in ``collection_pointers`` names the live one, so an
+    upload fills and indexes a staging collection and then switches the
+    pointer in a single-document write. Readers always see one complete
+    version; the previous collection is kept for reads still in flight.
+    """
+    
+    PROPERTIES = 'properties'
+    POINTERS = 'collection_pointers'
+    # Both lead with area_key, so either serves plain area_key lookups
+    PROPERTY_INDEXES = [
+        IndexModel([('area_key', ASCENDING), ('Year', ASCENDING)]),
+        IndexModel([('area_key', ASCENDING), ('_id', ASCENDING)]),
+    ]
+    # Internal fields that never reach the DataFrame
+    PROJECTION = {'_id': 0, 'area_key': 0}
+    
+    def __init__(self, client: MongoClient = None, database: str = 'real_estate_db'):
+        self.client = client
+        self.database = database
         self.db = None
-        self.collection = None
+        self.pool_metrics = PoolMetrics()
+        self.errors = 0
+        self.last_error = None
+        self.last_error_at = None
+        self._ping: Dict[str, Any] = None
+        self._ping_lock = threading.Lock()
+        # (data version, live collection name) last read from the pointer
+        self._pointer = None
         self.connect()
     
     def connect(self):
         """Connect to MongoDB"""
         try:
-            if settings.MONGODB_URI:
-                self.client = MongoClient(settings.MONGODB_URI)
-                self.db = self.client['real_estate_db']
-                self.collection = self.db['properties']
+            if self.client is None and settings.MONGODB_URI:
+                # Fail fast on a bad URI or an unreachable server instead of
+                # blocking requests for pymongo's 30 second default
+                self.client = MongoClient(
+                    settings.MONGODB_URI,
+                    maxPoolSize=settings.MONGODB_MAX_POOL_SIZE,
+                    minPoolSize=settings.MONGODB_MIN_POOL_SIZE,
+                    serverSelectionTimeoutMS=settings.MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+                    connectTimeoutMS=settings.MONGODB_CONNECT_TIMEOUT_MS,
+                    socketTimeoutMS=settings.MONGODB_SOCKET_TIMEOUT_MS,
+                    event_listeners=[self.pool_metrics],
+                )
+            if self.client is not None:
+                self.db = self.client[self.database]
                 print("MongoDB connected successfully")
             else:
                 print("MongoDB URI not configured, using local data only")
         except Exception as e:
+            self._record_error(e)
             print(f"MongoDB connection failed: {str(e)}")
     
-    def upload_data_from_excel(self, excel_path: str) -> Dict[str, Any]:
-        """Upload data from Excel to MongoDB"""
+    def _record_error(self, error: Exception):
+        """Remember the latest failure for the health endpoint"""
+        self.errors += 1
+        self.last_error = str(error)
+        self.last_error_at = pd.Timestamp.now().isoformat()
+    
+    def projection(self) -> Dict[str, int]:
+        """Fields loaded into DataFrames; MONGODB_FIELDS limits them to a known set"""
+        if settings.MONGODB_FIELDS:
+            return {'_id': 0, **{field: 1 for field in settings.MONGODB_FIELDS}}
+        return dict(self.PROJECTION)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Connection settings, pool counters and the last error"""
+        return {
+            'configured': self.client is not None,
+            'database': self.database,
+            'errors': self.errors,
+            'last_error': self.last_error,
+            'last_error_at': self.last_error_at,
+            'pool': {
+                'max_size': settings.MONGODB_MAX_POOL_SIZE,
+                'min_size': settings.MONGODB_MIN_POOL_SIZE,
+                **self.pool_metrics.stats(),
+            },
+            'timeouts_ms': {
+                'server_selection': settings.MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+                'connect': settings.MONGODB_CONNECT_TIMEOUT_MS,
+                'socket': settings.MONGODB_SOCKET_TIMEOUT_MS,
+            },
+        }
+    
+    def ping(self, timeout_ms: int = None, max_age: float = None) -> Dict[str, Any]:
+        """Result of a recent ``ping`` command, re-run when older than ``max_age`` seconds.
+        
+        Only one caller at a time runs the ping, bounded by ``timeout_ms``;
+        callers arriving meanwhile get the previous result instead of waiting.
+        """
+        if self.client is None:
+            return {'ok': None, 'message': 'not configured'}
+        timeout_ms = settings.HEALTH_MONGO_PING_TIMEOUT_MS if timeout_ms is None else timeout_ms
+        max_age = settings.HEALTH_MONGO_PING_INTERVAL_SECONDS if max_age is None else max_age
+        
+        cached = self._ping
+        if cached is not None and time.monotonic() - cached['checked'] < max_age:
+            return cached['result']
+        if not self._ping_lock.acquire(blocking=False):
+            return cached['result'] if cached is not None else {'ok': None, 'message': 'ping in progress'}
         try:
-            df = pd.read_excel(excel_path)
-            df.columns = df.columns.str.strip()
-            
-            # Clear existing data
-            if self.collection:
-                self.collection.delete_many({})
-            
-            # Convert DataFrame to dict
-            records = df.to_dict('records')
-            
-            # Insert into MongoDB
-            if self.collection and records:
-                result = self.collection.insert_many(records)
-                return {
-                    'success': True,
-                    'count': len(result.inserted_ids),
-                    'message': f'Successfully uploaded {len(result.inserted_ids)} records'
-                }
-            else:
+            start = time.perf_counter()
+            try:
+                with pymongo.timeout(timeout_ms / 1000):
+                    self.client.admin.command('ping')
+                result = {'ok': True}
+            except Exception as e:
+                self._record_error(e)
+                result = {'ok': False, 'message': str(e)}
+            result['latency_ms'] = round((time.perf_counter() - start) * 1000, 2)
+            result['checked_at'] = pd.Timestamp.now().isoformat()
+            self._ping = {'checked': time.monotonic(), 'result': result}
+            return result
+        finally:
+            self._ping_lock.release()
+    
+    @property
+    def collection(self):
+        """The live properties collection, or None when not connected"""
+        if self.db is None:
+            return None
+        return self.db[self.active_collection_name()]
+    
+    def active_collection_name(self, refresh: bool = False) -> str:
+        """Name of the collection the pointer selects, looked up once per data version.
+        
+        Uploads switch the pointer before publishing the new version, so
+        the cached name stays right for the version it was read under.
+        ``refresh`` re-reads it anyway, for a seed swapped in without a new
+        version.
+        """
+        version = current_data_version()
+        cached = self._pointer
+        if not refresh and cached is not None and cached[0] == version:
+            return cached[1]
+        name = self._read_pointer()
+        self._pointer = (version, name)
+        return name
+    
+    def _read_pointer(self) -> str:
+        pointer = self.db[self.POINTERS].find_one({'_id': self.PROPERTIES})
+        # Databases populated before versioned collections use the plain name
+        return pointer['collection'] if pointer else self.PROPERTIES
+    
+    def upload_data_from_excel(self, excel_path: str, bump_version: bool = True) -> Dict[str, Any]:
+        """Stream an Excel/CSV file into MongoDB and invalidate cached datasets"""
+        return self._swap_in(lambda staging: ChunkedIngester(staging).ingest(excel_path), bump_version)
+    
+    def replace_data(self, df: pd.DataFrame, bump_version: bool = True) -> Dict[str, Any]:
+        """Replace the live properties data with the rows of ``df``"""
+        # Insert in chunk-sized batches so only one batch of dicts exists at a time
+        return self._swap_in(lambda staging: ChunkedIngester(staging).write_frame(df), bump_version)
+    
+    def _swap_in(self, write: Callable, bump_version: bool) -> Dict[str, Any]:
+        """Fill a staging collection with ``write``, index it and make it live"""
+        staging = self.create_staging()
+        if staging is None:
+            return {
+                'success': False,
+                'message': 'MongoDB not connected or no records to upload'
+            }
+        
+        try:
+            result = write(staging)
+            if not result['rows_written']:
+                staging.drop()
                 return {
                     'success': False,
                     'message': 'MongoDB not connected or no records to upload'
                 }
+            
+            self.promote_staging(staging, bump_version=False)
         except Exception as e:
+            self._record_error(e)
+            staging.drop()
             return {
                 'success': False,
                 'message': f'Upload failed: {str(e)}'
             }
+        
+        if bump_version:
+            bump_data_version()
+        return {
+            'success': True,
+            'count': result['rows_written'],
+            'collection': staging.name,
+            'rows_per_second': result['rows_per_second'],
+            'message': f"Successfully uploaded {result['rows_written']} records"
+        }
+    
+    def create_staging(self):
+        """A new, empty collection to fill before it goes live, or None when not connected"""
+        if self.db is None:
+            return None
+        return self.db[f'{self.PROPERTIES}_{uuid.uuid4().hex[:12]}']
+    
+    def promote_staging(self, staging, bump_version: bool = True):
+        """Index a filled staging collection and point readers at it.
+        
+        On failure the live collection is unchanged; the caller drops ``staging``.
+        """
+        staging.create_indexes(self.PROPERTY_INDEXES)
+        self._activate(staging.name)
+        if bump_version:
+            bump_data_version()
+    
+    def _activate(self, name: str):
+        """Point readers at ``name`` and drop the collection retired two swaps ago"""
+        pointers = self.db[self.POINTERS]
+        current = self._read_pointer()
+        previous = pointers.find_one_and_update(
+            {'_id': self.PROPERTIES},
+            {'$set': {'collection': name, 'previous': current, 'swapped_at': pd.Timestamp.now().isoformat()}},
+            upsert=True,
+            return_document=ReturnDocument.BEFORE,
+        )
+        
+        # This process reads the new collection at once; others on the next version
+        self._pointer = None
+        
+        # Keep the collection just replaced for cursors still reading it
+        retired = previous.get('previous') if previous else None
+        if retired and retired not in (name, previous['collection']):
+            self.db.drop_collection(retired)
+    
+    def ensure_area_keys(self):
+        """Backfill area_key and its indexes on data written before they existed"""
+        collection = self.collection
+        if collection is None or collection.find_one({'area_key': {'$exists': False}}) is None:
+            return
+        for area in collection.distinct('Area', {'area_key': {'$exists': False}}):
+            collection.update_many(
+                {'Area': area, 'area_key': {'$exists': False}},
+                {'$set': {'area_key': None if area is None else normalize_area(area)}}
+            )
+        collection.create_indexes(self.PROPERTY_INDEXES)
     
     def get_all_data(self) -> pd.DataFrame:
         """Get all data from MongoDB as DataFrame"""
         try:
-            if self.collection:
-                cursor = self.collection.find({}, {'_id': 0})
-                data = list(cursor)
-                if data:
-                    return pd.DataFrame(data)
+            collection = self.collection
+            if collection is not None:
+                cursor = collection.find({}, self.projection()).batch_size(settings.MONGODB_BATCH_SIZE)
+                return cursor_to_frame(cursor)
             return pd.DataFrame()
         except Exception as e:
+            self._record_error(e)
             print(f"Error fetching data: {str(e)}")
             return pd.DataFrame()
     
     def get_data_by_area(self, area: str) -> pd.DataFrame:
         """Get data filtered by area"""
         try:
-            if self.collection:
+            collection = self.collection
+            if collection is not None:
                 query = {'Area': {'$regex': area, '$options': 'i'}}
-                cursor = self.collection.find(query, {'_id': 0})
-                data = list(cursor)
-                if data:
-                    return pd.DataFrame(data)
+                cursor = collection.find(query, self.projection()).batch_size(settings.MONGODB_BATCH_SIZE)
+                return cursor_to_frame(cursor)
             return pd.DataFrame()
         except Exception as e:
+            self._record_error(e)
             print(f"Error fetching data by area: {str(e)}")
             return pd.DataFrame()
     
     def get_unique_areas(self) -> List[str]:
         """Get list of unique areas"""
         try:
-            if self.collection:
-                areas = self.collection.distinct('Area')
+            collection = self.collection
+            if collection is not None:
+                areas = collection.distinct('Area')
                 return sorted(areas)
             return []
         except Exception as e:
+            self._record_error(e)
             print(f"Error fetching unique areas: {str(e)}")
             return []
     
-    def save_query_log(self, query: str, response: Dict[str, Any]):
-        """Save query logs to MongoDB"""
+    def save_query_logs(self, records: List[Dict[str, Any]]) -> bool:
+        """Save a batch of query log records to MongoDB"""
         try:
-            if self.db:
-                logs_collection = self.db['query_logs']
-                log_entry = {
-                    'query': query,
-                    'success': response.get('success', False),
-                    'timestamp': pd.Timestamp.now().isoformat()
-                }
-                logs_collection.insert_one(log_entry)
+            if self.db is not None and records:
+                self.db['query_logs'].insert_many(records, ordered=False)
+                return True
+            return False
         except Exception as e:
-            print(f"Error saving query log: {str(e)}")
+            self._record_error(e)
+            print(f"Error saving query logs: {str(e)}")
+            return False
     
     def get_statistics(self) -> Dict[str, Any]:
         """Get database statistics"""
         try:
-            if self.collection:
-                total_records = self.collection.count_documents({})
+            collection = self.collection
+            if collection is not None:
+                total_records = collection.count_documents({})
                 areas = self.get_unique_areas()
                 
                 # Get price range
-                price_stats = list(self.collection.aggregate([
+                price_stats = list(collection.aggregate([
                     {
                         '$group': {
                             '_id': None,
@@ -138,6 +435,7 @@ class MongoDBService:
                 }
             return {}
         except Exception as e:
+            self._record_error(e)
             print(f"Error getting statistics: {str(e)}")
             return {}
     
@@ -156,3 +454,9 @@ def get_mongo_service():
     if _mongo_service is None:
         _mongo_service = MongoDBService()
     return _mongo_service
+
+
+def reset_mongo_service():
+    """Forget the client inherited across a fork; the next use connects anew"""
+    global _mongo_service
+    _mongo_service = None
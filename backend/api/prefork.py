@@ -0,0 +1,71 @@
+import gc
+import os
+import time
+from django.conf import settings
+from typing import Dict, Any
+from .data_store import get_data_store
+from .mongo_engine import peek_query_dataset, warm_query_dataset
+from .mongodb_service import reset_mongo_service
+
+
+def preload_query_dataset(excel_path: str = None):
+    """Load the dataset and its indexes in the server's master process.
+
+    Runs synchronously before the server forks workers (gunicorn
+    ``preload_app``), so every worker starts ready and shares the loaded
+    pages copy-on-write instead of holding its own copy. The columns are
+    memory-mapped from the version's snapshot, so they stay shared even
+    after a worker reloads a newer version. ``gc.freeze`` moves everything
+    loaded so far out of the collector's reach, so collections in workers
+    never write to (and un-share) those pages.
+
+    The MongoDB engine keeps no rows in memory; it attaches in each worker
+    after the fork instead (see ``after_fork``).
+    """
+    if settings.QUERY_ENGINE == 'mongo':
+        return
+    start = time.perf_counter()
+    dataset = get_data_store(excel_path).get()
+    gc.collect()
+    gc.freeze()
+    print(f"Dataset v{dataset.version} preloaded before fork in {(time.perf_counter() - start) * 1000:.1f} ms, "
+          f"{gc.get_freeze_count()} objects frozen")
+
+
+def after_fork():
+    """Reset state a forked worker must not share with its parent.
+
+    The parent's MongoDB client is dropped (pymongo clients are not
+    fork-safe), and a worker with nothing preloaded warms its dataset in
+    the background as a non-preloaded server would.
+    """
+    reset_mongo_service()
+    if settings.DATASET_WARM_ON_START and peek_query_dataset() is None:
+        warm_query_dataset()
+
+
+def process_memory() -> Dict[str, Any]:
+    """Memory of this process, split into pages shared with other workers and private ones.
+
+    ``pss`` charges each shared page to its sharers in equal parts, so the
+    workers' ``pss`` add up to what they really use together; ``private``
+    is what this worker alone holds. Read from ``/proc``, so Linux only;
+    elsewhere just the pid is returned.
+    """
+    memory = {'pid': os.getpid()}
+    try:
+        with open('/proc/self/smaps_rollup') as f:
+            fields = dict(line.split(':', 1) for line in f if line.rstrip().endswith(' kB'))
+    except OSError:
+        return memory
+
+    def kib(name: str) -> int:
+        return int(fields.get(name, '0 kB').split()[0]) * 1024
+
+    memory.update({
+        'rss_bytes': kib('Rss'),
+        'pss_bytes': kib('Pss'),
+        'shared_bytes': kib('Shared_Clean') + kib('Shared_Dirty'),
+        'private_bytes': kib('Private_Clean') + kib('Private_Dirty'),
+    })
+    return memory
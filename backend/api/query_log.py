@@ -0,0 +1,233 @@
+import atexit
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+import pandas as pd
+from django.conf import settings
+from django.utils.module_loading import import_string
+from typing import Dict, List, Any, Optional
+from .mongodb_service import get_mongo_service
+
+
+class QueryTrace:
+    """Timings and outcome of one chat query, filled in as it is answered"""
+
+    def __init__(self, query: str = '', endpoint: str = ''):
+        self.query = query
+        self.endpoint = endpoint
+        self.timestamp = pd.Timestamp.now().isoformat()
+        self.started = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+        self.areas: List[str] = []
+        self.intent: Optional[str] = None
+        # Summary cache tier that answered: memory, disk or miss (None when unused)
+        self.cache: Optional[str] = None
+        # Where the summary came from: cache, llm, fallback or mock
+        self.summary_source: Optional[str] = None
+        self.success: Optional[bool] = None
+        self.error: Optional[str] = None
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time a block and add it to the stage's total"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_stage(name, (time.perf_counter() - start) * 1000)
+
+    def add_stage(self, name: str, elapsed_ms: float):
+        self.stages[name] = self.stages.get(name, 0.0) + elapsed_ms
+
+    def as_record(self) -> Dict[str, Any]:
+        """Log record for this query"""
+        return {
+            'timestamp': self.timestamp,
+            'endpoint': self.endpoint,
+            'query': self.query,
+            'areas': self.areas,
+            'intent': self.intent,
+            'success': bool(self.success),
+            'error': self.error,
+            'cache': self.cache,
+            'summary_source': self.summary_source,
+            'stages_ms': {name: round(value, 3) for name, value in self.stages.items()},
+            'total_ms': round((time.perf_counter() - self.started) * 1000, 3),
+        }
+
+
+class MongoQueryLogSink:
+    """Writes batches to the ``query_logs`` collection"""
+
+    def write(self, records: List[Dict[str, Any]]):
+        if not get_mongo_service().save_query_logs(records):
+            raise RuntimeError('MongoDB query log write failed')
+
+
+class FileQueryLogSink:
+    """Appends batches to a JSON-lines file"""
+
+    def __init__(self, path: str = None):
+        self.path = str(path or settings.QUERY_LOG_FILE)
+
+    def write(self, records: List[Dict[str, Any]]):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(''.join(json.dumps(record, default=str) + '\n' for record in records))
+
+
+class QueryLogger:
+    """Ring buffer of query records flushed by a background thread.
+
+    ``log`` only appends under a lock, so it never waits on the sink. A
+    batch is written once ``batch_size`` records are pending or every
+    ``flush_interval_ms``. When the sink falls behind the buffer wraps and
+    the oldest records are dropped; when it fails the flusher backs off.
+    Both are counted.
+    """
+
+    MAX_BACKOFF_SECONDS = 30.0
+
+    def __init__(self, sink, capacity: int = 10_000, batch_size: int = 200,
+                 flush_interval_ms: int = 1000):
+        self.sink = sink
+        self.capacity = capacity
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self._buffer = deque()
+        self._cond = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._failures = 0
+        self.counters = dict.fromkeys(('logged', 'written', 'dropped', 'failed', 'batches'), 0)
+        self.high_water = 0
+        self.last_error = None
+
+    def log(self, record: Dict[str, Any]):
+        """Queue a record without blocking on I/O"""
+        with self._cond:
+            if len(self._buffer) >= self.capacity:
+                self._buffer.popleft()
+                self.counters['dropped'] += 1
+            self._buffer.append(record)
+            self.counters['logged'] += 1
+            self.high_water = max(self.high_water, len(self._buffer))
+            # A backing-off flusher is left to sleep; the ring buffer absorbs the rest
+            if len(self._buffer) >= self.batch_size and not self._failures:
+                self._cond.notify()
+        self._ensure_flusher()
+
+    def _ensure_flusher(self):
+        # Forked workers inherit the logger but not its thread
+        if self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._cond:
+            if self._pid == os.getpid() and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='query-log-flush', daemon=True)
+            self._thread.start()
+
+    def _take_batch(self) -> List[Dict[str, Any]]:
+        count = min(self.batch_size, len(self._buffer))
+        return [self._buffer.popleft() for _ in range(count)]
+
+    def _run(self):
+        while True:
+            with self._cond:
+                # After a failure always wait out the backoff, even with a full batch
+                if self._failures or len(self._buffer) < self.batch_size:
+                    self._cond.wait(timeout=self._delay())
+                batch = self._take_batch()
+            if batch:
+                self._write(batch)
+
+    def _delay(self) -> float:
+        """Flush interval, doubled for every consecutive sink failure"""
+        return min(self.flush_interval * (2 ** self._failures), self.MAX_BACKOFF_SECONDS)
+
+    def _write(self, batch: List[Dict[str, Any]]):
+        try:
+            with self._write_lock:
+                self.sink.write(batch)
+            self._failures = 0
+            with self._cond:
+                self.counters['written'] += len(batch)
+                self.counters['batches'] += 1
+        except Exception as e:
+            self._failures += 1
+            with self._cond:
+                self.counters['failed'] += len(batch)
+                self.last_error = str(e)
+            print(f"Query log flush failed: {str(e)}")
+
+    def flush(self):
+        """Write everything pending now, from the calling thread"""
+        while True:
+            with self._cond:
+                batch = self._take_batch()
+            if not batch:
+                return
+            self._write(batch)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                **self.counters,
+                'pending': len(self._buffer),
+                'capacity': self.capacity,
+                'high_water': self.high_water,
+                'sink': type(self.sink).__name__,
+                'last_error': self.last_error,
+            }
+
+
+class NullQueryLogger:
+    """Stand-in used when query logging is disabled"""
+
+    def log(self, record: Dict[str, Any]):
+        pass
+
+    def flush(self):
+        pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {'enabled': False}
+
+
+# Singleton instance
+_query_logger = None
+_query_logger_lock = threading.Lock()
+
+def get_query_logger():
+    """Get query logger instance"""
+    global _query_logger
+    if _query_logger is None:
+        with _query_logger_lock:
+            if _query_logger is None:
+                _query_logger = _build_query_logger()
+    return _query_logger
+
+
+def _build_query_logger():
+    if not settings.QUERY_LOG_ENABLED:
+        return NullQueryLogger()
+    if settings.QUERY_LOG_SINK:
+        sink = import_string(settings.QUERY_LOG_SINK)()
+    elif settings.MONGODB_URI:
+        sink = MongoQueryLogSink()
+    else:
+        sink = FileQueryLogSink()
+    logger = QueryLogger(
+        sink,
+        capacity=settings.QUERY_LOG_CAPACITY,
+        batch_size=settings.QUERY_LOG_BATCH_SIZE,
+        flush_interval_ms=settings.QUERY_LOG_FLUSH_MS,
+    )
+    # Best effort: write whatever is still buffered on a clean shutdown
+    atexit.register(logger.flush)
+    return logger
@@ -0,0 +1,126 @@
+import time
+from typing import Any
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from .metrics import current_trace, get_metrics
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - the format is then not offered
+    msgpack = None
+
+
+COLUMNAR_MEDIA_TYPE = 'application/vnd.realestate.columnar+json'
+
+
+def to_columnar(value: Any) -> Any:
+    """Rewrite every list of same-keyed flat objects as ``{"columns": [...], "data": [...]}``.
+
+    ``data`` holds one array per column, so table rows and chart series
+    send each key once instead of once per row. Lists of nested objects
+    (batch results) stay lists, with their contents rewritten.
+    """
+    if isinstance(value, dict):
+        return {key: to_columnar(item) for key, item in value.items()}
+    if (isinstance(value, list) and value and isinstance(value[0], dict)
+            and not any(isinstance(item, (dict, list)) for item in value[0].values())):
+        columns = list(value[0])
+        try:
+            # Same size and every column present means the same keys
+            if all(len(row) == len(columns) for row in value):
+                return {'columns': columns, 'data': [[row[column] for row in value] for column in columns]}
+        except (KeyError, TypeError):
+            pass
+    if isinstance(value, list):
+        return [to_columnar(item) for item in value]
+    return value
+
+
+def wants_columnar(request) -> bool:
+    """Whether a response built outside DRF's negotiation should be columnar"""
+    return request.GET.get('format') == 'columnar' or COLUMNAR_MEDIA_TYPE in request.META.get('HTTP_ACCEPT', '')
+
+
+def _record_serialize(start: float):
+    """Record encoding time as the ``serialize`` stage"""
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    get_metrics().observe('stage_duration', elapsed_ms, stage='serialize')
+    trace = current_trace()
+    if trace is not None:
+        trace.add_stage('serialize', elapsed_ms)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSON renderer that encodes straight to bytes with orjson when available.
+
+    orjson serializes numpy scalars and arrays natively and writes NaN as
+    null. Without orjson this behaves exactly like DRF's JSONRenderer.
+    Encoding time is recorded as the ``serialize`` stage.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        start = time.perf_counter()
+        try:
+            return self._render(data, accepted_media_type, renderer_context)
+        finally:
+            _record_serialize(start)
+
+    def _render(self, data, accepted_media_type, renderer_context):
+        if orjson is None or data is None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Keep DRF's pretty-printing for explicitly indented requests
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        return orjson.dumps(
+            data,
+            default=str,
+            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        )
+
+
+class ColumnarJSONRenderer(FastJSONRenderer):
+    """JSON with lists of rows sent column by column (see ``to_columnar``).
+
+    Chosen with ``Accept: application/vnd.realestate.columnar+json`` or
+    ``?format=columnar``.
+    """
+
+    media_type = COLUMNAR_MEDIA_TYPE
+    format = 'columnar'
+
+    def _render(self, data, accepted_media_type, renderer_context):
+        return super()._render(to_columnar(data), accepted_media_type, renderer_context)
+
+
+def _msgpack_default(value):
+    # numpy scalars and timestamps that reached the payload unconverted
+    if hasattr(value, 'item'):
+        return value.item()
+    return str(value)
+
+
+class MessagePackRenderer(BaseRenderer):
+    """The columnar layout encoded as MessagePack (``Accept: application/msgpack``).
+
+    Needs the ``msgpack`` package; it is not offered when that is missing.
+    """
+
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        start = time.perf_counter()
+        try:
+            return msgpack.packb(to_columnar(data), default=_msgpack_default, use_bin_type=True)
+        finally:
+            _record_serialize(start)
@@ -0,0 +1,101 @@
+import hashlib
+import json
+import threading
+from typing import Dict, Any, Optional, Tuple
+from django.conf import settings
+from django.core.cache import caches
+
+
+def response_etag(result: Dict[str, Any]) -> str:
+    """Strong ETag from the content of a query result"""
+    encoded = json.dumps(result, sort_keys=True, default=str).encode('utf-8')
+    return '"' + hashlib.sha256(encoded).hexdigest()[:32] + '"'
+
+
+def representation_etag(etag: str, format: str) -> str:
+    """ETag of one wire format of a result; plain JSON keeps the base ETag"""
+    if format == 'json':
+        return etag
+    return f'{etag[:-1]}-{format}"'
+
+
+class QueryResponseCache:
+    """Full /api/query/ results in Django's cache framework.
+
+    Keys combine the data version with the query's signature (matched
+    areas plus intent), so differently worded questions about the same
+    thing share an entry, and publishing a new version makes every older
+    entry unreachable at once.
+    """
+
+    def __init__(self, alias: str = None, timeout: int = None):
+        self.alias = alias or settings.QUERY_CACHE_ALIAS
+        self.timeout = settings.QUERY_CACHE_TIMEOUT if timeout is None else timeout
+        self._lock = threading.Lock()
+        self.counters = {
+            'hits': 0,
+            'misses': 0,
+            'sets': 0,
+            'errors': 0,
+        }
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    @staticmethod
+    def key(data_version: str, signature: str) -> str:
+        digest = hashlib.sha256(signature.encode('utf-8')).hexdigest()[:32]
+        return f'query:{data_version}:{digest}'
+
+    def _count(self, name: str):
+        with self._lock:
+            self.counters[name] += 1
+
+    def get(self, key: str) -> Optional[Tuple[Dict[str, Any], str]]:
+        """Cached (result, etag) for a key, or None"""
+        try:
+            entry = self.cache.get(key)
+        except Exception as e:
+            self._count('errors')
+            print(f"Error reading query response cache: {str(e)}")
+            entry = None
+        self._count('hits' if entry is not None else 'misses')
+        return entry
+
+    def set(self, key: str, result: Dict[str, Any]) -> str:
+        """Store a result and return its ETag"""
+        etag = response_etag(result)
+        try:
+            self.cache.set(key, (result, etag), self.timeout)
+            self._count('sets')
+        except Exception as e:
+            self._count('errors')
+            print(f"Error writing query response cache: {str(e)}")
+        return etag
+
+    def clear(self):
+        """Drop every cached response, e.g. after new data is published"""
+        try:
+            self.cache.clear()
+        except Exception as e:
+            self._count('errors')
+            print(f"Error clearing query response cache: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self.counters, backend=settings.CACHES[self.alias]['BACKEND'].rsplit('.', 1)[-1])
+
+
+# Singleton instance
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+def get_response_cache() -> QueryResponseCache:
+    """Get query response cache instance"""
+    global _response_cache
+    if _response_cache is None:
+        with _response_cache_lock:
+            if _response_cache is None:
+                _response_cache = QueryResponseCache()
+    return _response_cache
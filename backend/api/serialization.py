@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Any
+
+
+def _fill_missing(values: list, mask: np.ndarray) -> list:
+    """Replace masked positions with None, touching only the missing cells"""
+    if mask.any():
+        for position in np.flatnonzero(mask):
+            values[position] = None
+    return values
+
+
+def _to_native(value):
+    """Per-cell conversion, used only for mixed-type object columns"""
+    if value is None or (not isinstance(value, (list, dict)) and pd.isna(value)):
+        return None
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    if hasattr(value, 'item'):
+        return value.item()
+    return value
+
+
+def column_to_list(series: pd.Series) -> List[Any]:
+    """Convert one column to JSON-ready Python values in a vectorized way.
+
+    NaN/NaT become None, timestamps become ISO strings and numpy scalars
+    become native ints, floats and bools.
+    """
+    dtype = series.dtype
+
+    if isinstance(dtype, pd.CategoricalDtype):
+        categories = column_to_list(pd.Series(dtype.categories))
+        codes = series.cat.codes.to_numpy()
+        values = np.asarray(categories + [None], dtype=object)[codes].tolist()
+        return values
+
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        mask = series.isna().to_numpy()
+        values = series.dt.strftime('%Y-%m-%dT%H:%M:%S').tolist()
+        return _fill_missing(values, mask)
+
+    if pd.api.types.is_bool_dtype(dtype) or pd.api.types.is_integer_dtype(dtype):
+        if pd.api.types.is_extension_array_dtype(dtype):
+            return series.to_numpy(dtype=object, na_value=None).tolist()
+        return series.tolist()
+
+    if pd.api.types.is_float_dtype(dtype):
+        if pd.api.types.is_extension_array_dtype(dtype):
+            return series.to_numpy(dtype=object, na_value=None).tolist()
+        mask = np.isnan(series.to_numpy())
+        return _fill_missing(series.tolist(), mask)
+
+    if pd.api.types.infer_dtype(series, skipna=True) in ('string', 'empty'):
+        mask = series.isna().to_numpy()
+        return _fill_missing(series.astype(object).tolist(), mask)
+
+    # Mixed object column (e.g. from Mongo): fall back to per-cell conversion
+    return [_to_native(value) for value in series.tolist()]
+
+
+def frame_to_columns(df: pd.DataFrame) -> Dict[str, Any]:
+    """Column-oriented payload: column names once, then one value list per column"""
+    return {
+        'columns': [str(column) for column in df.columns],
+        'data': [column_to_list(df.iloc[:, position]) for position in range(df.shape[1])],
+    }
+
+
+def frame_to_records(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """Row-oriented payload built from vectorized columns (no per-cell checks)"""
+    if df.empty:
+        return []
+    columns = [str(column) for column in df.columns]
+    values = [column_to_list(df.iloc[:, position]) for position in range(df.shape[1])]
+    return [dict(zip(columns, row)) for row in zip(*values)]
@@ -1,13 +1,64 @@
 import pandas as pd
-import google.generativeai as genai
 from django.conf import settings
-from typing import Dict, List, Any
-import os
+from asgiref.sync import sync_to_async
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+import threading
+import time
+from typing import Dict, List, Any, Iterator, Optional, Tuple
 from .mongodb_service import get_mongo_service
+from .data_store import get_default_excel_path
+from .mongo_engine import get_query_dataset
+from .area_index import AreaStats
+from .comparison import build_comparison
+from .llm import get_summary_client, SummaryUnavailable
+from .summary_cache import get_summary_cache, summary_fingerprint
+from .serialization import frame_to_records
+from .table_pages import encode_cursor
+from .query_log import QueryTrace, get_query_logger
+from .response_cache import get_response_cache
+from .metrics import bind_trace, get_metrics
 
-# Configure Gemini AI
-if settings.GEMINI_API_KEY:
-    genai.configure(api_key=settings.GEMINI_API_KEY)
+def _format_value(value, spec: str, prefix: str = '') -> str:
+    """Format a number for a summary line; areas with no values read N/A"""
+    if value is None:
+        return 'N/A'
+    return f"{prefix}{value:{spec}}"
+
+
+def _cache_summary(future: Future, key: str, area: str, data_version: str):
+    """Store a finished LLM call in the summary cache"""
+    if future.cancelled() or future.exception() is not None:
+        return
+    get_summary_cache().set(key, area, data_version, future.result())
+
+
+def prewarm_summaries(top_n: int = None) -> threading.Thread:
+    """Generate summaries for the most queried areas in the background.
+
+    Called after an upload so popular areas already have a cached summary
+    for the new data version by the time users ask about them again.
+    """
+    top_n = settings.SUMMARY_PREWARM_TOP_N if top_n is None else top_n
+    
+    def run():
+        try:
+            if not get_summary_client().enabled:
+                return
+            analyzer = RealEstateAnalyzer()
+            cache = get_summary_cache()
+            for area in cache.top_areas(top_n):
+                stats = analyzer.get_area_stats(area)
+                if not stats or not stats.total_records:
+                    continue
+                summary_stats = stats.summary_stats()
+                if cache.get(analyzer.summary_cache_key(area, summary_stats)) is None:
+                    analyzer.submit_summary(area, summary_stats)
+        except Exception as e:
+            print(f"Summary pre-warm failed: {str(e)}")
+    
+    thread = threading.Thread(target=run, name='summary-prewarm', daemon=True)
+    thread.start()
+    return thread
 
 
 class RealEstateAnalyzer:
@@ -15,35 +66,45 @@ class RealEstateAnalyzer:
     
     def __init__(self, excel_path: str = None):
         """Initialize with Excel file path"""
-        self.excel_path = excel_path or os.path.join(settings.BASE_DIR, 'data', 'real_estate_data.xlsx')
+        self.excel_path = excel_path or get_default_excel_path()
         self.df = None
+        self.dataset = None
         self.mongo_service = get_mongo_service()
+        # Replaced per query by the public analyze/stream methods
+        self.trace = QueryTrace()
+        # Lookups memoized for the life of this analyzer, which is bound to one dataset
+        self._area_stats: Dict[str, Optional[AreaStats]] = {}
+        self._tables: Dict[Tuple[str, int], List[Dict[str, Any]]] = {}
+        # ETag of the last result served through the response cache
+        self.etag: Optional[str] = None
         self.load_data()
     
     def load_data(self):
-        """Load data from MongoDB first, fallback to Excel"""
-        try:
-            # Try loading from MongoDB first
-            self.df = self.mongo_service.get_all_data()
-            
-            # If MongoDB is empty, load from Excel and upload to MongoDB
-            if self.df.empty and os.path.exists(self.excel_path):
-                self.df = pd.read_excel(self.excel_path)
-                self.df.columns = self.df.columns.str.strip()
-                
-                # Upload to MongoDB
-                if settings.MONGODB_URI:
-                    self.mongo_service.upload_data_from_excel(self.excel_path)
-                    print("Data uploaded to MongoDB")
-            
-        except Exception as e:
-            print(f"Error loading data: {str(e)}")
-            # Fallback to Excel
-            if os.path.exists(self.excel_path):
-                self.df = pd.read_excel(self.excel_path)
-                self.df.columns = self.df.columns.str.strip()
-            else:
-                self.df = pd.DataFrame()
+        """Attach the shared dataset for the current data version (in memory or MongoDB)"""
+        with self.trace.stage('load'):
+            self.dataset = get_query_dataset(self.excel_path)
+        self.df = self.dataset.df
+    
+    def start_trace(self, query: str, endpoint: str) -> QueryTrace:
+        """Begin timing a query; dataset loading done by __init__ counts towards it"""
+        trace = QueryTrace(query, endpoint)
+        trace.started = self.trace.started
+        trace.stages.update(self.trace.stages)
+        self.trace = trace
+        bind_trace(trace)
+        return trace
+    
+    def finish_trace(self, result: Dict[str, Any] = None, error: Exception = None):
+        """Hand the finished trace to the metrics registry and the background query logger"""
+        trace = self.trace
+        if error is not None:
+            trace.success = False
+            trace.error = str(error)
+        elif result is not None:
+            trace.success = result.get('success', False)
+            trace.error = result.get('message') if not trace.success else None
+        get_metrics().record_trace(trace)
+        get_query_logger().log(trace.as_record())
     
     def filter_by_area(self, area: str) -> pd.DataFrame:
         """Filter data by area/locality"""
@@ -54,131 +115,190 @@ class RealEstateAnalyzer:
         filtered = self.df[self.df['Area'].str.contains(area, case=False, na=False)]
         return filtered
     
+    def get_area_stats(self, area: str) -> Optional[AreaStats]:
+        """Look up precomputed aggregates for an area"""
+        if area not in self._area_stats:
+            self._area_stats[area] = self.dataset.area_index.get(area)
+        return self._area_stats[area]
+    
+    def prefetch_area_stats(self, areas: List[str]):
+        """Look up several areas at once (one pipeline with the MongoDB engine)"""
+        missing = [area for area in dict.fromkeys(areas) if area not in self._area_stats]
+        if missing:
+            self._area_stats.update(self.dataset.area_index.get_many(missing))
+    
     def get_price_trend(self, area: str) -> List[Dict[str, Any]]:
         """Get price trend data for charting"""
-        filtered_data = self.filter_by_area(area)
-        
-        if filtered_data.empty:
-            return []
-        
-        # Group by year and calculate average price
-        trend_data = filtered_data.groupby('Year')['Price'].mean().reset_index()
-        trend_data = trend_data.sort_values('Year')
-        
-        return [
-            {'year': int(row['Year']), 'price': float(row['Price'])}
-            for _, row in trend_data.iterrows()
-        ]
+        stats = self.get_area_stats(area)
+        return stats.price_trend if stats else []
     
     def get_demand_trend(self, area: str) -> List[Dict[str, Any]]:
         """Get demand trend data for charting"""
-        filtered_data = self.filter_by_area(area)
-        
-        if filtered_data.empty:
-            return []
+        stats = self.get_area_stats(area)
+        return stats.demand_trend if stats else []
+    
+    def compare_areas(self, areas: List[str], buckets: pd.DataFrame = None) -> Dict[str, Any]:
+        """Compare multiple areas: averages, year-aligned trends, CAGR and ranks.
         
-        # Group by year and calculate average demand
-        trend_data = filtered_data.groupby('Year')['Demand'].mean().reset_index()
-        trend_data = trend_data.sort_values('Year')
+        ``buckets`` may hold the yearly buckets of more areas than compared,
+        e.g. fetched once for a whole batch.
+        """
+        if buckets is None:
+            buckets = self.dataset.area_index.yearly_buckets(areas)
+        comparison = build_comparison(areas, buckets)
         
-        return [
-            {'year': int(row['Year']), 'demand': float(row['Demand'])}
-            for _, row in trend_data.iterrows()
-        ]
-    
-    def compare_areas(self, areas: List[str]) -> Dict[str, Any]:
-        """Compare multiple areas"""
         comparison_data = {
-            'price_comparison': [],
-            'demand_comparison': []
+            'price_comparison': [
+                {'area': row['area'], 'avg_price': row['avg_price']} for row in comparison['areas']
+            ],
+            'demand_comparison': [
+                {'area': row['area'], 'avg_demand': row['avg_demand']} for row in comparison['areas']
+            ],
+            **comparison
         }
         
-        for area in areas:
-            filtered_data = self.filter_by_area(area)
-            
-            if not filtered_data.empty:
-                avg_price = filtered_data['Price'].mean()
-                avg_demand = filtered_data['Demand'].mean()
-                
-                comparison_data['price_comparison'].append({
-                    'area': area,
-                    'avg_price': float(avg_price)
-                })
-                comparison_data['demand_comparison'].append({
-                    'area': area,
-                    'avg_demand': float(avg_demand)
-                })
-        
         return comparison_data
     
     def get_filtered_table(self, area: str, limit: int = 50) -> List[Dict[str, Any]]:
         """Get filtered table data"""
-        filtered_data = self.filter_by_area(area)
+        if (area, limit) not in self._tables:
+            self._tables[(area, limit)] = self._filtered_table(area, limit)
+        return self._tables[(area, limit)]
+    
+    def prefetch_tables(self, areas: List[str], limit: int = 50):
+        """Fetch and serialize the tables of several areas in one pass"""
+        wanted = {}
+        for area in dict.fromkeys(areas):
+            stats = self.get_area_stats(area)
+            if stats is not None and (area, limit) not in self._tables:
+                wanted[area] = stats
+        if not wanted:
+            return
+        
+        frame, counts = self.dataset.areas_rows(list(wanted.values()), limit)
+        records = frame_to_records(frame) if not frame.empty else []
+        start = 0
+        for area, count in zip(wanted, counts):
+            self._tables[(area, limit)] = records[start:start + count]
+            start += count
+    
+    def _filtered_table(self, area: str, limit: int) -> List[Dict[str, Any]]:
+        stats = self.get_area_stats(area)
+        if stats is not None:
+            filtered_data = self.dataset.area_rows(stats, limit)
+        else:
+            filtered_data = self.filter_by_area(area).head(limit)
         
         if filtered_data.empty:
             return []
         
-        # Convert to list of dictionaries
-        table_data = filtered_data.head(limit).to_dict('records')
-        
-        # Convert numpy types to Python types
-        for record in table_data:
-            for key, value in record.items():
-                if pd.isna(value):
-                    record[key] = None
-                elif isinstance(value, (pd.Timestamp, pd.DatetimeTZDtype)):
-                    record[key] = str(value)
-                elif hasattr(value, 'item'):  # numpy types
-                    record[key] = value.item()
+        # Column-wise conversion of numpy/pandas types to JSON-ready values
+        table_data = frame_to_records(filtered_data)
         
         return table_data
     
-    def generate_summary_with_gemini(self, area: str, data: pd.DataFrame) -> str:
-        """Generate AI summary using Gemini"""
-        if not settings.GEMINI_API_KEY:
-            return self.generate_mock_summary(area, data)
-        
-        try:
-            # Calculate statistics
-            avg_price = data['Price'].mean()
-            avg_demand = data['Demand'].mean()
-            year_range = f"{data['Year'].min()} to {data['Year'].max()}"
-            total_records = len(data)
-            
-            # Create prompt for Gemini
-            prompt = f"""
+    def get_table_page(self, area: str, sort: str = None, columns: List[str] = None,
+                       limit: int = 50, cursor: str = None) -> Optional[Dict[str, Any]]:
+        """Get one cursor-paginated, sorted page of an area's rows"""
+        return self.dataset.table_pager.page(area, sort=sort, columns=columns, limit=limit, cursor=cursor)
+    
+    def build_summary_prompt(self, area: str, stats: Dict[str, Any]) -> str:
+        """Create prompt for Gemini from precomputed area statistics"""
+        avg_price = stats['avg_price']
+        avg_demand = stats['avg_demand']
+        year_range = f"{stats['min_year']} to {stats['max_year']}"
+        total_records = stats['total_records']
+        
+        return f"""
             Analyze the real estate data for {area} and provide a concise summary (3-4 sentences):
             
             Statistics:
-            - Average Price: ₹{avg_price:,.2f}
-            - Average Demand: {avg_demand:.2f}
+            - Average Price: {_format_value(avg_price, ',.2f', '₹')}
+            - Average Demand: {_format_value(avg_demand, '.2f')}
             - Data Period: {year_range}
             - Total Records: {total_records}
             
             Provide insights about the market trends, pricing, and investment potential.
             """
-            
-            model = genai.GenerativeModel('gemini-pro')
-            response = model.generate_content(prompt)
-            return response.text
-            
-        except Exception as e:
-            print(f"Error generating Gemini summary: {str(e)}")
-            return self.generate_mock_summary(area, data)
     
-    def generate_mock_summary(self, area: str, data: pd.DataFrame) -> str:
+    def summary_cache_key(self, area: str, stats: Dict[str, Any]) -> str:
+        """Cache key for an area summary under the current data version"""
+        return summary_fingerprint(area, stats, self.dataset.version)
+    
+    def submit_summary(self, area: str, stats: Dict[str, Any]) -> Future:
+        """Start (or join) the LLM call for an area; the result is cached when it lands"""
+        key = self.summary_cache_key(area, stats)
+        version = self.dataset.version
+        future = get_summary_client().submit(self.build_summary_prompt(area, stats))
+        # Cache even if this request gives up waiting, so the next one hits
+        future.add_done_callback(lambda done: _cache_summary(done, key, area, version))
+        return future
+    
+    def generate_summary_with_gemini(self, area: str, stats: Dict[str, Any]) -> str:
+        """Generate AI summary using Gemini, within the configured latency budget"""
+        client = get_summary_client()
+        if not client.enabled:
+            self.trace.summary_source = 'mock'
+            return self.generate_mock_summary(area, stats)
+        
+        cache = get_summary_cache()
+        key = self.summary_cache_key(area, stats)
+        cached = self.lookup_summary(cache.get_memory, 'memory', key)
+        if cached is None:
+            cached = self.lookup_summary(cache.get_persistent, 'disk', key)
+        if cached is not None:
+            return cached
+        
+        summary = client.wait(self.submit_summary(area, stats))
+        return self.llm_or_fallback(summary, area, stats)
+    
+    def lookup_summary(self, lookup, tier: str, key: str) -> Optional[str]:
+        """Run one summary cache tier lookup and record the outcome on the trace"""
+        summary = lookup(key)
+        self.trace.cache = tier if summary is not None else 'miss'
+        if summary is not None:
+            self.trace.summary_source = 'cache'
+        return summary
+    
+    def llm_or_fallback(self, summary: Optional[str], area: str, stats: Dict[str, Any]) -> str:
+        """Use the LLM summary, or the built-in one when it did not arrive in time"""
+        if summary is not None:
+            self.trace.summary_source = 'llm'
+            return summary
+        self.trace.summary_source = 'fallback'
+        return self.generate_mock_summary(area, stats)
+    
+    async def generate_summary_async(self, area: str, stats: Dict[str, Any]) -> str:
+        """Awaitable variant of generate_summary_with_gemini for ASGI views"""
+        client = get_summary_client()
+        if not client.enabled:
+            self.trace.summary_source = 'mock'
+            return self.generate_mock_summary(area, stats)
+        
+        cache = get_summary_cache()
+        key = self.summary_cache_key(area, stats)
+        cached = self.lookup_summary(cache.get_memory, 'memory', key)
+        if cached is None:
+            cached = await sync_to_async(self.lookup_summary)(cache.get_persistent, 'disk', key)
+        if cached is not None:
+            return cached
+        
+        summary = await client.wait_async(self.submit_summary(area, stats))
+        return self.llm_or_fallback(summary, area, stats)
+    
+    def generate_mock_summary(self, area: str, stats: Dict[str, Any]) -> str:
         """Generate a mock summary when Gemini is not available"""
-        if data.empty:
+        if not stats or not stats['total_records']:
             return f"No data available for {area}."
         
-        avg_price = data['Price'].mean()
-        avg_demand = data['Demand'].mean()
-        year_range = f"{data['Year'].min()} to {data['Year'].max()}"
+        avg_price = stats['avg_price']
+        avg_demand = stats['avg_demand']
+        year_range = f"{stats['min_year']} to {stats['max_year']}"
         
         # Price trend analysis
         price_trend = "stable"
-        if len(data) > 1:
-            price_change = ((data['Price'].iloc[-1] - data['Price'].iloc[0]) / data['Price'].iloc[0]) * 100
+        if stats['total_records'] > 1 and stats['first_price']:
+            price_change = ((stats['last_price'] - stats['first_price']) / stats['first_price']) * 100
             if price_change > 10:
                 price_trend = "growing"
             elif price_change < -10:
@@ -186,59 +306,157 @@ class RealEstateAnalyzer:
         
         summary = f"""Real Estate Analysis for {area}:
 
-The average property price in {area} is ₹{avg_price:,.2f}, with demand levels averaging {avg_demand:.2f} during the period {year_range}. 
+The average property price in {area} is {_format_value(avg_price, ',.2f', '₹')}, with demand levels averaging {_format_value(avg_demand, '.2f')} during the period {year_range}. 
 The market shows a {price_trend} trend, making it {"a promising investment opportunity" if price_trend == "growing" else "an area worth monitoring"}. 
-With {len(data)} data points analyzed, this locality demonstrates {"strong" if avg_demand > 50 else "moderate"} demand patterns."""
+With {stats['total_records']} data points analyzed, this locality demonstrates {"strong" if avg_demand is not None and avg_demand > 50 else "moderate"} demand patterns."""
         
         return summary
     
-    def analyze_query(self, query: str) -> Dict[str, Any]:
-        """Main method to analyze user query and return comprehensive response"""
+    def analyze_query(self, query: str, use_cache: bool = False) -> Dict[str, Any]:
+        """Main method to analyze user query and return comprehensive response.
+        
+        With ``use_cache`` the answer comes from (and goes to) the response
+        cache, and ``self.etag`` is set for cacheable results.
+        """
+        self.start_trace(query, 'query')
+        try:
+            result = self._analyze_query(query, use_cache)
+        except Exception as e:
+            self.finish_trace(error=e)
+            raise
+        self.finish_trace(result)
+        return result
+    
+    def _analyze_query(self, query: str, use_cache: bool = False) -> Dict[str, Any]:
         query_lower = query.lower()
         
         # Extract area names from query
         areas = self.extract_areas_from_query(query_lower)
-        
+        if use_cache:
+            return self.cached_answer(query_lower, areas)
+        return self.answer_for_areas(query_lower, areas)
+    
+    def query_signature(self, query_lower: str, areas: List[str]) -> Optional[str]:
+        """What a query resolves to: its intent and areas. Equal signatures get equal answers"""
         if not areas:
+            return None
+        if self.is_comparison(query_lower, areas):
+            return 'comparison:' + '|'.join(areas)
+        return f'{self.chart_type(query_lower)}:{areas[0]}'
+    
+    def cached_answer(self, query_lower: str, areas: List[str]) -> Dict[str, Any]:
+        """Serve the answer from the response cache, computing and storing it on a miss"""
+        self.etag = None
+        signature = self.query_signature(query_lower, areas)
+        if signature is None or not settings.QUERY_CACHE_ENABLED:
+            return self.answer_for_areas(query_lower, areas)
+        
+        key = get_response_cache().key(self.dataset.version, signature)
+        result = self.cache_hit(key, signature, areas)
+        if result is not None:
+            return result
+        
+        result = self.answer_for_areas(query_lower, areas)
+        # A fallback summary is a stand-in for a late LLM answer; don't pin it
+        if result.get('success') and self.trace.summary_source != 'fallback':
+            self.etag = get_response_cache().set(key, result)
+        return result
+    
+    def cache_hit(self, key: str, signature: str, areas: List[str]) -> Optional[Dict[str, Any]]:
+        """The cached answer for ``key``, or None. Hits count towards prewarm popularity"""
+        with self.trace.stage('cache'):
+            entry = get_response_cache().get(key)
+        if entry is None:
+            return None
+        
+        result, self.etag = entry
+        self.trace.intent = signature.split(':', 1)[0]
+        if self.trace.intent != 'comparison':
+            stats = self.get_area_stats(areas[0])
+            if stats:
+                get_summary_cache().record_area_query(stats.name)
+        return result
+    
+    def answer_for_areas(self, query_lower: str, areas: List[str], summary: str = None,
+                         buckets: pd.DataFrame = None) -> Dict[str, Any]:
+        """Answer a query whose areas are already extracted"""
+        if not areas:
+            self.trace.intent = 'unknown'
             return {
                 'success': False,
                 'message': 'Could not identify any area in your query. Please specify an area name.'
             }
         
         # Check if it's a comparison query
-        if 'compare' in query_lower and len(areas) > 1:
-            return self.handle_comparison_query(areas)
+        if self.is_comparison(query_lower, areas):
+            return self.handle_comparison_query(areas, buckets)
         
         # Single area analysis
-        return self.handle_single_area_query(areas[0], query_lower)
+        return self.handle_single_area_query(areas[0], query_lower, summary=summary)
     
-    def extract_areas_from_query(self, query: str) -> List[str]:
-        """Extract area names from user query"""
-        # Get unique areas from dataset
-        if self.df.empty:
-            return []
+    @staticmethod
+    def is_comparison(query_lower: str, areas: List[str]) -> bool:
+        return 'compare' in query_lower and len(areas) > 1
+    
+    async def analyze_query_async(self, query: str) -> Dict[str, Any]:
+        """Analyze a query without blocking the event loop on the LLM call"""
+        self.start_trace(query, 'query_async')
+        try:
+            result = await self._analyze_query_async(query)
+        except Exception as e:
+            self.finish_trace(error=e)
+            raise
+        self.finish_trace(result)
+        return result
+    
+    async def _analyze_query_async(self, query: str) -> Dict[str, Any]:
+        query_lower = query.lower()
+        areas = self.extract_areas_from_query(query_lower)
         
-        unique_areas = self.df['Area'].unique()
-        found_areas = []
+        # Only single-area answers call the LLM; everything else is pure lookups
+        if not areas or self.is_comparison(query_lower, areas):
+            return self.answer_for_areas(query_lower, areas)
         
-        for area in unique_areas:
-            if area.lower() in query:
-                found_areas.append(area)
+        area = areas[0]
+        stats = self.get_area_stats(area)
+        if not stats or not stats.total_records:
+            return self.handle_single_area_query(area, query_lower)
         
-        return found_areas
+        with self.trace.stage('summary'):
+            summary = await self.generate_summary_async(area, stats.summary_stats())
+        return self.handle_single_area_query(area, query_lower, summary=summary)
+    
+    def extract_areas_from_query(self, query: str) -> List[str]:
+        """Extract area names from user query"""
+        # Single pass over the query with the prebuilt word-level automaton
+        with self.trace.stage('extract'):
+            areas = self.dataset.area_matcher.find_areas(query)
+        self.trace.areas = areas
+        return areas
     
-    def handle_comparison_query(self, areas: List[str]) -> Dict[str, Any]:
+    def handle_comparison_query(self, areas: List[str], buckets: pd.DataFrame = None) -> Dict[str, Any]:
         """Handle comparison between multiple areas"""
-        comparison_data = self.compare_areas(areas)
+        self.trace.intent = 'comparison'
+        with self.trace.stage('aggregate'):
+            comparison_data = self.compare_areas(areas, buckets)
         
         # Generate comparison summary
-        summary = f"Comparing {' and '.join(areas)}:\n\n"
-        for item in comparison_data['price_comparison']:
-            summary += f"{item['area']}: Average Price ₹{item['avg_price']:,.2f}\n"
-        
-        summary += "\n"
-        for item in comparison_data['demand_comparison']:
-            summary += f"{item['area']}: Average Demand {item['avg_demand']:.2f}\n"
+        lines = [f"Comparing {' and '.join(areas)}:", '']
+        lines += [f"{item['area']}: Average Price {_format_value(item['avg_price'], ',.2f', '₹')}"
+                  for item in comparison_data['price_comparison']]
+        lines.append('')
+        lines += [f"{item['area']}: Average Demand {_format_value(item['avg_demand'], '.2f')}"
+                  for item in comparison_data['demand_comparison']]
+        
+        growth = [row for row in comparison_data['areas'] if row['price_cagr'] is not None]
+        if growth:
+            lines.append('')
+            lines += [
+                f"{row['area']}: Price CAGR {row['price_cagr']:.2%} "
+                f"({row['first_year']}-{row['last_year']}, growth rank {row['growth_rank']})"
+                for row in growth
+            ]
+        summary = '\n'.join(lines) + '\n'
         
         return {
             'success': True,
@@ -246,52 +464,324 @@ With {len(data)} data points analyzed, this locality demonstrates {"strong" if a
             'chart_data': {
                 'type': 'comparison',
                 'price_data': comparison_data['price_comparison'],
-                'demand_data': comparison_data['demand_comparison']
+                'demand_data': comparison_data['demand_comparison'],
+                'years': comparison_data['years'],
+                'areas': comparison_data['areas'],
+                'price_trends': comparison_data['price_trends'],
+                'demand_trends': comparison_data['demand_trends']
             },
             'table_data': []
         }
     
-    def handle_single_area_query(self, area: str, query: str) -> Dict[str, Any]:
+    def handle_single_area_query(self, area: str, query: str, summary: str = None) -> Dict[str, Any]:
         """Handle single area analysis query"""
-        filtered_data = self.filter_by_area(area)
+        with self.trace.stage('aggregate'):
+            stats = self.get_area_stats(area)
         
-        if filtered_data.empty:
+        if not stats or not stats.total_records:
             return {
                 'success': False,
                 'message': f'No data found for {area}.'
             }
         
-        # Generate summary
-        summary = self.generate_summary_with_gemini(area, filtered_data)
+        get_summary_cache().record_area_query(stats.name)
         
-        # Determine chart type based on query
-        chart_type = 'price'
-        chart_data = []
+        # Generate summary unless the caller already awaited one
+        if summary is None:
+            with self.trace.stage('summary'):
+                summary = self.generate_summary_with_gemini(area, stats.summary_stats())
         
+        return {
+            'success': True,
+            'summary': summary,
+            **self.build_area_payload(area, query)
+        }
+    
+    def build_area_payload(self, area: str, query: str) -> Dict[str, Any]:
+        """Build chart and table data for a single area (everything but the summary)"""
+        with self.trace.stage('aggregate'):
+            payload = self._build_area_payload(area, query)
+        self.trace.intent = payload['chart_data']['type']
+        return payload
+    
+    @staticmethod
+    def chart_type(query: str) -> str:
+        """Chart a single-area query asks for"""
         if 'demand' in query:
-            chart_type = 'demand'
+            return 'demand'
+        if 'price' in query or 'growth' in query:
+            return 'price'
+        return 'both'
+    
+    def _build_area_payload(self, area: str, query: str) -> Dict[str, Any]:
+        # Determine chart type based on query
+        chart_type = self.chart_type(query)
+        
+        if chart_type == 'demand':
             chart_data = self.get_demand_trend(area)
-        elif 'price' in query or 'growth' in query:
-            chart_type = 'price'
+        elif chart_type == 'price':
             chart_data = self.get_price_trend(area)
         else:
             # Default to price trend
-            chart_type = 'both'
             chart_data = {
                 'price': self.get_price_trend(area),
                 'demand': self.get_demand_trend(area)
             }
         
-        # Get table data
+        # Get table data; the rest is fetched page by page from /api/table/
         table_data = self.get_filtered_table(area)
+        stats = self.get_area_stats(area)
+        table_total = stats.row_count if stats is not None else len(table_data)
         
         return {
-            'success': True,
-            'summary': summary,
             'chart_data': {
                 'type': chart_type,
                 'data': chart_data
             },
             'table_data': table_data,
+            'table_total': table_total,
+            'table_next_cursor': (
+                encode_cursor(self.dataset.version, len(table_data))
+                if table_total > len(table_data) else None
+            ),
             'area': area
         }
+    
+    def analyze_batch(self, queries: List[str]) -> List[Dict[str, Any]]:
+        """Answer many queries at once, sharing the work between them.
+        
+        Areas are extracted once per distinct query, every area's aggregates
+        are fetched in one lookup, comparison buckets in one more, all table
+        rows are gathered and serialized together, and each distinct area is
+        summarized once, with LLM calls fanned out under
+        ``BATCH_LLM_CONCURRENCY``. Results keep the order of ``queries`` and
+        carry their own HTTP-style status, so one bad query does not fail
+        the rest.
+        """
+        batch_trace = self.start_trace(f'[batch of {len(queries)}]', 'batch')
+        
+        with batch_trace.stage('extract'):
+            matched: Dict[str, List[str]] = {}
+            for query in queries:
+                query_lower = query.strip().lower()
+                if query_lower and query_lower not in matched:
+                    matched[query_lower] = self.dataset.area_matcher.find_areas(query_lower)
+        
+        single, compared = [], []
+        for query_lower, areas in matched.items():
+            if self.is_comparison(query_lower, areas):
+                compared.extend(areas)
+            elif areas:
+                single.append(areas[0])
+        
+        with batch_trace.stage('aggregate'):
+            self.prefetch_area_stats(single)
+            self.prefetch_tables(single)
+            buckets = self.dataset.area_index.yearly_buckets(list(dict.fromkeys(compared))) if compared else None
+        
+        with batch_trace.stage('summary'):
+            summaries = self.batch_summaries(single)
+        
+        results = [
+            self._batch_item(index, query, matched, summaries, buckets)
+            for index, query in enumerate(queries)
+        ]
+        self.trace = batch_trace
+        get_metrics().record_stages(batch_trace)
+        return results
+    
+    def _batch_item(self, index: int, query: str, matched: Dict[str, List[str]],
+                    summaries: Dict[str, Tuple[str, str, Optional[str]]],
+                    buckets: Optional[pd.DataFrame]) -> Dict[str, Any]:
+        """Answer one query of a batch from the shared lookups; logged like a single query"""
+        self.trace = QueryTrace(query, 'batch')
+        query_lower = query.strip().lower()
+        if not query_lower:
+            self.trace.intent = 'unknown'
+            self.finish_trace({'success': False, 'message': 'Query is required'})
+            return {'index': index, 'query': query, 'status': 400, 'error': 'Query is required'}
+        
+        try:
+            areas = matched[query_lower]
+            self.trace.areas = areas
+            summary = None
+            if areas and not self.is_comparison(query_lower, areas) and areas[0] in summaries:
+                summary, self.trace.summary_source, self.trace.cache = summaries[areas[0]]
+            result = self.answer_for_areas(query_lower, areas, summary=summary, buckets=buckets)
+        except Exception as e:
+            self.finish_trace(error=e)
+            return {'index': index, 'query': query, 'status': 500, 'error': f'An error occurred: {str(e)}'}
+        
+        self.finish_trace(result)
+        if not result.get('success', False):
+            return {'index': index, 'query': query, 'status': 404, 'error': result.get('message', 'Analysis failed')}
+        return {'index': index, 'query': query, 'status': 200, **result}
+    
+    def batch_summaries(self, areas: List[str]) -> Dict[str, Tuple[str, str, Optional[str]]]:
+        """Summary, source and cache tier for each distinct area with records"""
+        client = get_summary_client()
+        cache = get_summary_cache()
+        results = {}
+        pending = {}
+        for area in dict.fromkeys(areas):
+            stats = self.get_area_stats(area)
+            if not stats or not stats.total_records:
+                continue
+            summary_stats = stats.summary_stats()
+            if not client.enabled:
+                results[area] = (self.generate_mock_summary(area, summary_stats), 'mock', None)
+                continue
+            
+            key = self.summary_cache_key(area, summary_stats)
+            for tier, lookup in (('memory', cache.get_memory), ('disk', cache.get_persistent)):
+                cached = lookup(key)
+                if cached is not None:
+                    results[area] = (cached, 'cache', tier)
+                    break
+            else:
+                pending[area] = summary_stats
+        
+        generated = self.fan_out_summaries(pending)
+        for area, summary_stats in pending.items():
+            summary = generated.get(area)
+            if summary is not None:
+                results[area] = (summary, 'llm', 'miss')
+            else:
+                results[area] = (self.generate_mock_summary(area, summary_stats), 'fallback', 'miss')
+        return results
+    
+    def fan_out_summaries(self, pending: Dict[str, Dict[str, Any]], limit: int = None) -> Dict[str, Optional[str]]:
+        """Run LLM calls with at most ``limit`` in flight, all within one latency budget.
+        
+        Calls still running when the budget runs out are left to finish in
+        the background, so their summaries land in the cache; calls never
+        started get the fallback summary.
+        """
+        limit = limit or settings.BATCH_LLM_CONCURRENCY
+        client = get_summary_client()
+        deadline = time.monotonic() + client.timeout
+        queued = list(pending.items())
+        running: Dict[Future, str] = {}
+        results: Dict[str, Optional[str]] = {}
+        
+        while queued or running:
+            while queued and len(running) < limit:
+                area, summary_stats = queued.pop(0)
+                running[self.submit_summary(area, summary_stats)] = area
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            done, _ = wait(running, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                # Already finished: returns at once, counting any failure
+                results[running.pop(future)] = client.wait(future, 0)
+        
+        for future, area in running.items():
+            results[area] = client.wait(future, 0)
+        return results
+    
+    def stream_query(self, query: str) -> Iterator[Dict[str, Any]]:
+        """Analyze a query as a sequence of events.
+
+        Chart and table data are emitted first, straight from the in-memory
+        index, followed by the summary as it streams from the LLM:
+        ``data`` -> ``summary_chunk``* -> ``summary`` -> ``done``.
+        """
+        self.start_trace(query, 'query_stream')
+        outcome = {'success': False}
+        error = None
+        try:
+            for event in self._stream_query(query):
+                if event['event'] == 'data':
+                    outcome = {'success': True}
+                elif event['event'] == 'error':
+                    outcome = {'success': False, 'message': event['error']}
+                yield event
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            # Also runs when the client disconnects mid-stream
+            self.finish_trace(outcome, error)
+    
+    def _stream_query(self, query: str) -> Iterator[Dict[str, Any]]:
+        query_lower = query.lower()
+        areas = self.extract_areas_from_query(query_lower)
+        self.etag = None
+        
+        # Comparisons and errors have no LLM step; send them in one go
+        if not areas or self.is_comparison(query_lower, areas):
+            yield from self.replay_answer(self.cached_answer(query_lower, areas))
+            return
+        
+        # Cached answers are replayed whole, with the ETag the view sends
+        key = None
+        if settings.QUERY_CACHE_ENABLED:
+            signature = self.query_signature(query_lower, areas)
+            key = get_response_cache().key(self.dataset.version, signature)
+            result = self.cache_hit(key, signature, areas)
+            if result is not None:
+                yield from self.replay_answer(result)
+                return
+        
+        area = areas[0]
+        with self.trace.stage('aggregate'):
+            stats = self.get_area_stats(area)
+        if not stats or not stats.total_records:
+            yield {'event': 'error', 'error': f'No data found for {area}.'}
+            return
+        
+        get_summary_cache().record_area_query(stats.name)
+        payload = self.build_area_payload(area, query_lower)
+        yield {'event': 'data', 'success': True, **payload}
+        with self.trace.stage('summary'):
+            for event in self.stream_summary(area, stats.summary_stats()):
+                # Same shape as the /api/query/ answer, so both paths share the entry
+                if event['event'] == 'summary' and key is not None and self.trace.summary_source != 'fallback':
+                    get_response_cache().set(key, {'success': True, 'summary': event['summary'], **payload})
+                yield event
+        yield {'event': 'done'}
+    
+    @staticmethod
+    def replay_answer(result: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """Stream events for an answer that is already complete"""
+        if not result.get('success', False):
+            yield {'event': 'error', 'error': result.get('message', 'Analysis failed')}
+            return
+        result = dict(result)
+        summary = result.pop('summary')
+        yield {'event': 'data', **result}
+        yield {'event': 'summary', 'summary': summary}
+        yield {'event': 'done'}
+    
+    def stream_summary(self, area: str, stats: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """Yield summary events, falling back to the mock summary on timeout"""
+        client = get_summary_client()
+        if client.enabled:
+            cache = get_summary_cache()
+            key = self.summary_cache_key(area, stats)
+            cached = self.lookup_summary(cache.get_memory, 'memory', key)
+            if cached is None:
+                cached = self.lookup_summary(cache.get_persistent, 'disk', key)
+            if cached is not None:
+                yield {'event': 'summary', 'summary': cached}
+                return
+            
+            version = self.dataset.version
+            parts = []
+            try:
+                for chunk in client.stream(
+                    self.build_summary_prompt(area, stats),
+                    on_complete=lambda text: cache.set(key, area, version, text)
+                ):
+                    parts.append(chunk)
+                    yield {'event': 'summary_chunk', 'text': chunk}
+                self.trace.summary_source = 'llm'
+                yield {'event': 'summary', 'summary': ''.join(parts)}
+                return
+            except SummaryUnavailable:
+                pass
+        
+        self.trace.summary_source = 'fallback' if client.enabled else 'mock'
+        # The client replaces any partial text with the fallback summary
+        yield {'event': 'summary', 'summary': self.generate_mock_summary(area, stats), 'fallback': True}
@@ -0,0 +1,144 @@
+import json
+import os
+import shutil
+import time
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from typing import Dict, Any, Optional
+
+
+MANIFEST = 'manifest.json'
+
+
+def get_snapshot_root() -> str:
+    """Directory holding one columnar snapshot per data version"""
+    return str(settings.SNAPSHOT_DIR)
+
+
+def snapshot_path(version: str) -> str:
+    return os.path.join(get_snapshot_root(), f'v{version}')
+
+
+def source_signature(path: str) -> Optional[Dict[str, Any]]:
+    """Identify a source file so snapshots of a replaced workbook are ignored"""
+    try:
+        st = os.stat(path)
+    except (FileNotFoundError, TypeError):
+        return None
+    return {'path': os.path.abspath(path), 'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+
+
+def _column_spec(series: pd.Series) -> Dict[str, Any]:
+    """Decide how a column is stored: plain numeric array, datetime, or category codes"""
+    if pd.api.types.is_bool_dtype(series.dtype) and not series.isna().any():
+        return {'kind': 'numeric', 'values': series.to_numpy(dtype=np.bool_)}
+    if pd.api.types.is_datetime64_any_dtype(series.dtype):
+        return {'kind': 'datetime', 'values': series.to_numpy(dtype='datetime64[ns]')}
+    if isinstance(series.dtype, pd.CategoricalDtype) and all(isinstance(c, str) for c in series.cat.categories):
+        return {
+            'kind': 'category',
+            'values': series.cat.codes.to_numpy(),
+            'categories': list(series.cat.categories),
+        }
+    if pd.api.types.is_numeric_dtype(series.dtype):
+        if series.isna().any():
+            # Compact float32 columns keep their width
+            dtype = np.float32 if series.dtype == np.float32 else np.float64
+            return {'kind': 'numeric', 'values': series.to_numpy(dtype=dtype, na_value=np.nan)}
+        return {'kind': 'numeric', 'values': series.to_numpy(dtype=getattr(series.dtype, 'numpy_dtype', series.dtype))}
+
+    # Strings and mixed objects are stored as category codes plus a label list
+    categorical = series.astype(str).where(series.notna()).astype('category')
+    return {
+        'kind': 'category',
+        'values': categorical.cat.codes.to_numpy(),
+        'categories': [str(category) for category in categorical.cat.categories],
+    }
+
+
+def write_snapshot(df: pd.DataFrame, version: str, source: str, source_file: str = None) -> str:
+    """Write ``df`` as memory-mappable ``.npy`` columns for ``version``.
+
+    The snapshot is built in a temporary directory and renamed into place,
+    so concurrent workers never see a partial snapshot.
+    """
+    root = get_snapshot_root()
+    final_path = snapshot_path(version)
+    if os.path.exists(os.path.join(final_path, MANIFEST)):
+        return final_path
+
+    os.makedirs(root, exist_ok=True)
+    tmp_path = f"{final_path}.{os.getpid()}.tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    columns = []
+    for position, name in enumerate(df.columns):
+        spec = _column_spec(df.iloc[:, position])
+        filename = f'col{position}.npy'
+        np.save(os.path.join(tmp_path, filename), np.ascontiguousarray(spec.pop('values')))
+        columns.append({'name': str(name), 'file': filename, **spec})
+
+    manifest = {
+        'version': version,
+        'rows': len(df),
+        'columns': columns,
+        'source': source,
+        'source_file': source_signature(source_file) if source_file else None,
+        'created_at': time.time(),
+    }
+    with open(os.path.join(tmp_path, MANIFEST), 'w') as f:
+        json.dump(manifest, f)
+
+    try:
+        os.rename(tmp_path, final_path)
+    except OSError:
+        # Another worker published the same version first
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+    prune_snapshots(keep=version)
+    return final_path
+
+
+def read_snapshot(version: str, source_file: str = None) -> Optional[pd.DataFrame]:
+    """Memory-map the snapshot for ``version``; None if missing or out of date"""
+    path = snapshot_path(version)
+    try:
+        with open(os.path.join(path, MANIFEST), 'r') as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+    # A workbook replaced without a version bump makes its snapshot stale
+    recorded = manifest.get('source_file')
+    if recorded and source_file and recorded != source_signature(source_file):
+        return None
+
+    data = {}
+    for column in manifest['columns']:
+        values = np.load(os.path.join(path, column['file']), mmap_mode='r')
+        if column['kind'] == 'category':
+            # Codes were written by _column_spec; validating would copy them out of the map
+            data[column['name']] = pd.Categorical.from_codes(values, categories=column['categories'], validate=False)
+        else:
+            data[column['name']] = values
+    # copy=False keeps numeric columns backed by the shared page cache
+    return pd.DataFrame(data, copy=False)
+
+
+def prune_snapshots(keep: str, retain: int = 2):
+    """Delete all but the newest ``retain`` snapshots (always keeping ``keep``)"""
+    root = get_snapshot_root()
+    try:
+        entries = [
+            os.path.join(root, name) for name in os.listdir(root)
+            if name.startswith('v') and not name.endswith('.tmp')
+        ]
+    except FileNotFoundError:
+        return
+    entries.sort(key=os.path.getmtime, reverse=True)
+    keep_path = snapshot_path(keep)
+    for path in entries[retain:]:
+        if path != keep_path:
+            shutil.rmtree(path, ignore_errors=True)
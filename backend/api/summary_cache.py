@@ -0,0 +1,175 @@
+import hashlib
+import json
+import threading
+import time
+from collections import Counter, OrderedDict
+from datetime import timedelta
+from typing import Dict, List, Any, Optional
+from django.conf import settings
+from django.utils import timezone
+from .area_index import normalize_area
+from .models import SummaryCacheEntry
+
+
+def summary_fingerprint(area: str, stats: Dict[str, Any], data_version: str) -> str:
+    """Hash of everything the summary prompt depends on"""
+    payload = {
+        'area': normalize_area(area),
+        'avg_price': stats['avg_price'],
+        'avg_demand': stats['avg_demand'],
+        'min_year': stats['min_year'],
+        'max_year': stats['max_year'],
+        'total_records': stats['total_records'],
+        'data_version': data_version,
+        'model': settings.GEMINI_MODEL,
+    }
+    encoded = json.dumps(payload, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class SummaryCache:
+    """Two-tier cache of LLM summaries: in-memory LRU backed by SQLite.
+
+    Keys already include the data version, so entries for replaced data
+    simply stop being requested and age out through the TTL.
+    """
+
+    # Purge expired rows from the persistent tier every N writes
+    PURGE_EVERY = 100
+
+    def __init__(self, max_entries: int = None, ttl_seconds: int = None, persistent: bool = None):
+        self.max_entries = max_entries or settings.SUMMARY_CACHE_SIZE
+        self.ttl_seconds = ttl_seconds or settings.SUMMARY_CACHE_TTL_SECONDS
+        self.persistent = settings.SUMMARY_CACHE_PERSISTENT if persistent is None else persistent
+        self._memory: 'OrderedDict[str, tuple]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.area_queries = Counter()
+        self.counters = {
+            'memory_hits': 0,
+            'disk_hits': 0,
+            'misses': 0,
+            'sets': 0,
+            'evictions': 0,
+            'disk_errors': 0,
+        }
+
+    def _count(self, name: str):
+        with self._lock:
+            self.counters[name] += 1
+
+    def get_memory(self, key: str) -> Optional[str]:
+        """Look up the in-memory tier only; safe to call from async code"""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return None
+            summary, expires_at = entry
+            if expires_at < time.time():
+                del self._memory[key]
+                return None
+            self._memory.move_to_end(key)
+            self.counters['memory_hits'] += 1
+            return summary
+
+    def get_persistent(self, key: str) -> Optional[str]:
+        """Look up the SQLite tier, promoting hits into memory"""
+        if self.persistent:
+            try:
+                entry = SummaryCacheEntry.objects.filter(key=key, expires_at__gt=timezone.now()).first()
+                if entry is not None:
+                    self._count('disk_hits')
+                    self._remember(key, entry.summary, entry.expires_at.timestamp())
+                    return entry.summary
+            except Exception as e:
+                self._count('disk_errors')
+                print(f"Summary cache read failed: {str(e)}")
+        self._count('misses')
+        return None
+
+    def get(self, key: str) -> Optional[str]:
+        """Look up a summary in memory, then on disk"""
+        summary = self.get_memory(key)
+        if summary is not None:
+            return summary
+        return self.get_persistent(key)
+
+    def _remember(self, key: str, summary: str, expires_at: float):
+        with self._lock:
+            self._memory[key] = (summary, expires_at)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+                self.counters['evictions'] += 1
+
+    def set(self, key: str, area: str, data_version: str, summary: str):
+        """Store a summary in both tiers"""
+        with self._lock:
+            # Coalesced waiters may all try to store the same result
+            existing = self._memory.get(key)
+            if existing is not None and existing[0] == summary:
+                return
+        expires_at = time.time() + self.ttl_seconds
+        self._remember(key, summary, expires_at)
+        with self._lock:
+            self.counters['sets'] += 1
+            self._writes += 1
+            purge = self._writes % self.PURGE_EVERY == 0
+
+        if not self.persistent:
+            return
+        try:
+            SummaryCacheEntry.objects.update_or_create(
+                key=key,
+                defaults={
+                    'area': area,
+                    'data_version': data_version,
+                    'summary': summary,
+                    'expires_at': timezone.now() + timedelta(seconds=self.ttl_seconds),
+                }
+            )
+            if purge:
+                SummaryCacheEntry.objects.filter(expires_at__lte=timezone.now()).delete()
+        except Exception as e:
+            self._count('disk_errors')
+            print(f"Summary cache write failed: {str(e)}")
+
+    def record_area_query(self, area: str):
+        """Count a query so pre-warming can target the most asked-about areas"""
+        with self._lock:
+            self.area_queries[area] += 1
+
+    def top_areas(self, n: int) -> List[str]:
+        with self._lock:
+            return [area for area, _ in self.area_queries.most_common(n)]
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters for sizing the cache"""
+        with self._lock:
+            lookups = self.counters['memory_hits'] + self.counters['disk_hits'] + self.counters['misses']
+            hits = self.counters['memory_hits'] + self.counters['disk_hits']
+            return dict(
+                self.counters,
+                memory_entries=len(self._memory),
+                hit_ratio=round(hits / lookups, 4) if lookups else None,
+            )
+
+
+# Singleton instance
+_summary_cache = None
+_summary_cache_lock = threading.Lock()
+
+def get_summary_cache() -> SummaryCache:
+    """Get summary cache instance"""
+    global _summary_cache
+    if _summary_cache is None:
+        with _summary_cache_lock:
+            if _summary_cache is None:
+                _summary_cache = SummaryCache()
+    return _summary_cache
+
+
+def set_summary_cache(cache: Optional[SummaryCache]):
+    """Replace the shared cache, e.g. with a memory-only one for load tests"""
+    global _summary_cache
+    _summary_cache = cache
@@ -0,0 +1,120 @@
+import base64
+import json
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Any, Optional
+from .serialization import frame_to_records
+
+
+class InvalidCursor(ValueError):
+    """Raised for malformed cursors"""
+
+
+class StaleCursor(InvalidCursor):
+    """Raised for cursors issued for another data version"""
+
+
+def encode_cursor(version: str, offset: int) -> str:
+    """Opaque cursor pointing at a position in one data version"""
+    raw = json.dumps({'v': version, 'o': offset}, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str, version: str) -> int:
+    """Return the offset stored in ``cursor`` after checking its data version"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        offset = int(payload['o'])
+        cursor_version = str(payload['v'])
+    except (ValueError, KeyError, TypeError):
+        raise InvalidCursor('Invalid cursor')
+    if cursor_version != version:
+        raise StaleCursor('Data has changed since this cursor was issued; restart from the first page')
+    if offset < 0:
+        raise InvalidCursor('Invalid cursor')
+    return offset
+
+
+class TablePager:
+    """Serves sorted, projected pages of one area's rows from a dataset snapshot.
+
+    Row positions come from the area index, and the sorted order for each
+    (area, column, direction) is computed once and kept in a small LRU, so
+    serving a page costs O(page size).
+    """
+
+    MAX_CACHED_ORDERS = 256
+
+    def __init__(self, dataset):
+        self.dataset = dataset
+        self._orders: 'OrderedDict[tuple, np.ndarray]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _sorted_rows(self, key: str, rows: np.ndarray, column: Optional[str], descending: bool) -> np.ndarray:
+        """Row positions of an area ordered by ``column`` (frame order when None)"""
+        if column is None:
+            return rows
+
+        cache_key = (key, column, descending)
+        with self._lock:
+            order = self._orders.get(cache_key)
+            if order is not None:
+                self._orders.move_to_end(cache_key)
+                return order
+
+        # Index by frame position so the sorted index is the answer
+        values = pd.Series(self.dataset.df[column].iloc[rows].to_numpy(), index=rows)
+        # Stable sort keeps frame order for ties; missing values always go last
+        order = values.sort_values(
+            ascending=not descending, kind='mergesort', na_position='last'
+        ).index.to_numpy(dtype=np.int64)
+
+        with self._lock:
+            self._orders[cache_key] = order
+            while len(self._orders) > self.MAX_CACHED_ORDERS:
+                self._orders.popitem(last=False)
+        return order
+
+    def page(self, area: str, sort: str = None, columns: List[str] = None,
+             limit: int = 50, cursor: str = None) -> Optional[Dict[str, Any]]:
+        """Return one page of an area's rows, or None if the area is unknown.
+
+        ``sort`` is a column name, prefixed with ``-`` for descending order.
+        """
+        df = self.dataset.df
+        stats = self.dataset.area_index.get(area)
+        if stats is None:
+            return None
+
+        all_columns = [str(column) for column in df.columns]
+        columns = columns or all_columns
+        unknown = [column for column in columns if column not in all_columns]
+        if unknown:
+            raise ValueError(f"Unknown column(s): {', '.join(unknown)}")
+
+        sort_column = None
+        descending = False
+        if sort:
+            descending = sort.startswith('-')
+            sort_column = sort.lstrip('-')
+            if sort_column not in all_columns:
+                raise ValueError(f'Unknown sort column: {sort_column}')
+
+        offset = decode_cursor(cursor, self.dataset.version) if cursor else 0
+        ordered = self._sorted_rows(stats.key, stats.rows, sort_column, descending)
+        positions = ordered[offset:offset + limit]
+        next_offset = offset + len(positions)
+
+        # Select rows and columns together so only the page is copied
+        page_frame = df.iloc[positions, [all_columns.index(column) for column in columns]]
+        return {
+            'area': stats.name,
+            'columns': columns,
+            'rows': frame_to_records(page_frame),
+            'total': int(len(ordered)),
+            'next_cursor': encode_cursor(self.dataset.version, next_offset) if next_offset < len(ordered) else None,
+            'data_version': self.dataset.version,
+        }
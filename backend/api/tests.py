@@ -1,3 +1,412 @@
-from django.test import TestCase
+import gc
+import io
+import json
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+import mongomock
+from django.conf import settings
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from . import mongo_engine, mongodb_service
+from .benchmarks import _same, generate_dataset
+from .chunked_ingest import ChunkedIngester
+from .compact import compact_frame
+from .data_store import get_data_store, publish_dataframe
+from .data_version import bump_data_version
+from .ingestion import IngestionPipeline
+from .llm import FakeLLMBackend, SummaryClient, get_summary_client, set_summary_client
+from .loadtest import _memory_worker, bench_query_path, compare_to_baseline, stubbed_llm, synthetic_data
+from .models import IngestionJob
+from .mongo_engine import MongoDataset, MongoDatasetStore, get_query_dataset
+from .mongodb_service import MongoDBService
+from .prefork import preload_query_dataset
+from .response_cache import get_response_cache
+from .services import RealEstateAnalyzer
+from .summary_cache import SummaryCache, get_summary_cache, set_summary_cache
 
-# Create your tests here.
+
+class SummaryClientTests(SimpleTestCase):
+    """Coalescing, latency budget and stream isolation of the shared LLM client"""
+
+    def setUp(self):
+        self.previous = get_summary_client()
+        self.addCleanup(set_summary_client, self.previous)
+        # Summaries land from LLM threads; keep them off the database SimpleTestCase blocks
+        self.addCleanup(set_summary_cache, get_summary_cache())
+        set_summary_cache(SummaryCache(persistent=False))
+
+    def install(self, backend, **kwargs) -> SummaryClient:
+        client = SummaryClient(backend=backend, **kwargs)
+        set_summary_client(client)
+        self.addCleanup(client.close)
+        return client
+
+    def test_identical_concurrent_requests_make_one_upstream_call(self):
+        backend = FakeLLMBackend(delay=0.3)
+        self.install(backend, timeout=5)
+        barrier = threading.Barrier(50)
+        results = []
+
+        def ask():
+            barrier.wait()
+            results.append(get_summary_client().summarize('Summarize Wakad'))
+
+        threads = [threading.Thread(target=ask) for _ in range(50)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(backend.calls, 1)
+        self.assertEqual(len(results), 50)
+        self.assertEqual(len(set(results)), 1)
+        self.assertIsNotNone(results[0])
+        stats = get_summary_client().stats()
+        self.assertEqual(stats['upstream_calls'], 1)
+        self.assertEqual(stats['coalesced'], 49)
+
+    def test_over_budget_call_returns_fallback_summary(self):
+        with synthetic_data(2_000, areas=20) as df, stubbed_llm():
+            # Replace the stub installed above with one slower than the budget
+            self.install(FakeLLMBackend(delay=1.0), timeout=0.05)
+            get_response_cache().clear()
+            area = str(df['Area'].iloc[0])
+            response = self.client.get('/api/query/', {'query': f'Analyze {area}'})
+
+            self.assertEqual(response.status_code, 200)
+            summary = response.json()['summary']
+            self.assertTrue(summary.startswith(f'Real Estate Analysis for {area}'))
+            self.assertNotIn('[fake summary]', summary)
+            self.assertEqual(get_summary_client().stats()['timeouts'], 1)
+
+    def test_streams_do_not_starve_blocking_calls(self):
+        class SlowStream(FakeLLMBackend):
+            def stream(self, prompt):
+                yield 'first'
+                time.sleep(1)
+                yield ' last'
+
+        client = self.install(SlowStream(delay=0), timeout=5, max_workers=1, max_streams=1)
+        stream = client.stream('long streamed answer', timeout=5)
+        self.assertEqual(next(stream), 'first')
+
+        # The only blocking worker is free although a stream is still running
+        self.assertIsNotNone(client.summarize('short answer', timeout=0.5))
+        self.assertEqual(list(stream), [' last'])
+
+
+@override_settings(INGEST_CHUNK_SIZE=1000)
+class IngestionPipelineTests(TestCase):
+    """Uploads are written to Mongo chunk by chunk and swapped in whole"""
+
+    def setUp(self):
+        self.service = MongoDBService(client=mongomock.MongoClient())
+        patcher = mock.patch.object(mongodb_service, '_mongo_service', self.service)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = tmp.name
+        self.df = generate_dataset(3_500, 30, seed=7)
+
+    def run_pipeline(self, df) -> IngestionJob:
+        upload_path = os.path.join(self.tmp, 'upload.csv')
+        df.to_csv(upload_path, index=False)
+        job = IngestionJob.objects.create(id='job', filename='upload.csv')
+        IngestionPipeline(job.id, upload_path, os.path.join(self.tmp, 'data.xlsx')).run()
+        job.refresh_from_db()
+        return job
+
+    def property_collections(self):
+        return sorted(name for name in self.service.db.list_collection_names() if name.startswith('properties_'))
+
+    def test_chunks_reach_the_live_collection_and_the_served_frame(self):
+        with synthetic_data(100, areas=5):
+            with mock.patch.object(ChunkedIngester, 'write', autospec=True, side_effect=ChunkedIngester.write) as write:
+                job = self.run_pipeline(self.df)
+
+            self.assertEqual(job.status, IngestionJob.STATUS_SUCCEEDED, job.error)
+            # One bulk write per 1000-row chunk, made while parsing
+            self.assertEqual(write.call_count, 4)
+            self.assertEqual(self.service.collection.count_documents({}), len(self.df))
+            self.assertEqual(len(self.property_collections()), 1)
+            served = get_data_store(os.path.join(self.tmp, 'data.xlsx')).get().df
+            expected = compact_frame(self.df)
+            self.assertEqual(served['Area'].astype(str).tolist(), expected['Area'].astype(str).tolist())
+            self.assertEqual(served['Price'].tolist(), expected['Price'].tolist())
+
+    def test_failed_upload_drops_its_staging_collection(self):
+        with synthetic_data(100, areas=5):
+            self.assertEqual(self.run_pipeline(self.df).status, IngestionJob.STATUS_SUCCEEDED)
+            live = self.service.active_collection_name()
+            IngestionJob.objects.all().delete()
+
+            with mock.patch.object(self.service, 'promote_staging', side_effect=RuntimeError('index build failed')):
+                job = self.run_pipeline(self.df.head(1_500))
+
+            self.assertEqual(job.status, IngestionJob.STATUS_FAILED)
+            self.assertEqual(self.service.active_collection_name(), live)
+            self.assertEqual(self.property_collections(), [live])
+
+
+class CollectionSwapTests(SimpleTestCase):
+    """Versioned property collections behind the pointer document"""
+
+    def setUp(self):
+        self.service = MongoDBService(client=mongomock.MongoClient())
+        self.df = generate_dataset(500, 10, seed=3)
+
+    def property_collections(self):
+        return sorted(name for name in self.service.db.list_collection_names() if name.startswith('properties_'))
+
+    def test_swap_points_readers_at_the_indexed_new_collection(self):
+        first = self.service.replace_data(self.df, bump_version=False)
+        second = self.service.replace_data(self.df.head(200), bump_version=False)
+
+        self.assertTrue(second['success'])
+        self.assertNotEqual(first['collection'], second['collection'])
+        self.assertEqual(self.service.active_collection_name(), second['collection'])
+        self.assertEqual(self.service.collection.count_documents({}), 200)
+        indexes = [list(info['key']) for info in self.service.collection.index_information().values()]
+        self.assertIn([('area_key', 1), ('Year', 1)], indexes)
+
+    def test_failed_write_rolls_back_to_the_live_collection(self):
+        live = self.service.replace_data(self.df, bump_version=False)['collection']
+
+        def fail_midway(ingester, df):
+            ingester.write(df.head(100))
+            raise RuntimeError('connection reset')
+
+        with mock.patch.object(ChunkedIngester, 'write_frame', autospec=True, side_effect=fail_midway):
+            result = self.service.replace_data(self.df, bump_version=False)
+
+        self.assertFalse(result['success'])
+        self.assertEqual(self.service.active_collection_name(), live)
+        self.assertEqual(self.service.collection.count_documents({}), len(self.df))
+        self.assertEqual(self.property_collections(), [live])
+
+    def test_previous_collection_is_kept_for_one_swap(self):
+        first = self.service.replace_data(self.df, bump_version=False)['collection']
+        second = self.service.replace_data(self.df, bump_version=False)['collection']
+        self.assertEqual(self.property_collections(), sorted([first, second]))
+
+        third = self.service.replace_data(self.df, bump_version=False)['collection']
+        self.assertEqual(self.property_collections(), sorted([second, third]))
+        pointer = self.service.db[MongoDBService.POINTERS].find_one({'_id': MongoDBService.PROPERTIES})
+        self.assertEqual((pointer['collection'], pointer['previous']), (third, second))
+
+
+@override_settings(QUERY_CACHE_ENABLED=False)
+class QueryEngineParityTests(SimpleTestCase):
+    """The MongoDB engine answers exactly like the in-memory one"""
+
+    def setUp(self):
+        self.service = MongoDBService(client=mongomock.MongoClient())
+        patcher = mock.patch.object(mongo_engine, '_mongo_dataset_store', MongoDatasetStore(self.service))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def answers(self, engine: str, queries):
+        with override_settings(QUERY_ENGINE=engine):
+            dataset = get_query_dataset()
+            self.assertEqual(isinstance(dataset, MongoDataset), engine == 'mongo')
+            return [self.client.get('/api/query/', {'query': query}).json() for query in queries]
+
+    def test_area_comparison_and_trend_answers_match(self):
+        with synthetic_data(3_000, areas=25) as df:
+            # Uploads publish the compact frame, sorted like the Mongo engine reads it
+            publish_dataframe(compact_frame(df))
+            self.assertTrue(self.service.replace_data(df, bump_version=False)['success'])
+            areas = sorted(set(df['Area'].astype(str)))
+            queries = []
+            for first, second in zip(areas[:6], areas[6:12]):
+                queries += [
+                    f'Analyze {first}',
+                    f'Compare {first} and {second}',
+                    f'Show price growth for {first}',
+                    f'Demand trend of {second}',
+                ]
+
+            memory = self.answers('memory', queries)
+            mongo = self.answers('mongo', queries)
+
+        self.assertTrue(all(answer['success'] for answer in memory))
+        for query, expected, actual in zip(queries, memory, mongo):
+            self.assertTrue(_same(expected, actual), f'{query}: {expected} != {actual}')
+
+
+@override_settings(QUERY_CACHE_ENABLED=False)
+class MissingValueTests(SimpleTestCase):
+    """Areas whose prices or demand are all missing still get an answer"""
+
+    def test_area_without_prices(self):
+        with synthetic_data(2_000, areas=10) as df:
+            area = str(df['Area'].iloc[0])
+            df = df.copy()
+            df.loc[df['Area'] == area, 'Price'] = float('nan')
+            publish_dataframe(compact_frame(df))
+
+            response = self.client.get('/api/query/', {'query': f'Analyze {area}'})
+            self.assertEqual(response.status_code, 200, response.content)
+            self.assertIn('N/A', response.json()['summary'])
+
+            analyzer = RealEstateAnalyzer()
+            stats = analyzer.get_area_stats(area).summary_stats()
+            self.assertIsNone(stats['avg_price'])
+            self.assertIn('Average Price: N/A', analyzer.build_summary_prompt(area, stats))
+
+
+@override_settings(QUERY_CACHE_ENABLED=True)
+class QueryResponseCacheTests(SimpleTestCase):
+    """Cached answers on the streaming path the UI uses"""
+
+    def setUp(self):
+        get_response_cache().clear()
+        self.addCleanup(get_response_cache().clear)
+
+    def stream(self, query: str, **headers):
+        response = self.client.get('/api/query/stream/', {'query': query, 'format': 'columnar'}, headers=headers)
+        events = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()] \
+            if response.status_code == 200 else []
+        return response, events
+
+    def test_cached_stream_is_replayed_and_revalidated(self):
+        with synthetic_data(2_000, areas=10) as df:
+            query = f'Show price growth for {df["Area"].iloc[0]}'
+            first, streamed = self.stream(query)
+            self.assertNotIn('ETag', first)
+            self.assertEqual([event['event'] for event in streamed][-2:], ['summary', 'done'])
+
+            second, replayed = self.stream(query)
+            self.assertIn('ETag', second)
+            self.assertEqual([event['event'] for event in replayed], ['data', 'summary', 'done'])
+            self.assertEqual(replayed[0]['table_data'], streamed[0]['table_data'])
+            self.assertEqual(replayed[1]['summary'], streamed[-2]['summary'])
+
+            not_modified, _ = self.stream(query, if_none_match=second['ETag'])
+            self.assertEqual(not_modified.status_code, 304)
+            self.assertEqual(not_modified['ETag'], second['ETag'])
+
+    def test_cache_hits_count_towards_prewarm_popularity(self):
+        with synthetic_data(2_000, areas=10) as df:
+            area = str(df['Area'].iloc[0])
+            with mock.patch.object(get_summary_cache(), 'record_area_query') as record:
+                for _ in range(2):
+                    self.assertEqual(self.client.get('/api/query/', {'query': f'Analyze {area}'}).status_code, 200)
+                for _ in range(2):
+                    self.stream(f'Analyze {area}')
+            self.assertEqual(get_response_cache().stats()['hits'], 3)
+            self.assertEqual(record.call_count, 4)
+
+
+class MongoAttachTests(SimpleTestCase):
+    """MongoDB lookups made once per data version, not once per query"""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        settings_override = override_settings(DATA_VERSION_FILE=os.path.join(tmp.name, '.data_version'))
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.service = MongoDBService(client=mongomock.MongoClient())
+
+    def test_unavailable_mongo_is_not_retried_on_every_query(self):
+        store = MongoDatasetStore(self.service)
+        with mock.patch.object(self.service, 'ensure_area_keys', wraps=self.service.ensure_area_keys) as attach:
+            self.assertIsNone(store.get())
+            self.assertIsNone(store.get())
+            self.assertEqual(attach.call_count, 1)
+
+            bump_data_version()
+            self.assertIsNone(store.get())
+            self.assertEqual(attach.call_count, 2)
+
+        with override_settings(QUERY_ENGINE_RETRY_SECONDS=0), \
+                mock.patch.object(self.service, 'ensure_area_keys', wraps=self.service.ensure_area_keys) as attach:
+            store = MongoDatasetStore(self.service)
+            store.get()
+            store.get()
+            self.assertEqual(attach.call_count, 2)
+
+    def test_collection_pointer_is_read_once_per_version(self):
+        self.service.replace_data(generate_dataset(200, 5), bump_version=False)
+        with mock.patch.object(self.service, '_read_pointer', wraps=self.service._read_pointer) as read:
+            for _ in range(3):
+                self.service.collection
+            self.assertEqual(read.call_count, 1)
+            bump_data_version()
+            self.service.collection
+            self.assertEqual(read.call_count, 2)
+
+
+@unittest.skipUnless(os.path.exists('/proc/self/smaps_rollup'), 'needs /proc/self/smaps_rollup')
+class PreforkMemoryTests(SimpleTestCase):
+    """Workers forked after preload_query_dataset share the dataset instead of copying it"""
+
+    WORKERS = 3
+    # Measured at about 10 MB per worker; a worker holding its own copy of the
+    # 100k-row dataset is well above 40 MB
+    MAX_PRIVATE_BYTES = 24 * 2**20
+
+    def test_preloaded_workers_stay_small(self):
+        context = multiprocessing.get_context('fork')
+        with synthetic_data(100_000, areas=200) as df:
+            get_data_store().invalidate()
+            self.addCleanup(get_data_store().invalidate)
+            preload_query_dataset()
+            self.addCleanup(gc.unfreeze)
+
+            barrier = context.Barrier(self.WORKERS)
+            pipes = [context.Pipe(duplex=False) for _ in range(self.WORKERS)]
+            processes = [
+                context.Process(target=_memory_worker, args=('preload', df, barrier, sender), daemon=True)
+                for _, sender in pipes
+            ]
+            for process in processes:
+                process.start()
+            reports = [receiver.recv() for receiver, _ in pipes]
+            for process in processes:
+                process.join()
+
+        for report in reports:
+            self.assertLess(report['private_bytes'], self.MAX_PRIVATE_BYTES, report)
+
+
+class BenchmarkRegressionTests(TestCase):
+    """The query path against the committed ``benchmarks/baseline.json``"""
+
+    # Shared machines are noisy, so only latencies past twice the baseline, in
+    # every attempt, fail here; ``benchmark --check`` applies BENCHMARK_TOLERANCE.
+    # Wall-clock numbers only mean something on the machine that recorded them,
+    # so that comparison runs only with BENCHMARK_TESTS=1
+    TOLERANCE = 1.0
+    ATTEMPTS = 3
+
+    def test_baseline_is_committed(self):
+        with open(settings.BENCHMARK_BASELINE_FILE) as f:
+            baseline = json.load(f)
+        self.assertIn('query@10000', baseline['http_load'])
+        self.assertIn('filter_by_area@10000', baseline['query_path'])
+        self.assertIn('upload@1000000', baseline['upload'])
+
+    def test_check_fails_without_baseline(self):
+        missing = os.path.join(tempfile.gettempdir(), 'missing-baseline.json')
+        with self.assertRaisesMessage(CommandError, 'No baseline'):
+            call_command('benchmark', 'query_path', '--rows', '1000', '--check', '--baseline', missing,
+                         stdout=io.StringIO())
+
+    @unittest.skipUnless(os.getenv('BENCHMARK_TESTS') == '1', 'set BENCHMARK_TESTS=1 on the baseline machine')
+    def test_query_path_within_baseline(self):
+        with open(settings.BENCHMARK_BASELINE_FILE) as f:
+            baseline = json.load(f)
+        for _ in range(self.ATTEMPTS):
+            results = {'query_path': bench_query_path(sizes=(10_000, 100_000))}
+            regressions = compare_to_baseline(results, baseline, self.TOLERANCE)
+            if not regressions:
+                break
+        self.assertEqual(regressions, [])
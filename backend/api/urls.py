@@ -1,8 +1,16 @@
 from django.urls import path
-from .views import ChatQueryView, FileUploadView, HealthCheckView
+from .views import ChatQueryView, BatchQueryView, ChatQueryStreamView, AsyncChatQueryView, TablePageView, FileUploadView, UploadStatusView, HealthCheckView, LivenessView, ReadinessView, MetricsView
 
 urlpatterns = [
     path('query/', ChatQueryView.as_view(), name='chat-query'),
+    path('query/batch/', BatchQueryView.as_view(), name='chat-query-batch'),
+    path('query/stream/', ChatQueryStreamView.as_view(), name='chat-query-stream'),
+    path('query/async/', AsyncChatQueryView.as_view(), name='chat-query-async'),
+    path('table/', TablePageView.as_view(), name='table-page'),
     path('upload/', FileUploadView.as_view(), name='file-upload'),
+    path('upload/<str:job_id>/status/', UploadStatusView.as_view(), name='upload-status'),
     path('health/', HealthCheckView.as_view(), name='health-check'),
+    path('health/live/', LivenessView.as_view(), name='health-live'),
+    path('health/ready/', ReadinessView.as_view(), name='health-ready'),
+    path('metrics/', MetricsView.as_view(), name='metrics'),
 ]
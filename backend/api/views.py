@@ -3,19 +3,54 @@ from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 from django.conf import settings
-import os
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from asgiref.sync import sync_to_async
+import itertools
+import json
 from .services import RealEstateAnalyzer
+from .data_store import get_default_excel_path
+from .mongo_engine import MongoDataset, peek_query_dataset
+from .mongodb_service import get_mongo_service
+from .query_log import get_query_logger
+from .metrics import render_prometheus
+from .health import liveness, readiness
+from .prefork import process_memory
+from .chunked_ingest import SUPPORTED_EXTENSIONS
+from .ingestion import enqueue_ingestion
+from .models import IngestionJob
+from .table_pages import StaleCursor
+from .llm import get_summary_client
+from .summary_cache import get_summary_cache
+from .response_cache import get_response_cache, representation_etag
+from .renderers import COLUMNAR_MEDIA_TYPE, to_columnar, wants_columnar
 
 
 class ChatQueryView(APIView):
-    """Handle chat queries for real estate analysis"""
+    """Handle chat queries for real estate analysis.
+    
+    Answers are cached per data version (see ``QueryResponseCache``) and
+    carry an ``ETag``. ``GET ?query=`` lets browsers and CDNs revalidate
+    with ``If-None-Match`` and get a 304 instead of the payload. The body is
+    JSON, columnar JSON or MessagePack depending on ``Accept``, each with
+    its own ETag.
+    """
     
     parser_classes = [JSONParser]
     
+    def get(self, request):
+        """Process a query from ?query= and return analysis, or 304 if unchanged"""
+        return self.answer(request, request.query_params.get('query', '').strip())
+    
     def post(self, request):
         """Process user query and return analysis"""
-        query = request.data.get('query', '').strip()
-        
+        return self.answer(request, request.data.get('query', '').strip())
+    
+    def answer(self, request, query):
         if not query:
             return Response(
                 {'error': 'Query is required'},
@@ -27,7 +62,7 @@ class ChatQueryView(APIView):
             analyzer = RealEstateAnalyzer()
             
             # Analyze query
-            result = analyzer.analyze_query(query)
+            result = analyzer.analyze_query(query, use_cache=True)
             
             if not result.get('success', False):
                 return Response(
@@ -35,13 +70,220 @@ class ChatQueryView(APIView):
                     status=status.HTTP_404_NOT_FOUND
                 )
             
-            return Response(result, status=status.HTTP_200_OK)
+            if analyzer.etag is None:
+                return Response(result, status=status.HTTP_200_OK)
+            
+            etag = representation_etag(analyzer.etag, request.accepted_renderer.format)
             
+            # 304 for GETs whose If-None-Match already holds this answer
+            not_modified = None
+            if request.method in ('GET', 'HEAD'):
+                not_modified = get_conditional_response(request, etag=etag)
+            response = not_modified or Response(result, status=status.HTTP_200_OK)
+            response['ETag'] = etag
+            patch_cache_control(response, public=True, max_age=settings.QUERY_CACHE_MAX_AGE, must_revalidate=True)
+            patch_vary_headers(response, ('Accept',))
+            return response
+            
+        except Exception as e:
+            return Response(
+                {'error': f'An error occurred: {str(e)}'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class BatchQueryView(APIView):
+    """Answer a list of chat queries in one request"""
+    
+    parser_classes = [JSONParser]
+    
+    def post(self, request):
+        """Return one result per query, in order, each with its own status"""
+        queries = request.data.get('queries')
+        
+        if not isinstance(queries, list) or not queries or not all(isinstance(query, str) for query in queries):
+            return Response(
+                {'error': 'queries must be a non-empty list of strings'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if len(queries) > settings.BATCH_MAX_QUERIES:
+            return Response(
+                {'error': f'At most {settings.BATCH_MAX_QUERIES} queries per batch'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            analyzer = RealEstateAnalyzer()
+            results = analyzer.analyze_batch(queries)
+        except Exception as e:
+            return Response(
+                {'error': f'An error occurred: {str(e)}'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+        
+        return Response({
+            'results': results,
+            'count': len(results),
+            'succeeded': sum(1 for result in results if result['status'] == 200),
+            'data_version': analyzer.dataset.version
+        }, status=status.HTTP_200_OK)
+
+
+class ChatQueryStreamView(APIView):
+    """Stream chat query results as NDJSON events (columnar with ``?format=columnar``).
+    
+    Answers already in the response cache are replayed at once and carry
+    the same kind of ``ETag`` as ``ChatQueryView``, so ``GET ?query=`` can
+    be revalidated to a 304.
+    """
+    
+    parser_classes = [JSONParser]
+    
+    def get(self, request):
+        """Stream a query from ?query=, or 304 if the cached answer is unchanged"""
+        return self.stream(request, request.query_params.get('query', '').strip())
+    
+    def post(self, request):
+        """Send chart/table data immediately, then the summary as it streams"""
+        return self.stream(request, request.data.get('query', '').strip())
+    
+    def stream(self, request, query):
+        if not query:
+            return Response(
+                {'error': 'Query is required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            analyzer = RealEstateAnalyzer()
+            stream = analyzer.stream_query(query)
+            # The first event settles whether the answer came from the cache
+            first = next(stream)
         except Exception as e:
             return Response(
                 {'error': f'An error occurred: {str(e)}'},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+        
+        columnar = wants_columnar(request)
+        etag = None
+        if analyzer.etag is not None:
+            etag = representation_etag(analyzer.etag, 'columnar' if columnar else 'ndjson')
+            if request.method in ('GET', 'HEAD'):
+                not_modified = get_conditional_response(request, etag=etag)
+                if not_modified is not None:
+                    stream.close()
+                    not_modified['ETag'] = etag
+                    patch_cache_control(not_modified, public=True, max_age=settings.QUERY_CACHE_MAX_AGE, must_revalidate=True)
+                    patch_vary_headers(not_modified, ('Accept',))
+                    return not_modified
+        
+        def events():
+            try:
+                for event in itertools.chain([first], stream):
+                    yield json.dumps(to_columnar(event) if columnar else event, default=str) + '\n'
+            except Exception as e:
+                yield json.dumps({'event': 'error', 'error': f'An error occurred: {str(e)}'}) + '\n'
+        
+        response = StreamingHttpResponse(events(), content_type='application/x-ndjson')
+        if etag is None:
+            response['Cache-Control'] = 'no-cache'
+        else:
+            response['ETag'] = etag
+            patch_cache_control(response, public=True, max_age=settings.QUERY_CACHE_MAX_AGE, must_revalidate=True)
+            patch_vary_headers(response, ('Accept',))
+        # Stop reverse proxies from buffering the stream
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncChatQueryView(View):
+    """Handle chat queries without blocking a worker on the LLM call (ASGI)"""
+    
+    async def post(self, request):
+        """Process user query and return analysis"""
+        try:
+            payload = json.loads(request.body or b'{}')
+        except ValueError:
+            return JsonResponse({'error': 'Invalid JSON body'}, status=400)
+        
+        query = str(payload.get('query', '')).strip()
+        
+        if not query:
+            return JsonResponse({'error': 'Query is required'}, status=400)
+        
+        try:
+            # Construction may load the dataset, so keep it off the event loop
+            analyzer = await sync_to_async(RealEstateAnalyzer)()
+            
+            result = await analyzer.analyze_query_async(query)
+            
+            if not result.get('success', False):
+                return JsonResponse(
+                    {'error': result.get('message', 'Analysis failed')},
+                    status=404
+                )
+            
+            if wants_columnar(request):
+                return JsonResponse(to_columnar(result), status=200, content_type=COLUMNAR_MEDIA_TYPE)
+            return JsonResponse(result, status=200)
+            
+        except Exception as e:
+            return JsonResponse({'error': f'An error occurred: {str(e)}'}, status=500)
+
+
+class TablePageView(APIView):
+    """Cursor-paginated table rows for one area"""
+    
+    MAX_PAGE_SIZE = 500
+    
+    def get(self, request):
+        """Return a page of rows: ?area=&sort=-Price&columns=Year,Price&limit=&cursor="""
+        area = request.query_params.get('area', '').strip()
+        
+        if not area:
+            return Response(
+                {'error': 'area is required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            limit = int(request.query_params.get('limit', 50))
+        except ValueError:
+            return Response(
+                {'error': 'limit must be an integer'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        limit = max(1, min(limit, self.MAX_PAGE_SIZE))
+        
+        columns = [
+            column.strip()
+            for column in request.query_params.get('columns', '').split(',')
+            if column.strip()
+        ]
+        
+        try:
+            page = RealEstateAnalyzer().get_table_page(
+                area,
+                sort=request.query_params.get('sort') or None,
+                columns=columns or None,
+                limit=limit,
+                cursor=request.query_params.get('cursor') or None
+            )
+        except StaleCursor as e:
+            return Response({'error': str(e)}, status=status.HTTP_410_GONE)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        if page is None:
+            return Response(
+                {'error': f'No data found for {area}.'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        return Response(page, status=status.HTTP_200_OK)
 
 
 class FileUploadView(APIView):
@@ -50,7 +292,7 @@ class FileUploadView(APIView):
     parser_classes = [MultiPartParser, FormParser]
     
     def post(self, request):
-        """Upload and save Excel file"""
+        """Accept an Excel or CSV file and queue it for ingestion"""
         file_obj = request.FILES.get('file')
         
         if not file_obj:
@@ -60,26 +302,24 @@ class FileUploadView(APIView):
             )
         
         # Validate file type
-        if not file_obj.name.endswith(('.xlsx', '.xls')):
+        if not file_obj.name.lower().endswith(SUPPORTED_EXTENSIONS):
             return Response(
-                {'error': 'Only Excel files (.xlsx, .xls) are allowed'},
+                {'error': 'Only Excel or CSV files (.xlsx, .xls, .csv) are allowed'},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
         try:
-            # Create data directory if it doesn't exist
-            data_dir = os.path.join(settings.BASE_DIR, 'data')
-            os.makedirs(data_dir, exist_ok=True)
-            
-            # Save file
-            file_path = os.path.join(data_dir, 'real_estate_data.xlsx')
-            with open(file_path, 'wb+') as destination:
-                for chunk in file_obj.chunks():
-                    destination.write(chunk)
+            # Parsing, validation and the data swap happen in the background
+            job = enqueue_ingestion(file_obj, get_default_excel_path())
             
             return Response(
-                {'message': 'File uploaded successfully', 'filename': file_obj.name},
-                status=status.HTTP_201_CREATED
+                {
+                    'message': 'File uploaded, ingestion queued',
+                    'filename': file_obj.name,
+                    'job_id': job.id,
+                    'status_url': reverse('upload-status', args=[job.id])
+                },
+                status=status.HTTP_202_ACCEPTED
             )
             
         except Exception as e:
@@ -89,15 +329,70 @@ class FileUploadView(APIView):
             )
 
 
+class UploadStatusView(APIView):
+    """Report progress of a background ingestion job"""
+    
+    def get(self, request, job_id):
+        """Return job status, row counts and per-stage timings"""
+        job = IngestionJob.objects.filter(pk=job_id).first()
+        
+        if job is None:
+            return Response(
+                {'error': 'Unknown upload job'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        return Response(job.as_dict(), status=status.HTTP_200_OK)
+
+
 class HealthCheckView(APIView):
     """Health check endpoint"""
     
     def get(self, request):
-        """Return API health status"""
-        analyzer = RealEstateAnalyzer()
+        """Return API health status and component stats, without loading the dataset"""
+        dataset = peek_query_dataset()
+        dataset_stats = dataset.stats() if dataset is not None else {}
         
         return Response({
             'status': 'healthy',
-            'data_loaded': not analyzer.df.empty,
-            'gemini_configured': bool(settings.GEMINI_API_KEY)
+            'data_loaded': bool(dataset_stats.get('rows')),
+            'gemini_configured': bool(settings.GEMINI_API_KEY),
+            'query_engine': 'mongo' if isinstance(dataset, MongoDataset) else 'memory',
+            'dataset': dataset_stats,
+            'llm': get_summary_client().stats(),
+            'summary_cache': get_summary_cache().stats(),
+            'response_cache': get_response_cache().stats(),
+            'mongodb': get_mongo_service().stats(),
+            'query_log': get_query_logger().stats(),
+            'process': process_memory()
         }, status=status.HTTP_200_OK)
+
+
+class LivenessView(View):
+    """Liveness probe: answers as long as the worker process is serving"""
+    
+    def get(self, request):
+        return JsonResponse(liveness())
+
+
+class ReadinessView(View):
+    """Readiness probe: 200 once the dataset is loaded, 503 until then.
+    
+    Reads only cached state, so frequent load balancer probes never load
+    the dataset or wait on MongoDB for longer than the ping timeout.
+    """
+    
+    def get(self, request):
+        ready, body = readiness()
+        return JsonResponse(body, status=status.HTTP_200_OK if ready else status.HTTP_503_SERVICE_UNAVAILABLE)
+
+
+class MetricsView(View):
+    """Prometheus scrape endpoint"""
+    
+    def get(self, request):
+        """Return latency histograms, counters and gauges in Prometheus text format"""
+        return HttpResponse(
+            render_prometheus(),
+            content_type='text/plain; version=0.0.4; charset=utf-8'
+        )
@@ -0,0 +1,35 @@
+"""Reference gunicorn configuration: the dataset is loaded once and shared by all workers.
+
+    gunicorn -c gunicorn.conf.py real_estate_chatbot.wsgi:application
+
+or, for the async views, with uvicorn workers under the same master:
+
+    gunicorn -c gunicorn.conf.py -k uvicorn_worker.UvicornWorker real_estate_chatbot.asgi:application
+
+The app is imported in the master, which loads the dataset and its
+indexes (``DATASET_PRELOAD``) before forking, so workers start ready and
+share those pages copy-on-write. ``uvicorn --workers N`` imports the app
+in every worker instead; there the workers still share the dataset's
+columns through the memory-mapped snapshot, but each builds its own
+indexes. ``/api/health/`` reports each worker's shared and private memory.
+"""
+import os
+
+# Read by wsgi.py/asgi.py when the master imports the app
+os.environ.setdefault('DATASET_PRELOAD', 'true')
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.getenv('GUNICORN_WORKERS', '4'))
+# Threads overlap the waits on Gemini and MongoDB within one worker
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.getenv('GUNICORN_THREADS', '4'))
+preload_app = True
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '60'))
+# Recycled workers are forked from the preloaded master, so they start ready too
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', '2000'))
+max_requests_jitter = 200
+
+
+def post_fork(server, worker):
+    from api.prefork import after_fork
+    after_fork()
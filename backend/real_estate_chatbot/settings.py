@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 import os
+from importlib.util import find_spec
 from dotenv import load_dotenv # type: ignore
 
 # Load environment variables
@@ -47,6 +48,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Outermost, so its total covers every other middleware
+    'api.middleware.ServerTimingMiddleware',
+    # Before anything else touches the body, like Django's GZipMiddleware
+    'api.middleware.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -170,7 +175,131 @@ MEDIA_ROOT = BASE_DIR / 'media'
 
 # Gemini API Configuration
 GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
+GEMINI_MODEL = os.getenv('GEMINI_MODEL', 'gemini-pro')
+
+# LLM summary client
+# Latency budget after which the mock summary is served instead
+LLM_TIMEOUT_SECONDS = float(os.getenv('LLM_TIMEOUT_SECONDS', '8'))
+LLM_MAX_WORKERS = int(os.getenv('LLM_MAX_WORKERS', '4'))
+# Streamed summaries run on their own pool of this many threads
+LLM_MAX_STREAMS = int(os.getenv('LLM_MAX_STREAMS', '4'))
+# Dotted path to an alternative backend callable, e.g. api.llm.FakeLLMBackend
+LLM_BACKEND = os.getenv('LLM_BACKEND', '')
+LLM_FAKE_DELAY_SECONDS = float(os.getenv('LLM_FAKE_DELAY_SECONDS', '1'))
+# Consecutive failed or over-budget calls that open the circuit breaker, and
+# how long it stays open before one trial call is let through
+LLM_BREAKER_FAILURE_THRESHOLD = int(os.getenv('LLM_BREAKER_FAILURE_THRESHOLD', '5'))
+LLM_BREAKER_RESET_SECONDS = float(os.getenv('LLM_BREAKER_RESET_SECONDS', '30'))
+
+# LLM summary cache (in-memory LRU, optionally persisted in the default SQLite DB)
+SUMMARY_CACHE_SIZE = int(os.getenv('SUMMARY_CACHE_SIZE', '1024'))
+SUMMARY_CACHE_TTL_SECONDS = int(os.getenv('SUMMARY_CACHE_TTL_SECONDS', str(7 * 24 * 3600)))
+SUMMARY_CACHE_PERSISTENT = os.getenv('SUMMARY_CACHE_PERSISTENT', 'true').lower() == 'true'
+# Number of most-queried areas to re-summarize in the background after an upload
+SUMMARY_PREWARM_TOP_N = int(os.getenv('SUMMARY_PREWARM_TOP_N', '10'))
 
 # MongoDB Configuration
 MONGODB_URI = os.getenv('MONGODB_URI', '')
+MONGODB_MAX_POOL_SIZE = int(os.getenv('MONGODB_MAX_POOL_SIZE', '20'))
+MONGODB_MIN_POOL_SIZE = int(os.getenv('MONGODB_MIN_POOL_SIZE', '0'))
+# Without these a bad URI or an unreachable server blocks a request for 30 s
+MONGODB_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv('MONGODB_SERVER_SELECTION_TIMEOUT_MS', '2000'))
+MONGODB_CONNECT_TIMEOUT_MS = int(os.getenv('MONGODB_CONNECT_TIMEOUT_MS', '2000'))
+MONGODB_SOCKET_TIMEOUT_MS = int(os.getenv('MONGODB_SOCKET_TIMEOUT_MS', '20000'))
+# Documents per cursor batch; also the number of dicts held at once while
+# building a DataFrame
+MONGODB_BATCH_SIZE = int(os.getenv('MONGODB_BATCH_SIZE', '5000'))
+# Comma-separated fields to load into DataFrames; empty loads every stored column
+MONGODB_FIELDS = [field.strip() for field in os.getenv('MONGODB_FIELDS', '').split(',') if field.strip()]
+# Readiness probes ping MongoDB at most once per interval, each ping bounded
+# by the timeout; probes in between reuse the last result
+HEALTH_MONGO_PING_TIMEOUT_MS = int(os.getenv('HEALTH_MONGO_PING_TIMEOUT_MS', '250'))
+HEALTH_MONGO_PING_INTERVAL_SECONDS = float(os.getenv('HEALTH_MONGO_PING_INTERVAL_SECONDS', '5'))
+
+
+# Dataset cache configuration
+# Token file shared by all workers; rewriting it invalidates every cached dataset
+DATA_VERSION_FILE = os.getenv('DATA_VERSION_FILE', str(BASE_DIR / 'data' / '.data_version'))
+# Memory-mappable columnar snapshots, one per data version
+SNAPSHOT_DIR = os.getenv('SNAPSHOT_DIR', str(BASE_DIR / 'data' / 'snapshots'))
+# Queue running upload ingestion jobs; any class with submit(func, *args)
+INGESTION_QUEUE = os.getenv('INGESTION_QUEUE', 'api.ingestion.LocalIngestionQueue')
+# Where queries are answered: 'memory' (pandas in each worker) or 'mongo'
+# (indexed aggregation pipelines; falls back to memory while MongoDB is empty)
+QUERY_ENGINE = os.getenv('QUERY_ENGINE', 'memory')
+# While MongoDB is unreachable or empty, the mongo engine serves the in-memory
+# dataset and tries MongoDB again after this many seconds (or a new version)
+QUERY_ENGINE_RETRY_SECONDS = float(os.getenv('QUERY_ENGINE_RETRY_SECONDS', '30'))
+# Start loading the dataset in the background when a server process starts
+# (wsgi.py/asgi.py), so workers become ready without waiting for a query
+DATASET_WARM_ON_START = os.getenv('DATASET_WARM_ON_START', 'true').lower() == 'true'
+# Load the dataset synchronously when wsgi.py/asgi.py is imported, for servers
+# that import the app once and then fork workers (gunicorn --preload, see
+# gunicorn.conf.py). Never combine with a server that imports in every worker
+DATASET_PRELOAD = os.getenv('DATASET_PRELOAD', 'false').lower() == 'true'
+# Rows read and written per batch when streaming uploads into pandas and MongoDB
+INGEST_CHUNK_SIZE = int(os.getenv('INGEST_CHUNK_SIZE', '5000'))
+
+# Cached /api/query/ responses, keyed on the matched areas, intent and data
+# version. Any Django cache backend works; set QUERY_CACHE_BACKEND to
+# django.core.cache.backends.filebased.FileBasedCache and QUERY_CACHE_LOCATION
+# to a directory to share entries between workers.
+QUERY_CACHE_ENABLED = os.getenv('QUERY_CACHE_ENABLED', 'true').lower() == 'true'
+QUERY_CACHE_ALIAS = 'query_responses'
+QUERY_CACHE_TIMEOUT = int(os.getenv('QUERY_CACHE_TIMEOUT', '3600'))
+# Cache-Control max-age sent with cached answers; 0 makes clients revalidate
+# every time, so a new upload is seen at once
+QUERY_CACHE_MAX_AGE = int(os.getenv('QUERY_CACHE_MAX_AGE', '0'))
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    QUERY_CACHE_ALIAS: {
+        'BACKEND': os.getenv('QUERY_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('QUERY_CACHE_LOCATION', 'query-responses'),
+        'TIMEOUT': QUERY_CACHE_TIMEOUT,
+        'OPTIONS': {'MAX_ENTRIES': int(os.getenv('QUERY_CACHE_MAX_ENTRIES', '1000'))},
+    },
+}
 
+# /api/query/batch/: most queries per request, and LLM calls one batch may
+# have in flight at once (the shared pool has LLM_MAX_WORKERS threads)
+BATCH_MAX_QUERIES = int(os.getenv('BATCH_MAX_QUERIES', '100'))
+BATCH_LLM_CONCURRENCY = int(os.getenv('BATCH_LLM_CONCURRENCY', '4'))
+
+# Responses of at least this many bytes are compressed: brotli when the client
+# accepts it and the brotli package is installed, gzip otherwise
+COMPRESSION_ENABLED = os.getenv('COMPRESSION_ENABLED', 'true').lower() == 'true'
+COMPRESSION_MIN_BYTES = int(os.getenv('COMPRESSION_MIN_BYTES', '1024'))
+
+# Area names in queries: JSON table of alias -> area (e.g. "Ambegaon Bk"), and
+# the per-query time budget for typo-tolerant lookups when no area matches exactly
+AREA_ALIASES_FILE = os.getenv('AREA_ALIASES_FILE', str(BASE_DIR / 'data' / 'area_aliases.json'))
+AREA_FUZZY_BUDGET_MS = float(os.getenv('AREA_FUZZY_BUDGET_MS', '5'))
+
+# Query analytics: records are buffered in memory and written in batches by a
+# background thread, so logging never adds latency to a request
+QUERY_LOG_ENABLED = os.getenv('QUERY_LOG_ENABLED', 'true').lower() == 'true'
+# Dotted path to a sink class with write(records); empty picks MongoDB when
+# configured and the JSON-lines file below otherwise
+QUERY_LOG_SINK = os.getenv('QUERY_LOG_SINK', '')
+QUERY_LOG_FILE = os.getenv('QUERY_LOG_FILE', str(BASE_DIR / 'data' / 'query_log.jsonl'))
+# Ring buffer size; the oldest records are dropped (and counted) when full
+QUERY_LOG_CAPACITY = int(os.getenv('QUERY_LOG_CAPACITY', '10000'))
+QUERY_LOG_BATCH_SIZE = int(os.getenv('QUERY_LOG_BATCH_SIZE', '200'))
+QUERY_LOG_FLUSH_MS = int(os.getenv('QUERY_LOG_FLUSH_MS', '1000'))
+
+# Benchmark baseline checked by `manage.py benchmark` (written with --save-baseline)
+BENCHMARK_BASELINE_FILE = os.getenv('BENCHMARK_BASELINE_FILE', str(BASE_DIR / 'benchmarks' / 'baseline.json'))
+BENCHMARK_TOLERANCE = float(os.getenv('BENCHMARK_TOLERANCE', '0.25'))
+
+# Django REST Framework
+# Renderers are picked by Accept header or ?format=: json, columnar, msgpack
+REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        'api.renderers.ColumnarJSONRenderer',
+        *(['api.renderers.MessagePackRenderer'] if find_spec('msgpack') else []),
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+}
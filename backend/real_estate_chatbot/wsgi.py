@@ -14,3 +14,15 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'real_estate_chatbot.settings')
 
 application = get_wsgi_application()
+
+from django.conf import settings  # noqa: E402
+
+if settings.DATASET_PRELOAD:
+    # Imported once in the master before workers fork: load synchronously, as a
+    # background thread could be mid-load, holding the store lock, at fork time
+    from api.prefork import preload_query_dataset  # noqa: E402
+    preload_query_dataset()
+elif settings.DATASET_WARM_ON_START:
+    # Load the dataset now so readiness probes pass without a first query
+    from api.mongo_engine import warm_query_dataset  # noqa: E402
+    warm_query_dataset()
@@ -1,5 +1,5 @@
 import React, { useState, useRef, useEffect } from 'react';
-import { sendChatQuery } from './services/api';
+import { streamChatQuery } from './services/api';
 import ChatMessage from './components/ChatMessage';
 import ChartDisplay from './components/ChartDisplay';
 import DataTable from './components/DataTable';
@@ -40,31 +40,40 @@ function App() {
     setLoading(true);
     setCurrentAnalysis(null);
 
+    const botMessageId = Date.now() + 1;
+    const setBotText = (update) => {
+      setMessages(prev => prev.map(message => (
+        message.id === botMessageId
+          ? { ...message, text: update(message.text) }
+          : message
+      )));
+    };
+
     try {
-      const response = await sendChatQuery(inputValue);
-      
-      if (response.success) {
-        const botMessage = {
-          id: Date.now() + 1,
-          text: response.summary,
-          isUser: false,
-        };
-        
-        setMessages(prev => [...prev, botMessage]);
-        setCurrentAnalysis({
-          chartData: response.chart_data,
-          tableData: response.table_data,
-        });
-      } else {
-        throw new Error(response.message || 'Failed to process query');
-      }
+      // Charts render as soon as the data event arrives; the summary streams in after
+      await streamChatQuery(inputValue, {
+        onData: (data) => {
+          setMessages(prev => [...prev, { id: botMessageId, text: '', isUser: false }]);
+          setCurrentAnalysis({
+            chartData: data.chart_data,
+            tableData: data.table_data,
+            tableTotal: data.table_total,
+            tableNextCursor: data.table_next_cursor,
+            area: data.area,
+          });
+          setLoading(false);
+        },
+        onSummaryChunk: (chunk) => setBotText(text => text + chunk),
+        onSummary: (summary) => setBotText(() => summary),
+      });
     } catch (err) {
-      const errorMessage = {
-        id: Date.now() + 1,
-        text: `Sorry, error: ${err.error || err.message || 'Check if backend is running at http://localhost:8000'}`,
-        isUser: false,
-      };
-      setMessages(prev => [...prev, errorMessage]);
+      const errorText = `Sorry, error: ${err.error || err.message || 'Check if backend is running at http://localhost:8000'}`;
+      // A stream that fails after its data event already has a bot message; reuse it
+      setMessages(prev => (
+        prev.some(message => message.id === botMessageId)
+          ? prev.map(message => (message.id === botMessageId ? { ...message, text: errorText } : message))
+          : [...prev, { id: botMessageId, text: errorText, isUser: false }]
+      ));
     } finally {
       setLoading(false);
     }
@@ -107,7 +116,12 @@ function App() {
               {currentAnalysis && (
                 <div className="analysis-results">
                   <ChartDisplay chartData={currentAnalysis.chartData} />
-                  <DataTable data={currentAnalysis.tableData} />
+                  <DataTable
+                    data={currentAnalysis.tableData}
+                    area={currentAnalysis.area}
+                    total={currentAnalysis.tableTotal}
+                    nextCursor={currentAnalysis.tableNextCursor}
+                  />
                 </div>
               )}
               
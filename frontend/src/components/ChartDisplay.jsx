@@ -2,8 +2,10 @@ import React from 'react';
 import { LineChart, Line, BarChart, Bar, XAxis, YAxis, CartesianGrid, Tooltip, Legend, ResponsiveContainer } from 'recharts';
 import './ChartDisplay.css';
 
+const COMPARISON_COLORS = ['#8b5cf6', '#10b981', '#f59e0b', '#ef4444', '#3b82f6', '#ec4899', '#14b8a6', '#6366f1'];
+
 const ChartDisplay = ({ chartData }) => {
-  if (!chartData || !chartData.data) return null;
+  if (!chartData || (!chartData.data && chartData.type !== 'comparison')) return null;
 
   const { type, data } = chartData;
 
@@ -87,9 +89,39 @@ const ChartDisplay = ({ chartData }) => {
     );
   };
 
+  const renderTrendComparison = (title, trends, formatter) => {
+    const areas = (chartData.areas || []).map((item) => item.area);
+    if (!trends || trends.length === 0 || areas.length === 0) return null;
+
+    return (
+      <div className="chart-card">
+        <h3>{title}</h3>
+        <ResponsiveContainer width="100%" height={300}>
+          <LineChart data={trends}>
+            <CartesianGrid strokeDasharray="3 3" />
+            <XAxis dataKey="year" />
+            <YAxis />
+            <Tooltip formatter={formatter} />
+            <Legend />
+            {areas.map((area, index) => (
+              <Line
+                key={area}
+                type="monotone"
+                dataKey={area}
+                stroke={COMPARISON_COLORS[index % COMPARISON_COLORS.length]}
+                strokeWidth={2}
+                connectNulls
+              />
+            ))}
+          </LineChart>
+        </ResponsiveContainer>
+      </div>
+    );
+  };
+
   const renderComparisonChart = () => {
-    const priceData = data.price_data || [];
-    const demandData = data.demand_data || [];
+    const priceData = chartData.price_data || [];
+    const demandData = chartData.demand_data || [];
 
     return (
       <>
@@ -123,6 +155,8 @@ const ChartDisplay = ({ chartData }) => {
             </ResponsiveContainer>
           </div>
         )}
+        {renderTrendComparison('📈 Price Trends', chartData.price_trends, (value) => `₹${value.toLocaleString()}`)}
+        {renderTrendComparison('📊 Demand Trends', chartData.demand_trends)}
       </>
     );
   };
@@ -1,24 +1,80 @@
-import React, { useState } from 'react';
+import React, { useState, useEffect, useCallback } from 'react';
+import { fetchTablePage } from '../services/api';
 import './DataTable.css';
 
-const DataTable = ({ data }) => {
-  const [showAll, setShowAll] = useState(false);
+const PAGE_SIZE = 50;
+// Start fetching the next page when this close (px) to the bottom
+const SCROLL_THRESHOLD = 80;
 
-  if (!data || data.length === 0) return null;
+const DataTable = ({ data, area, total, nextCursor }) => {
+  const [rows, setRows] = useState(data || []);
+  const [cursor, setCursor] = useState(nextCursor || null);
+  const [sort, setSort] = useState(null);
+  const [loadingPage, setLoadingPage] = useState(false);
+  const [error, setError] = useState(null);
 
-  const displayData = showAll ? data : data.slice(0, 10);
-  const columns = Object.keys(data[0]);
+  // A new chat answer replaces the table
+  useEffect(() => {
+    setRows(data || []);
+    setCursor(nextCursor || null);
+    setSort(null);
+    setError(null);
+  }, [data, nextCursor]);
+
+  const loadPage = useCallback(async ({ pageCursor, pageSort, replace }) => {
+    if (!area) return;
+    setLoadingPage(true);
+    setError(null);
+    try {
+      const page = await fetchTablePage(area, {
+        sort: pageSort,
+        cursor: pageCursor,
+        limit: PAGE_SIZE,
+      });
+      setRows(prev => (replace ? page.rows : [...prev, ...page.rows]));
+      setCursor(page.next_cursor);
+    } catch (err) {
+      setError(err.error || 'Failed to load more rows');
+    } finally {
+      setLoadingPage(false);
+    }
+  }, [area]);
+
+  if (!rows || rows.length === 0) return null;
+
+  const columns = Object.keys(rows[0]);
+
+  const handleScroll = (e) => {
+    const { scrollTop, scrollHeight, clientHeight } = e.currentTarget;
+    if (cursor && !loadingPage && scrollHeight - scrollTop - clientHeight < SCROLL_THRESHOLD) {
+      loadPage({ pageCursor: cursor, pageSort: sort, replace: false });
+    }
+  };
+
+  // Sorting happens on the server so it covers every row, not just loaded ones
+  const handleSort = (col) => {
+    if (!area) return;
+    const nextSort = sort === col ? `-${col}` : col;
+    setSort(nextSort);
+    loadPage({ pageCursor: null, pageSort: nextSort, replace: true });
+  };
+
+  const sortIndicator = (col) => {
+    if (sort === col) return ' ▲';
+    if (sort === `-${col}`) return ' ▼';
+    return '';
+  };
 
   const exportToCSV = () => {
     const headers = columns.join(',');
-    const rows = data.map(row => 
+    const csvRows = rows.map(row => 
       columns.map(col => {
         const value = row[col];
         return typeof value === 'string' && value.includes(',') ? `"${value}"` : value;
       }).join(',')
     ).join('\n');
     
-    const csv = `${headers}\n${rows}`;
+    const csv = `${headers}\n${csvRows}`;
     const blob = new Blob([csv], { type: 'text/csv' });
     const url = window.URL.createObjectURL(blob);
     const a = document.createElement('a');
@@ -37,17 +93,23 @@ const DataTable = ({ data }) => {
         </button>
       </div>
       
-      <div className="table-container">
+      <div className="table-container" onScroll={handleScroll}>
         <table className="data-table">
           <thead>
             <tr>
               {columns.map((col) => (
-                <th key={col}>{col}</th>
+                <th
+                  key={col}
+                  onClick={() => handleSort(col)}
+                  className={area ? 'sortable' : undefined}
+                >
+                  {col}{sortIndicator(col)}
+                </th>
               ))}
             </tr>
           </thead>
           <tbody>
-            {displayData.map((row, index) => (
+            {rows.map((row, index) => (
               <tr key={index}>
                 {columns.map((col) => (
                   <td key={col}>
@@ -62,16 +124,13 @@ const DataTable = ({ data }) => {
         </table>
       </div>
       
-      {data.length > 10 && (
-        <div className="table-footer">
-          <button
-            onClick={() => setShowAll(!showAll)}
-            className="toggle-btn"
-          >
-            {showAll ? '▲ Show Less' : `▼ Show All (${data.length} records)`}
-          </button>
-        </div>
-      )}
+      <div className="table-footer">
+        <small>
+          {loadingPage
+            ? 'Loading more rows...'
+            : error || `Showing ${rows.length} of ${total ?? rows.length} records`}
+        </small>
+      </div>
     </div>
   );
 };
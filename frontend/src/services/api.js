@@ -9,15 +9,110 @@ const api = axios.create({
   },
 });
 
+// Compact responses: every list of rows (table, chart series) arrives as
+// { columns, data } with one array per column instead of repeating the keys
+const COLUMNAR = 'application/vnd.realestate.columnar+json';
+
+const isColumnar = (value) => (
+  Object.keys(value).length === 2 && Array.isArray(value.columns) && Array.isArray(value.data)
+);
+
+// Expand { columns, data } back into row objects, so components keep reading rows
+export const fromColumnar = (value) => {
+  if (Array.isArray(value)) return value.map(fromColumnar);
+  if (!value || typeof value !== 'object') return value;
+  if (isColumnar(value)) {
+    const { columns, data } = value;
+    const length = data.length ? data[0].length : 0;
+    return Array.from({ length }, (_, row) => (
+      Object.fromEntries(columns.map((column, index) => [column, data[index][row]]))
+    ));
+  }
+  return Object.fromEntries(Object.entries(value).map(([key, item]) => [key, fromColumnar(item)]));
+};
+
 export const sendChatQuery = async (query) => {
   try {
-    const response = await api.post('/query/', { query });
-    return response.data;
+    const response = await api.post('/query/', { query }, { headers: { Accept: COLUMNAR } });
+    return fromColumnar(response.data);
   } catch (error) {
     throw error.response?.data || { error: 'Failed to process query' };
   }
 };
 
+// Streams NDJSON events from /query/stream/: chart and table data arrive
+// first ("data"), then the summary as it is generated ("summary_chunk"),
+// then the final summary ("summary") and "done". It is a GET, so cached
+// answers come back with an ETag the browser revalidates to a 304.
+export const streamChatQuery = async (query, { onData, onSummaryChunk, onSummary } = {}) => {
+  let response;
+  try {
+    const params = new URLSearchParams({ query, format: 'columnar' });
+    response = await fetch(`${API_BASE_URL}/query/stream/?${params}`);
+  } catch (error) {
+    throw { error: 'Failed to process query' };
+  }
+
+  if (!response.ok || !response.body) {
+    const data = await response.json().catch(() => ({}));
+    throw data.error ? data : { error: 'Failed to process query' };
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+
+  const handleEvent = (event) => {
+    switch (event.event) {
+      case 'data':
+        onData?.(event);
+        break;
+      case 'summary_chunk':
+        onSummaryChunk?.(event.text);
+        break;
+      case 'summary':
+        onSummary?.(event.summary, Boolean(event.fallback));
+        break;
+      case 'error':
+        throw { error: event.error };
+      default:
+        break;
+    }
+  };
+
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    const lines = buffer.split('\n');
+    buffer = lines.pop();
+    lines.filter(Boolean).forEach((line) => handleEvent(fromColumnar(JSON.parse(line))));
+  }
+
+  if (buffer.trim()) {
+    handleEvent(fromColumnar(JSON.parse(buffer)));
+  }
+};
+
+export const fetchTablePage = async (area, { sort, columns, cursor, limit = 50 } = {}) => {
+  try {
+    const response = await api.get('/table/', {
+      params: {
+        area,
+        sort: sort || undefined,
+        columns: columns?.length ? columns.join(',') : undefined,
+        cursor: cursor || undefined,
+        limit,
+      },
+      headers: { Accept: COLUMNAR },
+    });
+    return fromColumnar(response.data);
+  } catch (error) {
+    throw error.response?.data || { error: 'Failed to load table data' };
+  }
+};
+
 export const uploadFile = async (file) => {
   try {
     const formData = new FormData();
@@ -35,6 +130,15 @@ export const uploadFile = async (file) => {
   }
 };
 
+export const getUploadStatus = async (jobId) => {
+  try {
+    const response = await api.get(`/upload/${jobId}/status/`);
+    return response.data;
+  } catch (error) {
+    throw error.response?.data || { error: 'Failed to fetch upload status' };
+  }
+};
+
 export const checkHealth = async () => {
   try {
     const response = await api.get('/health/');